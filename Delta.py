@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Delta patches between SDE builds.
+
+    python Delta.py make previous/eve.db eve.db [eve-delta] [sqlite,mysql,...]
+        writes eve-delta-sqlite.sql.gz, eve-delta-mysql.sql.gz,
+        eve-delta-postgres.sql.gz and eve-delta-mssql.sql.gz (or the
+        listed dialects only)
+
+    python Delta.py apply eve-delta-sqlite.sql.gz eve.db
+    python Delta.py apply eve-delta-mysql.sql.gz mysql
+        the target is a SQLite file for sqlite patches, otherwise a
+        connection name from sdeloader.cfg
+"""
+import sys
+
+from tableloader import delta
+
+if len(sys.argv) < 4 or sys.argv[1] not in ('make', 'apply'):
+    print(__doc__)
+    exit()
+
+if sys.argv[1] == 'make':
+    dialects = sys.argv[5].split(',') if len(sys.argv) > 5 else delta.DIALECTS
+    delta.make(sys.argv[2], sys.argv[3], sys.argv[4] if len(sys.argv) > 4 else 'eve-delta', dialects)
+    exit()
+
+patch, target = sys.argv[2], sys.argv[3]
+print(f"Applying {patch} to {target}")
+if delta.read_header(patch).get('dialect') == 'sqlite':
+    delta.apply_sqlite(patch, target)
+else:
+    import configparser, os
+    from sqlalchemy import create_engine
+
+    fileLocation = os.path.dirname(os.path.realpath(__file__))
+    config = configparser.ConfigParser()
+    config.read(fileLocation + '/sdeloader.cfg')
+    engine = create_engine(config.get('Database', target))
+    with engine.connect() as connection:
+        if target == "postgresschema":
+            connection.exec_driver_sql("SET search_path TO evesde")
+        delta.apply_connection(patch, connection)
+    engine.dispose()
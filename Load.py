@@ -20,6 +20,24 @@ if '--create-stripped' in sys.argv:
     # Remove the flag from argv to not interfere with language detection
     sys.argv = [arg for arg in sys.argv if arg != '--create-stripped']
 
+# Check for --finalize flag (read-optimize the SQLite release files)
+finalize = False
+if '--finalize' in sys.argv:
+    finalize = True
+    sys.argv = [arg for arg in sys.argv if arg != '--finalize']
+
+# Check for --compact flag (size-optimized SQLite profile, see [Compact] in sdeloader.cfg)
+compact = False
+if '--compact' in sys.argv:
+    compact = True
+    sys.argv = [arg for arg in sys.argv if arg != '--compact']
+
+# Check for --offline flag (use cached hoboleaks data / bundled CSVs only)
+offline = False
+if '--offline' in sys.argv:
+    offline = True
+    sys.argv = [arg for arg in sys.argv if arg != '--offline']
+
 if len(sys.argv)==3:
     language=sys.argv[2]
 else:
@@ -32,6 +50,10 @@ config = configparser.ConfigParser()
 config.read(inifile)
 destination=config.get('Database',database)
 sourcePath=config.get('Files','sourcePath')
+destinationPath=config.get('Files','destinationPath')
+lightYearRange=config.getfloat('Derived','lightYearRange',fallback=10.0)
+effectiveAttributes=config.getboolean('Derived','effectiveAttributes',fallback=False)
+pivotCategories=[int(c) for c in config.get('Derived','pivotCategories',fallback='').split(',') if c.strip()]
 
 from tableloader.tableFunctions import *
 
@@ -75,12 +97,11 @@ npccorporations.importyaml(connection,metadata,sourcePath,language)
 npcDivisions.importyaml(connection,metadata,sourcePath,language)
 characterAttributes.importyaml(connection,metadata,sourcePath,language)
 agents.importyaml(connection,metadata,sourcePath,language)
-typeMaterials.importyaml(connection,metadata,sourcePath,language)
-dogmaTypes.importyaml(connection,metadata,sourcePath,language)
 dogmaEffects.importyaml(connection,metadata,sourcePath,language)
 dogmaAttributes.importyaml(connection,metadata,sourcePath,language)
 dogmaAttributeCategories.importyaml(connection,metadata,sourcePath,language)
-blueprints.importyaml(connection,metadata,sourcePath)
+blueprints.importyaml(connection,metadata,sourcePath,destinationPath)
+blueprints.buildBillOfMaterials(connection,metadata)
 marketGroups.importyaml(connection,metadata,sourcePath,language)
 metaGroups.importyaml(connection,metadata,sourcePath,language)
 controlTowerResources.importyaml(connection,metadata,sourcePath,language)
@@ -92,22 +113,35 @@ certificates.importyaml(connection,metadata,sourcePath,language)
 
 icons.importyaml(connection,metadata,sourcePath)
 skins.importyaml(connection,metadata,sourcePath)
-types.importyaml(connection,metadata,sourcePath,language)
+types.importyaml(connection,metadata,sourcePath,language,destinationPath)
+# After types: the reprocessing matrix reads invTypes.portionSize
+typeMaterials.importyaml(connection,metadata,sourcePath,language,destinationPath)
+# Closures need marketGroups and types (invMetaTypes)
+hierarchies.buildHierarchies(connection,metadata)
+# Dogma types resolve restriction attributes by name and charge groups via invTypes
+dogmaTypes.importyaml(connection,metadata,sourcePath,language,effectiveAttributes,destinationPath,pivotCategories)
 typeBonus.importyaml(connection,metadata,sourcePath,language)
 # Masteries needs Certificates and Types (implied typeID existence, though not FK enforced strictly)
 masteries.importyaml(connection,metadata,sourcePath,language)
 
 eveUnits.importyaml(connection,metadata,sourcePath,language)
 planetary.importyaml(connection,metadata,sourcePath,language)
+planetary.buildChains(connection,metadata)
 # bsdTables.importyaml(connection,metadata,sourcePath)
-volumes.importVolumes(connection,metadata,sourcePath)
+volumes.importVolumes(connection,metadata,sourcePath,offline)
 universe.importyaml(connection,metadata,sourcePath,language)
+universe.buildLightYears(connection,metadata,lightYearRange)
+universe.buildBounds(connection,metadata)
 universe.buildJumps(connection,metadata)
 stations.importyaml(connection,metadata,sourcePath,language)
+# Celestial index needs stations and planets/moons/belts from the universe import
+universe.buildCelestialIndex(connection,metadata,destinationPath)
 universe.fixStationNames(connection,metadata)
 invNames.importyaml(connection,metadata,sourcePath,language)
 invItems.importyaml(connection,metadata,sourcePath,language)
-rigAffectedProductGroups.importRigMappings(connection,metadata)
+rigAffectedProductGroups.importRigMappings(connection,metadata,offline)
+# FTS5 search over names in every language (SQLite only), after all names are loaded
+search.buildSearch(connection,metadata,language)
 
 # Create indexes AFTER all data is loaded for significantly better performance
 print("\n" + "="*60)
@@ -146,114 +180,44 @@ print("="*60 + "\n")
 connection.close()
 engine.dispose()
 
-def create_stripped_database(source_db_path='eve.db', dest_db_path='eve-stripped.db'):
-    """
-    Create a stripped-down version of the database containing only essential tables.
-
-    Uses copy + DROP approach for efficiency and accuracy.
-    """
-    import shutil
-    import sqlite3
-
-    # Tables to keep in stripped database
-    TABLES_TO_KEEP = {
-        'invTypes', 'invGroups', 'invCategories', 'invMetaTypes', 'invVolumes',
-        'industryActivityMaterials', 'industryActivityProducts', 'industryActivity',
-        'industryActivityProbabilities', 'industryActivitySkills',
-        'dgmTypeAttributes', 'dgmAttributeTypes', 'dgmTypeEffects', 'dgmEffects',
-        'dgmAttributeCategories', 'dgmExpressions',
-        'mapRegions', 'mapSolarSystems', 'staStations',
-        'invTypeMaterials', 'invMarketGroups', 'industryBlueprints',
-        'planetSchematics', 'planetSchematicsPinMap', 'planetSchematicsTypeMap',
-        'invTypeReactions',
-        'rigAffectedProductGroups', 'rigIndustryModifierSources'
-    }
-
-    # Check source exists
-    if not os.path.exists(source_db_path):
-        print(f"Error: Source database not found: {source_db_path}")
-        return False
-
-    # Warn if destination exists
-    if os.path.exists(dest_db_path):
-        print(f"Warning: {dest_db_path} already exists and will be overwritten")
-
-    try:
-        print(f"\nCreating stripped database: {dest_db_path}")
-
-        # Step 1: Copy the entire database
-        print(f"  Copying {source_db_path}...")
-        shutil.copy2(source_db_path, dest_db_path)
-
-        # Step 2: Connect and get all tables
-        conn = sqlite3.connect(dest_db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        all_tables = [row[0] for row in cursor.fetchall()]
-
-        # Step 3: Drop unwanted tables
-        tables_to_drop = [t for t in all_tables if t not in TABLES_TO_KEEP]
-
-        print(f"  Removing {len(tables_to_drop)} unnecessary tables...")
-        for table in tables_to_drop:
-            cursor.execute(f"DROP TABLE IF EXISTS {table}")
-
-        # Step 4: VACUUM to reclaim space
-        print("  Optimizing database (VACUUM)...")
-        conn.commit()
-        cursor.execute("VACUUM")
-
-        conn.close()
-
-        # Step 5: Report results
-        original_size = os.path.getsize(source_db_path) / (1024*1024)
-        stripped_size = os.path.getsize(dest_db_path) / (1024*1024)
-
-        print(f"\n  Stripped database created successfully!")
-        print(f"  Original size: {original_size:.2f} MB")
-        print(f"  Stripped size: {stripped_size:.2f} MB")
-        print(f"  Space saved: {original_size - stripped_size:.2f} MB ({(1-stripped_size/original_size)*100:.1f}%)")
-        print(f"  Tables kept: {len(TABLES_TO_KEEP)}")
-
-        # Validation
-        conn = sqlite3.connect(dest_db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-        final_tables = set(row[0] for row in cursor.fetchall())
-        conn.close()
-
-        if final_tables == TABLES_TO_KEEP:
-            print(f"  Validation: All {len(TABLES_TO_KEEP)} expected tables present")
-        else:
-            print(f"  Warning: Table mismatch detected")
-            missing = TABLES_TO_KEEP - final_tables
-            extra = final_tables - TABLES_TO_KEEP
-            if missing:
-                print(f"    Missing tables: {missing}")
-            if extra:
-                print(f"    Extra tables: {extra}")
-
-        return True
-
-    except Exception as e:
-        print(f"Error creating stripped database: {e}")
-        # Clean up partial file on error
-        if os.path.exists(dest_db_path):
-            try:
-                os.remove(dest_db_path)
-                print(f"  Cleaned up partial file: {dest_db_path}")
-            except:
-                pass
-        return False
+from tableloader import sqliteRelease
+
+# Finalize before stripping so the stripped copies inherit the rebuilt tables
+if finalize:
+    if database == 'sqlite':
+        sqliteRelease.finalize('eve.db')
+    else:
+        print("\nWarning: --finalize is only supported for SQLite databases")
 
 # Create stripped database if requested
 if create_stripped:
     # Only create stripped DB for SQLite databases
     if database == 'sqlite':
-        create_stripped_database('eve.db', 'eve-stripped.db')
+        profiles = dict(sqliteRelease.PROFILES)
+        # Extra profiles from sdeloader.cfg: destination file = comma separated tables
+        if config.has_section('StrippedProfiles'):
+            for dest, tables in config.items('StrippedProfiles'):
+                profiles[dest] = {t.strip() for t in tables.split(',') if t.strip()}
+        for dest in sqliteRelease.buildProfiles('eve.db', profiles):
+            if finalize:
+                sqliteRelease.finalize(dest)
     else:
         print("\nWarning: Stripped database creation is only supported for SQLite databases")
         print(f"  Current database type: {database}")
 
+# Create compact database if requested, from the stripped database when it was built
+if compact:
+    if database == 'sqlite':
+        sqliteRelease.buildCompact(
+            'eve-stripped.db' if create_stripped else 'eve.db',
+            'eve-compact.db',
+            'eve-descriptions.db',
+            descriptions=config.getboolean('Compact','descriptions',fallback=True),
+            valueInt=config.getboolean('Compact','valueInt',fallback=True),
+            dictionary=config.getboolean('Compact','dictionary',fallback=True),
+            compress=config.getboolean('Compact','zstd',fallback=True),
+        )
+    else:
+        print("\nWarning: --compact is only supported for SQLite databases")
+
 # invTypes, invGroups, invCategories, invMetaTypes, invVolumes, industryActivityMaterials, industryActivityProducts, industryActivity, industryActivityProbabilities, industryActivitySkills, dgmTypeAttributes, dgmAttributeTypes, mapRegions, mapSolarSystems, staStations, invTypeMaterials, invMarketGroups, industryBlueprints, planetSchematics, planetSchematicsPinMap, planetSchematicsTypeMap, invTypeReactions
\ No newline at end of file
@@ -0,0 +1 @@
+__all__ = ["spatialIndex", "whereUsed", "industryCalculator", "reprocessing", "planetaryChains", "skillTraining", "dogmaEngine", "attributeStore", "nameResolver"]
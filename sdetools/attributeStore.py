@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+attributeStore.py
+
+Columnar dogma attribute store with numpy range queries.
+
+The converter writes the store as a compressed numpy archive
+(dogmaAttributes.npz in the configured destinationPath), built from
+typeDogma while dgmTypeAttributes is loaded. Every invTypes typeID gets a
+position in one dense, sorted type index (with its groupID, categoryID and
+published flag). Every attributeID gets a presence bitmap over that index
+(np.packbits, one row per attribute) and the values of the present types in
+index order, as int64 when all of them are integral and float64 otherwise.
+
+Columns are expanded to dense arrays on first use and cached, so a filter
+over the whole catalogue is a handful of vectorised comparisons.
+
+Usage:
+    from sdetools.attributeStore import AttributeStore
+
+    store = AttributeStore.load('sdeoutput/dogmaAttributes.npz')
+    # Published modules with CPU < 20 and powergrid < 5
+    typeIDs = store.query({'cpu': (None, 20), 'power': (None, 5)}, categoryIDs=[7],
+                          inclusive=False)
+    # Ships by base velocity, fastest first
+    ships = store.query({}, categoryIDs=[6], sort='maxVelocity', descending=True)
+"""
+
+import numpy as np
+
+
+def write_store(path, typeIDs, groupIDs, categoryIDs, published, attributes, rows):
+    """
+    Write the archive.
+
+    typeIDs, groupIDs, categoryIDs and published are parallel arrays for the
+    type index; attributes is [(attributeID, attributeName, defaultValue), ...];
+    rows are (typeID, attributeID, value) tuples. Rows for unknown types or
+    attributes are ignored.
+    """
+    typeIDs = np.asarray(typeIDs, dtype=np.int64)
+    order = np.argsort(typeIDs)
+    typeIDs = typeIDs[order]
+    attributes = sorted(attributes, key=lambda a: a[0])
+    attributeIDs = np.array([a[0] for a in attributes], dtype=np.int64)
+
+    rowTypes = np.array([r[0] for r in rows], dtype=np.int64)
+    rowAttributes = np.array([r[1] for r in rows], dtype=np.int64)
+    rowValues = np.array([r[2] if r[2] is not None else np.nan for r in rows], dtype=np.float64)
+
+    typeIndex = np.searchsorted(typeIDs, rowTypes)
+    attributeIndex = np.searchsorted(attributeIDs, rowAttributes)
+    typeIndex[typeIndex == len(typeIDs)] = 0
+    attributeIndex[attributeIndex == len(attributeIDs)] = 0
+    known = (typeIDs[typeIndex] == rowTypes) & (attributeIDs[attributeIndex] == rowAttributes) & ~np.isnan(rowValues) \
+        if len(typeIDs) and len(attributeIDs) else np.zeros(len(rows), dtype=bool)
+    typeIndex, attributeIndex, rowValues = typeIndex[known], attributeIndex[known], rowValues[known]
+
+    # Attribute-major, type index order within each attribute; duplicates keep the last value
+    keys = attributeIndex * len(typeIDs) + typeIndex
+    keys, last = np.unique(keys[::-1], return_index=True)
+    rowValues = rowValues[::-1][last]
+    attributeIndex, typeIndex = keys // max(len(typeIDs), 1), keys % max(len(typeIDs), 1)
+
+    # Set the presence bits directly in packbits layout (MSB first per byte)
+    presence = np.zeros((len(attributeIDs), (len(typeIDs) + 7) // 8), dtype=np.uint8)
+    np.bitwise_or.at(presence, (attributeIndex, typeIndex >> 3), (0x80 >> (typeIndex & 7)).astype(np.uint8))
+    counts = np.bincount(attributeIndex, minlength=len(attributeIDs))
+
+    # Integral columns are stored as int64
+    fractional = np.bincount(attributeIndex, weights=(rowValues != np.round(rowValues)), minlength=len(attributeIDs))
+    isInteger = fractional == 0
+    integerRows = isInteger[attributeIndex]
+
+    np.savez_compressed(
+        path,
+        typeIDs=typeIDs.astype(np.int32),
+        groupIDs=np.asarray(groupIDs, dtype=np.int32)[order],
+        categoryIDs=np.asarray(categoryIDs, dtype=np.int32)[order],
+        published=np.asarray(published, dtype=bool)[order],
+        attributeIDs=attributeIDs.astype(np.int32),
+        attributeNames=np.array([a[1] or '' for a in attributes], dtype=np.str_),
+        defaultValues=np.array([a[2] if a[2] is not None else np.nan for a in attributes], dtype=np.float64),
+        presence=presence,
+        isInteger=isInteger,
+        intValues=np.round(rowValues[integerRows]).astype(np.int64),
+        floatValues=rowValues[~integerRows],
+        intOffsets=np.concatenate(([0], np.cumsum(np.where(isInteger, counts, 0)))).astype(np.int64),
+        floatOffsets=np.concatenate(([0], np.cumsum(np.where(isInteger, 0, counts)))).astype(np.int64),
+    )
+
+
+class AttributeStore:
+    """Dense per-attribute columns over a sorted type index."""
+
+    def __init__(self, typeIDs, groupIDs, categoryIDs, published, attributeIDs, attributeNames, defaultValues,
+                 presence, isInteger, intValues, floatValues, intOffsets, floatOffsets):
+        self.typeIDs = typeIDs
+        self.groupIDs = groupIDs
+        self.categoryIDs = categoryIDs
+        self.published = published
+        self.attributeIDs = attributeIDs
+        self.attributeNames = attributeNames
+        self.defaultValues = defaultValues
+        self.presence = presence
+        self.isInteger = isInteger
+        self.intValues = intValues
+        self.floatValues = floatValues
+        self.intOffsets = intOffsets
+        self.floatOffsets = floatOffsets
+        self._byName = {str(n): int(a) for n, a in zip(attributeNames, attributeIDs) if n}
+        self._columns = {}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data['typeIDs'],
+                data['groupIDs'],
+                data['categoryIDs'],
+                data['published'],
+                data['attributeIDs'],
+                data['attributeNames'],
+                data['defaultValues'],
+                data['presence'],
+                data['isInteger'],
+                data['intValues'],
+                data['floatValues'],
+                data['intOffsets'],
+                data['floatOffsets'],
+            )
+
+    def attribute_id(self, attribute):
+        """attributeID for an attributeID or attributeName."""
+        if isinstance(attribute, str):
+            if attribute not in self._byName:
+                raise KeyError(f"Unknown attribute {attribute}")
+            return self._byName[attribute]
+        return int(attribute)
+
+    def _attribute_index(self, attribute):
+        attributeID = self.attribute_id(attribute)
+        i = np.searchsorted(self.attributeIDs, attributeID)
+        if i >= len(self.attributeIDs) or self.attributeIDs[i] != attributeID:
+            raise KeyError(f"Unknown attribute {attribute}")
+        return int(i)
+
+    def column(self, attribute):
+        """(values, present) over the type index; absent types hold NaN."""
+        i = self._attribute_index(attribute)
+        cached = self._columns.get(i)
+        if cached is None:
+            present = np.unpackbits(self.presence[i], count=len(self.typeIDs)).astype(bool)
+            values = np.full(len(self.typeIDs), np.nan)
+            if self.isInteger[i]:
+                values[present] = self.intValues[self.intOffsets[i]:self.intOffsets[i + 1]]
+            else:
+                values[present] = self.floatValues[self.floatOffsets[i]:self.floatOffsets[i + 1]]
+            cached = self._columns[i] = (values, present)
+        return cached
+
+    def values(self, attribute, useDefaults=False):
+        """Dense column, with absent types set to the attribute default when useDefaults."""
+        values, present = self.column(attribute)
+        if useDefaults:
+            return np.where(present, values, self.defaultValues[self._attribute_index(attribute)])
+        return values
+
+    def get(self, typeIDs, attribute, useDefaults=False):
+        """Values of one attribute for a batch of typeIDs (NaN for unknown types)."""
+        typeIDs = np.atleast_1d(np.asarray(typeIDs, dtype=np.int64))
+        i = np.searchsorted(self.typeIDs, typeIDs)
+        i[i == len(self.typeIDs)] = 0
+        found = self.typeIDs[i] == typeIDs
+        return np.where(found, self.values(attribute, useDefaults)[i], np.nan)
+
+    def mask(self, filters, categoryIDs=None, groupIDs=None, published=True, useDefaults=False, inclusive=True):
+        """
+        Boolean mask over the type index.
+
+        filters maps attribute (ID or name) -> (low, high); either bound may be
+        None. Types without the attribute fail its filter unless useDefaults.
+        """
+        mask = np.ones(len(self.typeIDs), dtype=bool)
+        if published:
+            mask &= self.published
+        if categoryIDs is not None:
+            mask &= np.isin(self.categoryIDs, categoryIDs)
+        if groupIDs is not None:
+            mask &= np.isin(self.groupIDs, groupIDs)
+        for attribute, (low, high) in filters.items():
+            values = self.values(attribute, useDefaults)
+            with np.errstate(invalid='ignore'):
+                if low is not None:
+                    mask &= values >= low if inclusive else values > low
+                if high is not None:
+                    mask &= values <= high if inclusive else values < high
+                mask &= ~np.isnan(values)
+        return mask
+
+    def query(self, filters, categoryIDs=None, groupIDs=None, published=True, useDefaults=False, inclusive=True,
+              sort=None, descending=False, limit=None):
+        """typeIDs matching mask(...), optionally sorted by one attribute (missing values last)."""
+        index = np.nonzero(self.mask(filters, categoryIDs, groupIDs, published, useDefaults, inclusive))[0]
+        if sort is not None:
+            keys = self.values(sort, useDefaults)[index]
+            keys = -keys if descending else keys
+            index = index[np.argsort(keys, kind='stable')]
+        if limit is not None:
+            index = index[:limit]
+        return self.typeIDs[index]
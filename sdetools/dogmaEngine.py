@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+"""
+dogmaEngine.py
+
+Batch dogma evaluation: effective ship, module and charge attributes for
+many fits at once.
+
+Compile step (once per database): dgmEffectModifiers (modifierInfo, one row
+per modifier) is turned into flat modifier programs (func, domain,
+operation, modified / modifying attribute, group and skill filters per row),
+and type attributes, effects, groups, categories and required skills are
+packed into numpy arrays.
+
+Evaluation step (per batch): every ship, module, charge, skill and
+character of every fit becomes an item; every (item, attribute) pair that
+is read or written becomes a slot in one value vector. Modifier programs are
+expanded into (source slot, target slot, operation) edges with vectorised
+joins, then all slots are recomputed in passes until no value changes:
+
+    value = ((preAssign or base) * preMul / preDiv + modAdd - modSub)
+            * postMul / postDiv * (1 + postPercent / 100), or postAssign
+
+Multiplicative modifiers on non-stackable attributes are stacking penalised
+(the n-th strongest bonus and penalty are scaled by exp(-(n / 2.67) ** 2))
+unless they come from a ship, charge, skill, implant or subsystem. Assign
+operations keep the best value according to highIsGood. Additive and
+percentage modifiers sourced from skills are multiplied by the skill level.
+Passive effects always apply; online and active effects follow the module
+state.
+
+Usage:
+    from sdetools.dogmaEngine import DogmaEngine, Fit
+
+    engine = DogmaEngine.from_database('sqlite:///eve.db')
+    fits = [Fit(shipTypeID=587, modules=[(3831, 'active', None)], skills=5)]
+    result = engine.evaluate(fits)
+    result.ship(263)                  # shield capacity per fit
+    result.attributes(0, 'module', 0)  # {attributeID: value}
+
+Benchmark:
+    python -m sdetools.dogmaEngine sqlite:///eve.db --fits 1000
+"""
+
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+from sqlalchemy import Table, create_engine, func, select
+
+# Item kinds
+SHIP, MODULE, CHARGE, SKILL, CHARACTER = 0, 1, 2, 3, 4
+KINDS = {'ship': SHIP, 'module': MODULE, 'charge': CHARGE, 'skill': SKILL, 'character': CHARACTER}
+
+# Module states and the effect categories they enable
+STATES = {'offline': 0, 'online': 1, 'active': 2}
+EFFECT_MIN_STATE = {0: 0, 4: 1, 1: 2}
+
+FUNCS = {
+    'ItemModifier': 0,
+    'LocationModifier': 1,
+    'LocationGroupModifier': 2,
+    'LocationRequiredSkillModifier': 3,
+    'OwnerRequiredSkillModifier': 4,
+}
+DOMAINS = {'itemID': 0, 'shipID': 1, 'charID': 2, 'otherID': 3}
+
+PRE_ASSIGN, PRE_MUL, PRE_DIV, MOD_ADD, MOD_SUB, POST_MUL, POST_DIV, POST_PERCENT, POST_ASSIGN = -1, 0, 1, 2, 3, 4, 5, 6, 7
+
+# Ship, Charge, Skill, Implant, Subsystem
+PENALTY_EXEMPT_CATEGORIES = (6, 8, 16, 20, 32)
+PENALTY_BASE = 2.67
+
+SKILL_LEVEL = 280
+# requiredSkill1..6
+REQUIRED_SKILL_ATTRIBUTES = (182, 183, 184, 1285, 1289, 1290)
+
+Fit = namedtuple('Fit', ['shipTypeID', 'modules', 'skills'])
+Fit.__new__.__defaults__ = ((), 5)
+Fit.__doc__ = """
+shipTypeID: hull typeID.
+modules: [(typeID, state, chargeTypeID or None), ...], state 'offline' / 'online' / 'active'.
+skills: one level for every skill, or {skillTypeID: level} (missing skills are untrained).
+"""
+
+
+def _join(leftKeys, rightKeys):
+    """All (left, right) index pairs with equal keys."""
+    order = np.argsort(rightKeys, kind='stable')
+    sortedKeys = rightKeys[order]
+    lo = np.searchsorted(sortedKeys, leftKeys, side='left')
+    hi = np.searchsorted(sortedKeys, leftKeys, side='right')
+    counts = hi - lo
+    left = np.repeat(np.arange(len(leftKeys)), counts)
+    starts = np.repeat(lo - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    right = order[np.arange(len(left)) + starts]
+    return left, right
+
+
+def _csr(keys, *columns):
+    """Sort rows by key and return (uniqueKeys, offsets, sortedColumns...)."""
+    keys = np.asarray(keys, dtype=np.int64)
+    order = np.argsort(keys, kind='stable')
+    uniqueKeys, starts = np.unique(keys[order], return_index=True)
+    offsets = np.append(starts, len(order)).astype(np.int64)
+    return (uniqueKeys, offsets) + tuple(np.asarray(c)[order] for c in columns)
+
+
+def _expand(uniqueKeys, offsets, lookupKeys):
+    """For each lookup key, the CSR row indexes -> (owner, row) arrays."""
+    slot = np.searchsorted(uniqueKeys, lookupKeys)
+    slot[slot == len(uniqueKeys)] = 0
+    found = (uniqueKeys[slot] == lookupKeys) if len(uniqueKeys) else np.zeros(len(lookupKeys), bool)
+    counts = np.where(found, offsets[slot + 1] - offsets[slot], 0) if len(uniqueKeys) else np.zeros(len(lookupKeys), np.int64)
+    owner = np.repeat(np.arange(len(lookupKeys)), counts)
+    starts = np.repeat((offsets[slot] if len(uniqueKeys) else 0) - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    return owner, np.arange(len(owner)) + starts
+
+
+class EvaluationResult:
+    """Effective attribute values of one evaluated batch."""
+
+    def __init__(self, itemFit, itemKind, itemOrdinal, itemTypeID, slotItem, slotAttribute, values, passes):
+        self.itemFit = itemFit
+        self.itemKind = itemKind
+        self.itemOrdinal = itemOrdinal
+        self.itemTypeID = itemTypeID
+        self.slotItem = slotItem
+        self.slotAttribute = slotAttribute
+        self.values = values
+        self.passes = passes
+
+    def _item(self, fitIndex, kind, ordinal=0):
+        kind = KINDS.get(kind, kind)
+        match = np.nonzero((self.itemFit == fitIndex) & (self.itemKind == kind) & (self.itemOrdinal == ordinal))[0]
+        return int(match[0]) if len(match) else None
+
+    def attributes(self, fitIndex, kind='ship', ordinal=0):
+        """{attributeID: value} of one item (ordinal counts modules/charges/skills within the fit)."""
+        item = self._item(fitIndex, kind, ordinal)
+        if item is None:
+            return {}
+        lo = np.searchsorted(self.slotItem, item, side='left')
+        hi = np.searchsorted(self.slotItem, item, side='right')
+        return {int(a): float(v) for a, v in zip(self.slotAttribute[lo:hi], self.values[lo:hi])}
+
+    def ship(self, attributeID):
+        """One ship attribute for every fit (NaN where the hull lacks it)."""
+        ships = np.nonzero(self.itemKind == SHIP)[0]
+        out = np.full(int(self.itemFit.max()) + 1 if len(self.itemFit) else 0, np.nan)
+        keys = self.slotItem.astype(np.int64) * (1 << 20) + self.slotAttribute
+        wanted = ships.astype(np.int64) * (1 << 20) + attributeID
+        i = np.searchsorted(keys, wanted)
+        i[i == len(keys)] = 0
+        found = keys[i] == wanted
+        out[self.itemFit[ships[found]]] = self.values[i[found]]
+        return out
+
+
+class DogmaEngine:
+    """Compiled dogma data with a vectorised batch evaluator."""
+
+    def __init__(self, attributeDefaults, attributeStackable, attributeHighIsGood,
+                 typeIDs, typeGroups, typeCategories,
+                 attrKeys, attrOffsets, attrIDs, attrValues,
+                 progKeys, progOffsets, programs, requiredSkills):
+        # Dense per-attributeID metadata
+        self.attributeDefaults = attributeDefaults
+        self.attributeStackable = attributeStackable
+        self.attributeHighIsGood = attributeHighIsGood
+        # Sorted typeIDs with group and category
+        self.typeIDs = typeIDs
+        self.typeGroups = typeGroups
+        self.typeCategories = typeCategories
+        # CSR typeID -> base attributes
+        self.attrKeys = attrKeys
+        self.attrOffsets = attrOffsets
+        self.attrIDs = attrIDs
+        self.attrValues = attrValues
+        # CSR typeID -> modifier programs, columns in self.programs
+        self.progKeys = progKeys
+        self.progOffsets = progOffsets
+        self.programs = programs
+        # (typeID, skillTypeID) pairs for required skill filters
+        self.requiredSkills = requiredSkills
+        self.skillTypeIDs = np.unique(programs['sourceTypeID'][programs['sourceCategory'] == 16])
+
+    @classmethod
+    def from_database(cls, connectionString, schema=None):
+        from tableloader.tables import metadataCreator
+
+        engine = create_engine(connectionString)
+        metadata = metadataCreator(schema)
+        with engine.connect() as connection:
+            return cls.from_connection(connection, metadata)
+
+    @classmethod
+    def load_modifiers(cls, connection, metadata):
+        """{effectID: (effectCategory, [modifier dict, ...])} from dgmEffectModifiers."""
+        dgmEffects = Table('dgmEffects', metadata)
+        dgmEffectModifiers = Table('dgmEffectModifiers', metadata)
+        columns = ('func', 'domain', 'operation', 'modifiedAttributeID', 'modifyingAttributeID', 'skillTypeID', 'groupID')
+        effects = {}
+        for row in connection.execute(
+            select(dgmEffectModifiers.c.effectID, dgmEffects.c.effectCategory,
+                   *[dgmEffectModifiers.c[name] for name in columns])
+            .select_from(dgmEffectModifiers.join(dgmEffects, dgmEffects.c.effectID == dgmEffectModifiers.c.effectID))
+            .order_by(dgmEffectModifiers.c.effectID, dgmEffectModifiers.c.modifierIndex)
+        ):
+            effect = effects.setdefault(row[0], (row[1] or 0, []))
+            effect[1].append(dict(zip(columns, row[2:])))
+        return effects
+
+    @classmethod
+    def from_connection(cls, connection, metadata):
+        dgmAttributeTypes = Table('dgmAttributeTypes', metadata)
+        dgmTypeAttributes = Table('dgmTypeAttributes', metadata)
+        dgmTypeEffects = Table('dgmTypeEffects', metadata)
+        invTypes = Table('invTypes', metadata)
+        invGroups = Table('invGroups', metadata)
+
+        attributes = connection.execute(
+            select(
+                dgmAttributeTypes.c.attributeID,
+                dgmAttributeTypes.c.defaultValue,
+                dgmAttributeTypes.c.stackable,
+                dgmAttributeTypes.c.highIsGood
+            )
+        ).fetchall()
+        size = max([r[0] for r in attributes] + [SKILL_LEVEL]) + 1
+        defaults = np.zeros(size)
+        stackable = np.ones(size, dtype=bool)
+        highIsGood = np.ones(size, dtype=bool)
+        for attributeID, default, isStackable, isHigh in attributes:
+            defaults[attributeID] = default or 0.0
+            stackable[attributeID] = bool(isStackable) if isStackable is not None else True
+            highIsGood[attributeID] = bool(isHigh) if isHigh is not None else True
+
+        types = connection.execute(
+            select(invTypes.c.typeID, invTypes.c.groupID, invGroups.c.categoryID)
+            .select_from(invTypes.outerjoin(invGroups, invGroups.c.groupID == invTypes.c.groupID))
+        ).fetchall()
+        types.sort(key=lambda r: r[0])
+        typeIDs = np.array([r[0] for r in types], dtype=np.int64)
+        typeGroups = np.array([r[1] or 0 for r in types], dtype=np.int64)
+        typeCategories = np.array([r[2] or 0 for r in types], dtype=np.int64)
+
+        value = func.coalesce(dgmTypeAttributes.c.valueFloat, dgmTypeAttributes.c.valueInt)
+        rows = connection.execute(
+            select(dgmTypeAttributes.c.typeID, dgmTypeAttributes.c.attributeID, value)
+        ).fetchall()
+        rows = [r for r in rows if r[1] is not None and r[1] < size]
+        attrKeys, attrOffsets, attrIDs, attrValues = _csr(
+            [r[0] for r in rows],
+            np.array([r[1] for r in rows], dtype=np.int64),
+            np.array([r[2] if r[2] is not None else 0.0 for r in rows], dtype=np.float64)
+        )
+        requiredSkills = np.array(sorted({
+            (r[0], int(r[2])) for r in rows if r[1] in REQUIRED_SKILL_ATTRIBUTES and r[2]
+        }), dtype=np.int64).reshape(-1, 2)
+
+        effects = cls.load_modifiers(connection, metadata)
+        categoryOf = dict(zip(typeIDs.tolist(), typeCategories.tolist()))
+
+        program = {name: [] for name in (
+            'sourceTypeID', 'sourceCategory', 'effectCategory', 'func', 'domain', 'operation',
+            'modified', 'modifying', 'groupID', 'skillTypeID')}
+        for typeID, effectID in connection.execute(select(dgmTypeEffects.c.typeID, dgmTypeEffects.c.effectID)):
+            effect = effects.get(effectID)
+            if effect is None or effect[0] not in EFFECT_MIN_STATE:
+                continue
+            for modifier in effect[1]:
+                funcCode = FUNCS.get(modifier.get('func'))
+                domainCode = DOMAINS.get(modifier.get('domain'))
+                modified = modifier.get('modifiedAttributeID')
+                modifying = modifier.get('modifyingAttributeID')
+                operation = modifier.get('operation')
+                if funcCode is None or domainCode is None or modified is None or modifying is None or operation is None:
+                    continue
+                if modified >= size or modifying >= size:
+                    continue
+                skillTypeID = modifier.get('skillTypeID')
+                if skillTypeID == -1:
+                    skillTypeID = typeID
+                program['sourceTypeID'].append(typeID)
+                program['sourceCategory'].append(categoryOf.get(typeID, 0))
+                program['effectCategory'].append(effect[0])
+                program['func'].append(funcCode)
+                program['domain'].append(domainCode)
+                program['operation'].append(int(operation))
+                program['modified'].append(modified)
+                program['modifying'].append(modifying)
+                program['groupID'].append(modifier.get('groupID') or 0)
+                program['skillTypeID'].append(skillTypeID or 0)
+
+        program = {name: np.array(values, dtype=np.int64) for name, values in program.items()}
+        csr = _csr(program['sourceTypeID'], *program.values())
+        progKeys, progOffsets = csr[0], csr[1]
+        programs = dict(zip(program.keys(), csr[2:]))
+
+        return cls(defaults, stackable, highIsGood, typeIDs, typeGroups, typeCategories,
+                   attrKeys, attrOffsets, attrIDs, attrValues, progKeys, progOffsets, programs, requiredSkills)
+
+    def _type_lookup(self, typeIDs, column):
+        i = np.searchsorted(self.typeIDs, typeIDs)
+        i[i == len(self.typeIDs)] = 0
+        found = self.typeIDs[i] == typeIDs if len(self.typeIDs) else np.zeros(len(typeIDs), bool)
+        return np.where(found, column[i], 0)
+
+    def _items(self, fits):
+        """Flatten fits into item arrays: fit, kind, ordinal, typeID, state, other, level."""
+        fit, kind, ordinal, typeID, state, other, level = [], [], [], [], [], [], []
+
+        def add(f, k, o, t, s=2, lv=0):
+            fit.append(f); kind.append(k); ordinal.append(o); typeID.append(t)
+            state.append(s); other.append(-1); level.append(lv)
+            return len(fit) - 1
+
+        for f, spec in enumerate(fits):
+            add(f, SHIP, 0, spec.shipTypeID)
+            add(f, CHARACTER, 0, 0)
+            charges = 0
+            for m, module in enumerate(spec.modules):
+                moduleTypeID, moduleState, chargeTypeID = (tuple(module) + (None, None))[:3]
+                s = STATES.get(moduleState, moduleState) if moduleState is not None else 2
+                mi = add(f, MODULE, m, moduleTypeID, s)
+                if chargeTypeID:
+                    ci = add(f, CHARGE, charges, chargeTypeID, s)
+                    charges += 1
+                    other[mi], other[ci] = ci, mi
+            skills = spec.skills
+            if isinstance(skills, dict):
+                skillItems = sorted(skills.items())
+            else:
+                skillItems = [(int(s), skills) for s in self.skillTypeIDs]
+            for n, (skillTypeID, skillLevel) in enumerate(skillItems):
+                if skillLevel:
+                    add(f, SKILL, n, skillTypeID, 2, skillLevel)
+
+        return tuple(np.array(a, dtype=np.int64) for a in (fit, kind, ordinal, typeID, state, other, level))
+
+    def evaluate(self, fits, maxPasses=10):
+        """Evaluate a list of Fit tuples and return an EvaluationResult."""
+        itemFit, itemKind, itemOrdinal, itemTypeID, itemState, itemOther, itemLevel = self._items(fits)
+        nItems = len(itemFit)
+        itemGroup = self._type_lookup(itemTypeID, self.typeGroups)
+        itemCategory = self._type_lookup(itemTypeID, self.typeCategories)
+        shipOf = np.nonzero(itemKind == SHIP)[0][itemFit]
+        charOf = np.nonzero(itemKind == CHARACTER)[0][itemFit]
+        K = 1 << 20
+
+        # Base attribute slots
+        owner, rows = _expand(self.attrKeys, self.attrOffsets, itemTypeID)
+        baseKeys = owner * K + self.attrIDs[rows]
+        baseValues = self.attrValues[rows]
+        skillItems = np.nonzero(itemKind == SKILL)[0]
+        baseKeys = np.concatenate((baseKeys, skillItems * K + SKILL_LEVEL))
+        baseValues = np.concatenate((baseValues, itemLevel[skillItems].astype(np.float64)))
+
+        # Modifier instances whose effect is enabled by the item state
+        source, prog = _expand(self.progKeys, self.progOffsets, itemTypeID)
+        p = {name: column[prog] for name, column in self.programs.items()}
+        minState = np.select([p['effectCategory'] == 4, p['effectCategory'] == 1], [1, 2], 0)
+        keep = itemState[source] >= minState
+        source = source[keep]
+        p = {name: column[keep] for name, column in p.items()}
+
+        # Resolve targets
+        sources, targets, instances = [], [], []
+        idx = np.arange(len(source))
+        domainItem = np.select(
+            [p['domain'] == 0, p['domain'] == 1, p['domain'] == 2, p['domain'] == 3],
+            [source, shipOf[source], charOf[source], itemOther[source]], -1)
+
+        direct = (p['func'] == 0) & (domainItem >= 0)
+        instances.append(idx[direct]); targets.append(domainItem[direct])
+
+        # Location modifiers: modules on the ship, or skills for the character domain
+        location = np.isin(p['func'], (1, 2, 3)) & np.isin(p['domain'], (1, 2))
+        locKind = np.where(p['domain'] == 1, MODULE, SKILL)
+        owned = (p['func'] == 4)
+        skillPairs = self.requiredSkills
+        for mask, key, itemKey in (
+            (location & (p['func'] == 1), itemFit[source] * 8 + locKind, itemFit * 8 + itemKind),
+            (location & (p['func'] == 2), (itemFit[source] * 8 + locKind) * K + p['groupID'],
+             (itemFit * 8 + itemKind) * K + itemGroup),
+        ):
+            sel = idx[mask]
+            left, right = _join(key[sel], itemKey)
+            instances.append(sel[left]); targets.append(right)
+
+        # Required skill filters: explode items into (item, required skill) rows
+        reqOwner, reqRow = _join(itemTypeID, skillPairs[:, 0]) if len(skillPairs) else (np.empty(0, np.int64),) * 2
+        reqSkill = skillPairs[reqRow, 1] if len(skillPairs) else np.empty(0, np.int64)
+        for mask, kindOfTarget in (
+            (location & (p['func'] == 3), locKind),
+            (owned, np.full(len(source), CHARGE)),
+        ):
+            sel = idx[mask]
+            key = ((itemFit[source[sel]] * 8 + kindOfTarget[sel]) * K) + p['skillTypeID'][sel]
+            itemKey = ((itemFit[reqOwner] * 8 + itemKind[reqOwner]) * K) + reqSkill
+            left, right = _join(key, itemKey)
+            instances.append(sel[left]); targets.append(reqOwner[right])
+
+        inst = np.concatenate(instances).astype(np.int64)
+        targetItem = np.concatenate(targets).astype(np.int64)
+        sourceItem = source[inst]
+        operation = p['operation'][inst]
+        modified = p['modified'][inst]
+        modifying = p['modifying'][inst]
+
+        # Slots: every base attribute plus every attribute read or written
+        sourceKeys = sourceItem * K + modifying
+        targetKeys = targetItem * K + modified
+        slotKeys = np.unique(np.concatenate((baseKeys, sourceKeys, targetKeys)))
+        slotItem = slotKeys // K
+        slotAttribute = slotKeys % K
+        base = self.attributeDefaults[slotAttribute].copy()
+        base[np.searchsorted(slotKeys, baseKeys)] = baseValues
+        srcSlot = np.searchsorted(slotKeys, sourceKeys)
+        tgtSlot = np.searchsorted(slotKeys, targetKeys)
+
+        levelScale = np.where(
+            (itemKind[sourceItem] == SKILL) & np.isin(operation, (MOD_ADD, MOD_SUB, POST_PERCENT)),
+            itemLevel[sourceItem], 1).astype(np.float64)
+        penalised = (~self.attributeStackable[modified]) & ~np.isin(itemCategory[sourceItem], PENALTY_EXEMPT_CATEGORIES)
+        highIsGood = self.attributeHighIsGood[modified]
+        nSlots = len(slotKeys)
+
+        values = base.copy()
+        passes = 0
+        for passes in range(1, maxPasses + 1):
+            src = values[srcSlot]
+            scaled = src * levelScale
+
+            def assigned(op):
+                sel = operation == op
+                signed = np.where(highIsGood[sel], scaled[sel], -scaled[sel])
+                best = np.full(nSlots, -np.inf)
+                np.maximum.at(best, tgtSlot[sel], signed)
+                flip = np.zeros(nSlots, dtype=bool)
+                flip[tgtSlot[sel]] = ~highIsGood[sel]
+                return np.where(np.isfinite(best), np.where(flip, -best, best), np.nan)
+
+            preAssign = assigned(PRE_ASSIGN)
+            postAssign = assigned(POST_ASSIGN)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                multiplier = np.select(
+                    [operation == PRE_MUL, operation == POST_MUL, operation == PRE_DIV, operation == POST_DIV,
+                     operation == POST_PERCENT],
+                    [scaled, scaled, 1.0 / scaled, 1.0 / scaled, 1.0 + scaled / 100.0], 1.0)
+            multiplier = np.where(np.isfinite(multiplier), multiplier, 1.0)
+            isMul = np.isin(operation, (PRE_MUL, PRE_DIV, POST_MUL, POST_DIV, POST_PERCENT))
+            stage = np.isin(operation, (POST_MUL, POST_DIV, POST_PERCENT)).astype(np.int64)
+
+            factor = np.ones((2, nSlots))
+            plain = isMul & ~penalised
+            np.multiply.at(factor, (stage[plain], tgtSlot[plain]), multiplier[plain])
+
+            pen = np.nonzero(isMul & penalised & (multiplier != 1.0))[0]
+            if len(pen):
+                m = multiplier[pen]
+                group = (tgtSlot[pen] * 2 + stage[pen]) * 2 + (m > 1.0)
+                order = np.lexsort((-np.abs(m - 1.0), group))
+                sortedGroup = group[order]
+                starts = np.searchsorted(sortedGroup, sortedGroup, side='left')
+                rank = np.arange(len(order)) - starts
+                scaledM = 1.0 + (m[order] - 1.0) * np.exp(-(rank / PENALTY_BASE) ** 2)
+                np.multiply.at(factor, (stage[pen][order], tgtSlot[pen][order]), scaledM)
+
+            add = np.zeros(nSlots)
+            np.add.at(add, tgtSlot[operation == MOD_ADD], scaled[operation == MOD_ADD])
+            np.subtract.at(add, tgtSlot[operation == MOD_SUB], scaled[operation == MOD_SUB])
+
+            start = np.where(np.isnan(preAssign), base, preAssign)
+            new = (start * factor[0] + add) * factor[1]
+            new = np.where(np.isnan(postAssign), new, postAssign)
+
+            if np.allclose(new, values, rtol=1e-12, atol=0.0, equal_nan=True):
+                values = new
+                break
+            values = new
+
+        return EvaluationResult(itemFit, itemKind, itemOrdinal, itemTypeID,
+                                slotItem, slotAttribute, values, passes)
+
+
+def benchmark(connectionString, fits=1000, modulesPerFit=8, seed=0):
+    start = time.perf_counter()
+    engine = DogmaEngine.from_database(connectionString)
+    compiled = time.perf_counter()
+    print(f"Compiled {len(engine.programs['func'])} modifiers for {len(engine.progKeys)} types "
+          f"in {compiled - start:.2f}s")
+
+    rng = np.random.default_rng(seed)
+    ships = engine.typeIDs[engine.typeCategories == 6]
+    modules = engine.typeIDs[engine.typeCategories == 7]
+    if len(ships) == 0 or len(modules) == 0:
+        print("No ships or modules found")
+        return
+    batch = [
+        Fit(int(rng.choice(ships)),
+            [(int(t), 'active', None) for t in rng.choice(modules, size=modulesPerFit)],
+            5)
+        for _ in range(fits)
+    ]
+
+    start = time.perf_counter()
+    result = engine.evaluate(batch)
+    elapsed = time.perf_counter() - start
+    print(f"Evaluated {fits} fits ({len(result.values)} attribute slots, {result.passes} passes) "
+          f"in {elapsed:.2f}s ({fits / elapsed:,.0f} fits/s)")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("dogmaEngine.py connectionString [--fits N]")
+        sys.exit(1)
+    count = 1000
+    if '--fits' in sys.argv:
+        count = int(sys.argv[sys.argv.index('--fits') + 1])
+    benchmark(sys.argv[1], count)
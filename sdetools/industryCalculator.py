@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+industryCalculator.py
+
+Batch material, time and installation cost calculator for manufacturing and
+reaction jobs, built on a database produced by the converter.
+
+The industry tables are read once into numpy arrays (materials in CSR form
+per blueprint and activity). A batch of jobs is then evaluated in a single
+vectorised pass: every job is expanded over its blueprint's materials with
+np.repeat and the ME, structure and rig multipliers are applied column-wise.
+
+Rig applicability comes from rigAffectedProductGroups (a rig affects a job
+when the job's product group is listed for the rig, activity and bonus
+type). Rig strengths are the dogma attributes named in
+rigIndustryModifierSources, scaled by the rig's hiSecModifier,
+lowSecModifier or nullSecModifier. Structure role bonuses are read from the
+strEngMatBonus / strEngTimeBonus / strEngCostBonus attributes of the
+structure type. Skills and implants are not modelled; pass a time
+multiplier for them.
+
+Usage:
+    from sdetools.industryCalculator import IndustryCalculator
+
+    calc = IndustryCalculator.from_database('sqlite:///eve.db')
+    result = calc.calculate(
+        blueprintTypeIDs=[687, 691],
+        runs=[10, 1],
+        me=[10, 0],
+        te=[20, 0],
+        structureTypeIDs=[35825, 0],
+        rigSets=[(37146,), ()],
+        security=['nullsec', 'highsec'],
+    )
+    result.materials        # (jobIndex, materialTypeID, quantity) rows
+    result.times            # seconds per job
+
+Benchmark:
+    python -m sdetools.industryCalculator sqlite:///eve.db --jobs 10000
+"""
+
+import sys
+import time
+from collections import defaultdict, namedtuple
+
+import numpy as np
+from sqlalchemy import Table, create_engine, func, select
+
+MANUFACTURING = 1
+REACTION = 11
+
+ACTIVITY_KEYS = {MANUFACTURING: 'manufacturing', REACTION: 'reaction'}
+
+SECURITY_ATTRIBUTES = {
+    'highsec': 'hiSecModifier',
+    'lowsec': 'lowSecModifier',
+    'nullsec': 'nullSecModifier',
+    'wormhole': 'nullSecModifier',
+}
+
+STRUCTURE_ATTRIBUTES = {
+    'material': 'strEngMatBonus',
+    'time': 'strEngTimeBonus',
+    'cost': 'strEngCostBonus',
+}
+
+BONUS_TYPES = ('material', 'time', 'cost')
+
+JobResult = namedtuple('JobResult', ['materials', 'times', 'costs'])
+
+
+class IndustryCalculator:
+    """Vectorised ME/TE/structure/rig calculator over preloaded industry tables."""
+
+    def __init__(self, keys, offsets, materialTypeIDs, quantities, times,
+                 productGroups, rigGroups, rigBonuses, rigSecurity, structureBonuses):
+        # keys are blueprintTypeID * 100 + activityID, sorted, aligned with offsets
+        self.keys = keys
+        self.offsets = offsets
+        self.materialTypeIDs = materialTypeIDs
+        self.quantities = quantities
+        self.times = times
+        self.productGroups = productGroups
+        # (rigTypeID, activityID, bonusType) -> set(productGroupID)
+        self.rigGroups = rigGroups
+        # (rigTypeID, activityID, bonusType) -> percentage bonus
+        self.rigBonuses = rigBonuses
+        # (rigTypeID, security) -> multiplier on the rig bonus
+        self.rigSecurity = rigSecurity
+        # structureTypeID -> {bonusType: multiplier}
+        self.structureBonuses = structureBonuses
+        self._rigCache = {}
+
+    @classmethod
+    def from_database(cls, connectionString, schema=None):
+        from tableloader.tables import metadataCreator
+
+        engine = create_engine(connectionString)
+        metadata = metadataCreator(schema)
+        with engine.connect() as connection:
+            return cls.from_connection(connection, metadata)
+
+    @classmethod
+    def from_connection(cls, connection, metadata):
+        industryActivityMaterials = Table('industryActivityMaterials', metadata)
+        industryActivityProducts = Table('industryActivityProducts', metadata)
+        industryActivity = Table('industryActivity', metadata)
+        invTypes = Table('invTypes', metadata)
+        dgmTypeAttributes = Table('dgmTypeAttributes', metadata)
+        dgmAttributeTypes = Table('dgmAttributeTypes', metadata)
+        rigAffectedProductGroups = Table('rigAffectedProductGroups', metadata)
+        rigIndustryModifierSources = Table('rigIndustryModifierSources', metadata)
+        activities = (MANUFACTURING, REACTION)
+
+        rows = connection.execute(
+            select(
+                industryActivityMaterials.c.typeID,
+                industryActivityMaterials.c.activityID,
+                industryActivityMaterials.c.materialTypeID,
+                industryActivityMaterials.c.quantity
+            ).where(industryActivityMaterials.c.activityID.in_(activities))
+        ).fetchall()
+        activityRows = connection.execute(
+            select(industryActivity.c.typeID, industryActivity.c.activityID, industryActivity.c.time)
+            .where(industryActivity.c.activityID.in_(activities))
+        ).fetchall()
+
+        keyOf = lambda typeID, activityID: int(typeID) * 100 + int(activityID)
+        allKeys = np.unique(np.array(
+            [keyOf(r[0], r[1]) for r in activityRows] + [keyOf(r[0], r[1]) for r in rows],
+            dtype=np.int64
+        ))
+
+        materialKeys = np.array([keyOf(r[0], r[1]) for r in rows], dtype=np.int64)
+        order = np.argsort(materialKeys, kind='stable')
+        counts = np.bincount(np.searchsorted(allKeys, materialKeys), minlength=len(allKeys))
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        materialTypeIDs = np.array([r[2] for r in rows], dtype=np.int64)[order]
+        quantities = np.array([r[3] or 0 for r in rows], dtype=np.float64)[order]
+
+        times = np.zeros(len(allKeys))
+        for typeID, activityID, seconds in activityRows:
+            times[np.searchsorted(allKeys, keyOf(typeID, activityID))] = seconds or 0
+
+        productGroups = np.full(len(allKeys), -1, dtype=np.int64)
+        for typeID, activityID, groupID in connection.execute(
+            select(industryActivityProducts.c.typeID, industryActivityProducts.c.activityID, invTypes.c.groupID)
+            .select_from(industryActivityProducts.join(invTypes, invTypes.c.typeID == industryActivityProducts.c.productTypeID))
+            .where(industryActivityProducts.c.activityID.in_(activities))
+        ):
+            i = np.searchsorted(allKeys, keyOf(typeID, activityID))
+            if i < len(allKeys) and allKeys[i] == keyOf(typeID, activityID) and groupID is not None:
+                productGroups[i] = groupID
+
+        activityIDs = {key: activityID for activityID, key in ACTIVITY_KEYS.items()}
+
+        rigGroups = defaultdict(set)
+        for rigTypeID, activityKey, bonusType, groupID in connection.execute(
+            select(
+                rigAffectedProductGroups.c.rigTypeID,
+                rigAffectedProductGroups.c.activityKey,
+                rigAffectedProductGroups.c.bonusType,
+                rigAffectedProductGroups.c.productGroupID
+            )
+        ):
+            activityID = activityIDs.get(str(activityKey).lower())
+            if activityID is not None:
+                rigGroups[(rigTypeID, activityID, str(bonusType).lower())].add(groupID)
+
+        attributeIDs = {
+            name: attributeID for attributeID, name in connection.execute(
+                select(dgmAttributeTypes.c.attributeID, dgmAttributeTypes.c.attributeName)
+                .where(dgmAttributeTypes.c.attributeName.in_(
+                    list(SECURITY_ATTRIBUTES.values()) + list(STRUCTURE_ATTRIBUTES.values())))
+            )
+        }
+        value = func.coalesce(dgmTypeAttributes.c.valueFloat, dgmTypeAttributes.c.valueInt)
+
+        rigBonuses = {}
+        for rigTypeID, activityKey, bonusType, val in connection.execute(
+            select(
+                rigIndustryModifierSources.c.rigTypeID,
+                rigIndustryModifierSources.c.activityKey,
+                rigIndustryModifierSources.c.bonusType,
+                value
+            ).select_from(rigIndustryModifierSources.join(
+                dgmTypeAttributes,
+                (dgmTypeAttributes.c.typeID == rigIndustryModifierSources.c.rigTypeID)
+                & (dgmTypeAttributes.c.attributeID == rigIndustryModifierSources.c.dogmaAttributeID)
+            ))
+        ):
+            activityID = activityIDs.get(str(activityKey).lower())
+            if activityID is not None and val is not None:
+                rigBonuses[(rigTypeID, activityID, str(bonusType).lower())] = float(val)
+
+        rigSecurity = {}
+        structureBonuses = defaultdict(dict)
+        securityByAttribute = defaultdict(list)
+        for security, name in SECURITY_ATTRIBUTES.items():
+            if name in attributeIDs:
+                securityByAttribute[attributeIDs[name]].append(security)
+        structureByAttribute = {
+            attributeIDs[name]: bonusType for bonusType, name in STRUCTURE_ATTRIBUTES.items() if name in attributeIDs
+        }
+        wanted = list(securityByAttribute) + list(structureByAttribute)
+        if wanted:
+            for typeID, attributeID, val in connection.execute(
+                select(dgmTypeAttributes.c.typeID, dgmTypeAttributes.c.attributeID, value)
+                .where(dgmTypeAttributes.c.attributeID.in_(wanted))
+            ):
+                if val is None:
+                    continue
+                for security in securityByAttribute.get(attributeID, ()):
+                    rigSecurity[(typeID, security)] = float(val)
+                if attributeID in structureByAttribute:
+                    structureBonuses[typeID][structureByAttribute[attributeID]] = float(val)
+
+        return cls(allKeys, offsets, materialTypeIDs, quantities, times, productGroups,
+                   dict(rigGroups), rigBonuses, rigSecurity, dict(structureBonuses))
+
+    def _rig_multipliers(self, rigSet, security, activityID, productGroupID):
+        """(material, time, cost) multipliers of a rig set for one product group."""
+        cacheKey = (rigSet, security, activityID, productGroupID)
+        cached = self._rigCache.get(cacheKey)
+        if cached is not None:
+            return cached
+        multipliers = []
+        for bonusType in BONUS_TYPES:
+            multiplier = 1.0
+            for rigTypeID in rigSet:
+                key = (rigTypeID, activityID, bonusType)
+                if key in self.rigBonuses and productGroupID in self.rigGroups.get(key, ()):
+                    scale = self.rigSecurity.get((rigTypeID, security), 1.0)
+                    multiplier *= 1.0 + self.rigBonuses[key] * scale / 100.0
+            multipliers.append(multiplier)
+        self._rigCache[cacheKey] = multipliers
+        return multipliers
+
+    def calculate(self, blueprintTypeIDs, runs=1, me=0, te=0, structureTypeIDs=0, rigSets=None,
+                  security='highsec', activityIDs=MANUFACTURING, timeMultipliers=1.0,
+                  estimatedItemValues=None, costIndices=0.0, taxRates=0.0):
+        """
+        Evaluate a batch of jobs. Scalar arguments are broadcast to every job.
+
+        Returns a JobResult whose materials is an (M, 3) int64 array of
+        (jobIndex, materialTypeID, quantity), times the job durations in
+        seconds and costs the installation costs (None without
+        estimatedItemValues). Unknown blueprints yield no materials and a
+        time of NaN; a calculator without industry data raises ValueError.
+        """
+        if len(self.keys) == 0:
+            raise ValueError("No industry data loaded (industryActivity is empty)")
+        blueprintTypeIDs = np.asarray(blueprintTypeIDs, dtype=np.int64).ravel()
+        n = len(blueprintTypeIDs)
+        broadcast = lambda v, dtype=np.float64: np.broadcast_to(np.asarray(v, dtype=dtype), (n,))
+        runs = broadcast(runs)
+        me = broadcast(me)
+        te = broadcast(te)
+        activityIDs = broadcast(activityIDs, np.int64)
+        structureTypeIDs = broadcast(structureTypeIDs, np.int64)
+        timeMultipliers = broadcast(timeMultipliers)
+        if rigSets is None:
+            rigSets = [()] * n
+        if isinstance(security, str):
+            security = [security] * n
+
+        keys = blueprintTypeIDs * 100 + activityIDs
+        slot = np.searchsorted(self.keys, keys)
+        slot[slot == len(self.keys)] = 0
+        found = self.keys[slot] == keys
+
+        # Structure and rig multipliers per job, columns (material, time, cost)
+        structure = np.ones((n, 3))
+        for structureTypeID in np.unique(structureTypeIDs):
+            bonuses = self.structureBonuses.get(int(structureTypeID))
+            if bonuses:
+                mask = structureTypeIDs == structureTypeID
+                structure[mask] = [bonuses.get(b, 1.0) for b in BONUS_TYPES]
+        rig = np.ones((n, 3))
+        groups = np.where(found, self.productGroups[slot], -1)
+        for j in range(n):
+            if rigSets[j] and found[j]:
+                rig[j] = self._rig_multipliers(tuple(rigSets[j]), security[j], int(activityIDs[j]), int(groups[j]))
+
+        # Material efficiency only applies to manufacturing
+        meMultiplier = np.where(activityIDs == MANUFACTURING, 1.0 - me / 100.0, 1.0)
+        teMultiplier = np.where(activityIDs == MANUFACTURING, 1.0 - te / 100.0, 1.0)
+
+        # Expand jobs over their material rows
+        counts = np.where(found, self.offsets[slot + 1] - self.offsets[slot], 0)
+        jobIndex = np.repeat(np.arange(n), counts)
+        starts = np.repeat(self.offsets[slot] - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        rows = np.arange(len(jobIndex)) + starts
+        base = self.quantities[rows]
+        multiplier = (meMultiplier * structure[:, 0] * rig[:, 0])[jobIndex]
+        jobRuns = runs[jobIndex]
+        quantity = np.ceil(np.round(base * jobRuns * multiplier, 2))
+        quantity = np.maximum(quantity, jobRuns)
+        materials = np.column_stack((jobIndex, self.materialTypeIDs[rows], quantity.astype(np.int64)))
+
+        times = self.times[slot] * runs * teMultiplier * structure[:, 1] * rig[:, 1] * timeMultipliers
+        times = np.where(found, times, np.nan)
+
+        costs = None
+        if estimatedItemValues is not None:
+            eiv = broadcast(estimatedItemValues)
+            costs = eiv * runs * (broadcast(costIndices) * structure[:, 2] + broadcast(taxRates))
+
+        return JobResult(materials, times, costs)
+
+
+def benchmark(connectionString, jobs=10000, seed=0):
+    start = time.perf_counter()
+    calc = IndustryCalculator.from_database(connectionString)
+    loaded = time.perf_counter()
+    print(f"Loaded {len(calc.keys)} blueprint activities in {loaded - start:.2f}s")
+
+    rng = np.random.default_rng(seed)
+    manufacturing = calc.keys[calc.keys % 100 == MANUFACTURING] // 100
+    if len(manufacturing) == 0:
+        print("No manufacturing blueprints found")
+        return
+    rigTypeIDs = sorted({key[0] for key in calc.rigBonuses})
+    rigSets = [tuple(rng.choice(rigTypeIDs, size=min(3, len(rigTypeIDs)), replace=False)) if rigTypeIDs else ()
+               for _ in range(jobs)]
+    structures = [0] + sorted(calc.structureBonuses)[:3]
+
+    start = time.perf_counter()
+    result = calc.calculate(
+        blueprintTypeIDs=rng.choice(manufacturing, size=jobs),
+        runs=rng.integers(1, 100, size=jobs),
+        me=rng.integers(0, 11, size=jobs),
+        te=rng.integers(0, 11, size=jobs) * 2,
+        structureTypeIDs=rng.choice(structures, size=jobs),
+        rigSets=rigSets,
+        security=list(rng.choice(list(SECURITY_ATTRIBUTES), size=jobs)),
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Calculated {jobs} jobs ({len(result.materials)} material rows) in {elapsed:.3f}s "
+          f"({jobs / elapsed:,.0f} jobs/s)")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("industryCalculator.py connectionString [--jobs N]")
+        sys.exit(1)
+    jobs = 10000
+    if '--jobs' in sys.argv:
+        jobs = int(sys.argv[sys.argv.index('--jobs') + 1])
+    benchmark(sys.argv[1], jobs)
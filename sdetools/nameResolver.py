@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+nameResolver.py
+
+Batch item name resolution for pasted inventories and fits.
+
+The converter writes the resolver as a compressed numpy archive
+(typeNames.npz in the configured destinationPath) from the type names of
+every language (invTypes / trnTranslations tcID 8). Names are normalised
+(NFKC, casefold, collapsed whitespace) and de-duplicated, published types
+first, so every key maps to one typeID. The archive holds the keys as one
+UTF-8 blob, their typeID / languageID, and a trigram index in CSR form
+(sorted trigram codes, offsets, key postings).
+
+resolve() looks every name up in an exact hash map first. The rest are
+matched in vectorised chunks: the trigrams of the unresolved names are
+looked up with searchsorted, the postings of the selective ones are counted
+per (name, key) pair with np.unique, and the best few keys per name are
+ranked by Dice coefficient (2 * shared / (trigrams(name) + trigrams(key))).
+
+Usage:
+    from sdetools.nameResolver import NameResolver
+
+    resolver = NameResolver.load('sdeoutput/typeNames.npz')
+    typeIDs, scores = resolver.resolve(['Vexor', 'tritanium', 'Vexr Navy Isue'])
+    # exact matches score 1.0, fuzzy ones their Dice score, misses -1 / 0.0
+"""
+
+import unicodedata
+
+import numpy as np
+from sqlalchemy import Table, create_engine, select
+
+TYPE_NAME = 8
+
+# Fuzzy matching: trigrams shared by more keys than MAX_POSTINGS only count in
+# the final score, the CANDIDATES keys with most selective hits are scored
+MAX_POSTINGS = 1000
+CANDIDATES = 8
+FUZZY_CHUNK = 512
+
+
+def normalize(name):
+    """Lookup key of a name: NFKC, casefolded, single spaces."""
+    return ' '.join(unicodedata.normalize('NFKC', name or '').casefold().split())
+
+
+def trigrams(key):
+    """Trigram codes of a key padded with two leading spaces and one trailing."""
+    padded = '  ' + key + ' '
+    return [(ord(padded[i]) << 42) | (ord(padded[i + 1]) << 21) | ord(padded[i + 2]) for i in range(len(padded) - 2)]
+
+
+def _build(names):
+    """Keys and trigram index from (typeID, languageID, name, published) rows."""
+    seen = {}
+    for typeID, languageID, name, published in sorted(names, key=lambda r: (not r[3], r[0], r[1] or '')):
+        key = normalize(name)
+        if key and key not in seen:
+            seen[key] = (typeID, languageID or '')
+    keys = list(seen)
+
+    codes, postings = [], []
+    counts = np.zeros(len(keys), dtype=np.int32)
+    for i, key in enumerate(keys):
+        keyCodes = set(trigrams(key))
+        counts[i] = len(keyCodes)
+        codes.extend(keyCodes)
+        postings.extend([i] * len(keyCodes))
+    codes = np.array(codes, dtype=np.int64)
+    postings = np.array(postings, dtype=np.int32)
+    order = np.argsort(codes, kind='stable')
+    trigramCodes, starts = np.unique(codes[order], return_index=True)
+
+    return dict(
+        keys=keys,
+        typeIDs=np.array([seen[k][0] for k in keys], dtype=np.int32),
+        languageIDs=np.array([seen[k][1] for k in keys], dtype=np.str_),
+        trigramCounts=counts,
+        trigramCodes=trigramCodes,
+        trigramOffsets=np.append(starts, len(order)).astype(np.int64),
+        postings=postings[order],
+    )
+
+
+def write_resolver(path, names):
+    """Write the archive from (typeID, languageID, name, published) rows."""
+    data = _build(names)
+    keys = data.pop('keys')
+    np.savez_compressed(
+        path,
+        keys=np.frombuffer('\n'.join(keys).encode('utf-8'), dtype=np.uint8),
+        **data
+    )
+
+
+class NameResolver:
+    """Exact and trigram fuzzy name lookup over every language."""
+
+    def __init__(self, keys, typeIDs, languageIDs, trigramCounts, trigramCodes, trigramOffsets, postings):
+        self.keys = keys
+        self.typeIDs = typeIDs
+        self.languageIDs = languageIDs
+        self.trigramCounts = trigramCounts
+        self.trigramCodes = trigramCodes
+        self.trigramOffsets = trigramOffsets
+        self.postings = postings
+        self.exact = {key: i for i, key in enumerate(keys)}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            blob = data['keys'].tobytes().decode('utf-8')
+            return cls(
+                blob.split('\n') if blob else [],
+                data['typeIDs'],
+                data['languageIDs'],
+                data['trigramCounts'],
+                data['trigramCodes'],
+                data['trigramOffsets'],
+                data['postings'],
+            )
+
+    @classmethod
+    def from_database(cls, connectionString, schema=None):
+        from tableloader.tables import metadataCreator
+
+        engine = create_engine(connectionString)
+        metadata = metadataCreator(schema)
+        with engine.connect() as connection:
+            return cls.from_connection(connection, metadata)
+
+    @classmethod
+    def from_connection(cls, connection, metadata):
+        invTypes = Table('invTypes', metadata)
+        trnTranslations = Table('trnTranslations', metadata)
+
+        published = {}
+        names = []
+        for typeID, typeName, isPublished in connection.execute(
+            select(invTypes.c.typeID, invTypes.c.typeName, invTypes.c.published)
+        ):
+            published[typeID] = bool(isPublished)
+            names.append((typeID, '', typeName, bool(isPublished)))
+        for typeID, languageID, text in connection.execute(
+            select(trnTranslations.c.keyID, trnTranslations.c.languageID, trnTranslations.c.text)
+            .where(trnTranslations.c.tcID == TYPE_NAME)
+        ):
+            names.append((typeID, languageID, text, published.get(typeID, False)))
+
+        data = _build(names)
+        return cls(data.pop('keys'), **data)
+
+    def resolve(self, names, minScore=0.5):
+        """
+        (typeIDs, scores) for a batch of names. Exact matches (after
+        normalisation) score 1.0; others take the best trigram match with a
+        Dice score of at least minScore, or typeID -1 and score 0.0.
+        """
+        count = len(names)
+        index = np.full(count, -1, dtype=np.int64)
+        scores = np.zeros(count)
+
+        queryKeys = [normalize(n) for n in names]
+        fuzzy = []
+        for i, key in enumerate(queryKeys):
+            hit = self.exact.get(key)
+            if hit is not None:
+                index[i] = hit
+                scores[i] = 1.0
+            elif key:
+                fuzzy.append(i)
+
+        for chunk in range(0, len(fuzzy), FUZZY_CHUNK):
+            rows = fuzzy[chunk:chunk + FUZZY_CHUNK]
+            for i, key, score in self._fuzzy([queryKeys[r] for r in rows]):
+                if score >= minScore:
+                    index[rows[i]] = key
+                    scores[rows[i]] = score
+
+        typeIDs = np.where(index >= 0, self.typeIDs[np.maximum(index, 0)] if len(self.typeIDs) else -1, -1)
+        return typeIDs, scores
+
+    def _fuzzy(self, queryKeys):
+        """(query, key, Dice score) of the best match for each query that has candidates."""
+        if not len(self.trigramCodes):
+            return []
+        queryCodes = [set(trigrams(k)) for k in queryKeys]
+        queryCounts = np.array([len(c) for c in queryCodes], dtype=np.int64)
+        owner = np.repeat(np.arange(len(queryKeys)), queryCounts)
+        codes = np.fromiter((c for cs in queryCodes for c in cs), dtype=np.int64, count=int(queryCounts.sum()))
+
+        slot = np.searchsorted(self.trigramCodes, codes)
+        slot[slot == len(self.trigramCodes)] = 0
+        found = self.trigramCodes[slot] == codes
+        owner, slot = owner[found], slot[found]
+        lengths = self.trigramOffsets[slot + 1] - self.trigramOffsets[slot]
+
+        # Candidates come from the selective trigrams only (plus each query's
+        # rarest one), so common trigrams do not blow up the pair count
+        rarest = np.full(len(queryKeys), np.iinfo(np.int64).max)
+        np.minimum.at(rarest, owner, lengths)
+        keep = (lengths <= MAX_POSTINGS) | (lengths == rarest[owner])
+        owner, slot, lengths = owner[keep], slot[keep], lengths[keep]
+
+        pairOwner = np.repeat(owner, lengths)
+        starts = np.repeat(self.trigramOffsets[slot] - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        pairKey = self.postings[np.arange(len(pairOwner)) + starts].astype(np.int64)
+        pairs, hits = np.unique(pairOwner * len(self.typeIDs) + pairKey, return_counts=True)
+        pairOwner, pairKey = pairs // len(self.typeIDs), pairs % len(self.typeIDs)
+
+        # Top candidates per query by hits, then exact Dice on the full trigram sets
+        order = np.lexsort((-hits, pairOwner))
+        groupStart = np.searchsorted(pairOwner[order], pairOwner[order], side='left')
+        top = order[(np.arange(len(order)) - groupStart) < CANDIDATES]
+
+        best = {}
+        for q, k in zip(pairOwner[top].tolist(), pairKey[top].tolist()):
+            keyCodes = set(trigrams(self.keys[k]))
+            score = 2.0 * len(queryCodes[q] & keyCodes) / (len(queryCodes[q]) + len(keyCodes))
+            current = best.get(q)
+            if current is None or score > current[1] or (score == current[1] and len(keyCodes) < self.trigramCounts[current[0]]):
+                best[q] = (k, score)
+        return [(q, k, score) for q, (k, score) in best.items()]
+
+    def language(self, name):
+        """languageID of the exact key a name matches, or None."""
+        hit = self.exact.get(normalize(name))
+        return str(self.languageIDs[hit]) if hit is not None else None
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+planetaryChains.py
+
+Planetary interaction production chains.
+
+build_chains turns the planetSchematics / planetSchematicsTypeMap rows into
+one Chain per output product: its schematic, tier (P0 raw resources are
+tier 0, every product is one tier above its highest input), the P0
+resources consumed per schematic cycle, and the serial chain time (own
+cycle time plus the slowest input chain). The converter uses it to fill
+planetSchematicsChain and planetSchematicsChainInputs; PlanetaryChains
+wraps the same result for in-process planning.
+
+Usage:
+    from sdetools.planetaryChains import PlanetaryChains
+
+    chains = PlanetaryChains.from_database('sqlite:///eve.db')
+    chains.tier(2867)                     # 4
+    chains.p0_inputs(2867, quantity=10)   # {typeID: units of P0}
+    chains.expand(2867, quantity=10)      # per-product schematic cycles
+"""
+
+from collections import namedtuple
+
+Chain = namedtuple('Chain', [
+    'typeID', 'schematicID', 'tier', 'outputQuantity', 'cycleTime', 'chainCycleTime', 'inputs', 'p0Inputs'
+])
+
+
+def build_chains(schematics, typeRows):
+    """
+    schematics maps schematicID -> cycleTime; typeRows are
+    (schematicID, typeID, quantity, isInput) tuples.
+
+    Returns {productTypeID: Chain}. inputs are the direct inputs per cycle,
+    p0Inputs the raw resources per cycle with intermediates counted as
+    fractional cycles.
+    """
+    inputs = {}
+    outputs = {}
+    for schematicID, typeID, quantity, isInput in typeRows:
+        if isInput:
+            inputs.setdefault(schematicID, []).append((typeID, quantity or 0))
+        else:
+            outputs.setdefault(schematicID, []).append((typeID, quantity or 0))
+
+    # One schematic per product, lowest schematicID first
+    producer = {}
+    for schematicID in sorted(outputs):
+        for typeID, quantity in outputs[schematicID]:
+            if typeID not in producer and quantity:
+                producer[typeID] = (schematicID, quantity)
+
+    chains = {}
+    visiting = set()
+
+    def resolve(typeID):
+        if typeID in chains:
+            return chains[typeID]
+        if typeID in visiting:
+            raise ValueError(f"Planetary schematic cycle through typeID {typeID}")
+        visiting.add(typeID)
+        schematicID, outputQuantity = producer[typeID]
+        cycleTime = schematics.get(schematicID) or 0
+        direct = sorted(inputs.get(schematicID, []))
+        tier = 1
+        inputChainTime = 0
+        p0 = {}
+        for inputTypeID, quantity in direct:
+            if inputTypeID in producer:
+                child = resolve(inputTypeID)
+                tier = max(tier, child.tier + 1)
+                inputChainTime = max(inputChainTime, child.chainCycleTime)
+                cycles = quantity / child.outputQuantity
+                for rawTypeID, rawQuantity in child.p0Inputs.items():
+                    p0[rawTypeID] = p0.get(rawTypeID, 0.0) + cycles * rawQuantity
+            else:
+                p0[inputTypeID] = p0.get(inputTypeID, 0.0) + quantity
+        visiting.discard(typeID)
+        chains[typeID] = Chain(typeID, schematicID, tier, outputQuantity, cycleTime,
+                               cycleTime + inputChainTime, direct, p0)
+        return chains[typeID]
+
+    for typeID in sorted(producer):
+        resolve(typeID)
+    return chains
+
+
+class PlanetaryChains:
+    """In-memory PI chain lookups."""
+
+    def __init__(self, chains):
+        self.chains = chains
+
+    @classmethod
+    def from_database(cls, connectionString, schema=None):
+        from sqlalchemy import create_engine
+        from tableloader.tables import metadataCreator
+
+        engine = create_engine(connectionString)
+        metadata = metadataCreator(schema)
+        with engine.connect() as connection:
+            return cls.from_connection(connection, metadata)
+
+    @classmethod
+    def from_connection(cls, connection, metadata):
+        from sqlalchemy import Table, select
+
+        planetSchematics = Table('planetSchematics', metadata)
+        planetSchematicsTypeMap = Table('planetSchematicsTypeMap', metadata)
+        schematics = dict(connection.execute(
+            select(planetSchematics.c.schematicID, planetSchematics.c.cycleTime)
+        ).fetchall())
+        typeRows = connection.execute(
+            select(
+                planetSchematicsTypeMap.c.schematicID,
+                planetSchematicsTypeMap.c.typeID,
+                planetSchematicsTypeMap.c.quantity,
+                planetSchematicsTypeMap.c.isInput
+            )
+        ).fetchall()
+        return cls(build_chains(schematics, typeRows))
+
+    def tier(self, typeID):
+        """Tier of a product, 0 for raw resources."""
+        chain = self.chains.get(typeID)
+        return chain.tier if chain is not None else 0
+
+    def p0_inputs(self, typeID, quantity=1):
+        """Raw resources needed for quantity units of typeID."""
+        chain = self.chains.get(typeID)
+        if chain is None:
+            return {typeID: float(quantity)}
+        cycles = quantity / chain.outputQuantity
+        return {rawTypeID: cycles * rawQuantity for rawTypeID, rawQuantity in chain.p0Inputs.items()}
+
+    def expand(self, typeID, quantity=1):
+        """{productTypeID: schematic cycles} needed for quantity units, including typeID itself."""
+        cycles = {}
+
+        def walk(productTypeID, units):
+            chain = self.chains.get(productTypeID)
+            if chain is None:
+                return
+            runs = units / chain.outputQuantity
+            cycles[productTypeID] = cycles.get(productTypeID, 0.0) + runs
+            for inputTypeID, inputQuantity in chain.inputs:
+                walk(inputTypeID, runs * inputQuantity)
+
+        walk(typeID, quantity)
+        return cycles
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+reprocessing.py
+
+Batch reprocessing yields from a sparse type x material matrix.
+
+The converter writes the matrix as a compressed numpy archive
+(reprocessingMatrix.npz in the configured destinationPath), built from
+invTypeMaterials. Rows are the sorted typeIDs that can be reprocessed,
+columns the sorted materialTypeIDs; the matrix itself is stored in CSR form
+(offsets / columns / quantities) next to each type's portionSize.
+
+A batch appraisal looks every line up with one searchsorted, expands the
+lines over their matrix rows with np.repeat and sums the results per
+material with np.bincount, so no per-line Python work is done.
+
+Usage:
+    from sdetools.reprocessing import ReprocessingMatrix
+
+    matrix = ReprocessingMatrix.load('sdeoutput/reprocessingMatrix.npz')
+    materialTypeIDs, quantities = matrix.yields([1230, 17470], [10000, 2500], 0.8)
+"""
+
+import numpy as np
+
+
+def write_matrix(path, typeIDs, materialTypeIDs, quantities, portionSizes):
+    """
+    Write the archive from parallel (typeID, materialTypeID, quantity) rows.
+    portionSizes maps typeID -> portionSize (missing types default to 1).
+    """
+    typeIDs = np.asarray(typeIDs, dtype=np.int64)
+    materialTypeIDs = np.asarray(materialTypeIDs, dtype=np.int64)
+    quantities = np.asarray(quantities, dtype=np.int64)
+
+    rowIDs, rowIndex = np.unique(typeIDs, return_inverse=True)
+    columnIDs, columnIndex = np.unique(materialTypeIDs, return_inverse=True)
+    order = np.lexsort((columnIndex, rowIndex))
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(rowIndex, minlength=len(rowIDs)))))
+    portions = np.array([portionSizes.get(int(t)) or 1 for t in rowIDs], dtype=np.int64)
+
+    np.savez_compressed(
+        path,
+        typeIDs=rowIDs.astype(np.int32),
+        materialTypeIDs=columnIDs.astype(np.int32),
+        portionSizes=portions.astype(np.int32),
+        offsets=offsets.astype(np.int64),
+        columns=columnIndex[order].astype(np.int32),
+        quantities=quantities[order],
+    )
+
+
+class ReprocessingMatrix:
+    """Sparse reprocessing matrix with vectorised batch yields."""
+
+    def __init__(self, typeIDs, materialTypeIDs, portionSizes, offsets, columns, quantities):
+        self.typeIDs = typeIDs
+        self.materialTypeIDs = materialTypeIDs
+        self.portionSizes = portionSizes
+        self.offsets = offsets
+        self.columns = columns
+        self.quantities = quantities
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data['typeIDs'],
+                data['materialTypeIDs'],
+                data['portionSizes'],
+                data['offsets'],
+                data['columns'],
+                data['quantities'],
+            )
+
+    def materials(self, typeID):
+        """[(materialTypeID, quantity), ...] for one portion of typeID."""
+        i = np.searchsorted(self.typeIDs, typeID)
+        if i >= len(self.typeIDs) or self.typeIDs[i] != typeID:
+            return []
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return [(int(self.materialTypeIDs[c]), int(q)) for c, q in zip(self.columns[lo:hi], self.quantities[lo:hi])]
+
+    def yields(self, typeIDs, quantities, efficiency=1.0):
+        """
+        Summed reprocessing output of a list of item stacks.
+
+        efficiency is a scalar or one value per line (e.g. per-ore yields).
+        Only whole portions are reprocessed and every line is floored
+        separately, as in game. Returns (materialTypeIDs, quantities) for the
+        materials with a non-zero total; unknown typeIDs are ignored.
+        """
+        typeIDs = np.asarray(typeIDs, dtype=np.int64).ravel()
+        n = len(typeIDs)
+        quantities = np.broadcast_to(np.asarray(quantities, dtype=np.int64), (n,))
+        efficiency = np.broadcast_to(np.asarray(efficiency, dtype=np.float64), (n,))
+
+        row = np.searchsorted(self.typeIDs, typeIDs)
+        row[row == len(self.typeIDs)] = 0
+        found = self.typeIDs[row] == typeIDs
+
+        portions = np.where(found, quantities // self.portionSizes[row], 0)
+        counts = np.where(found, self.offsets[row + 1] - self.offsets[row], 0)
+        line = np.repeat(np.arange(n), counts)
+        starts = np.repeat(self.offsets[row] - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        entries = np.arange(len(line)) + starts
+
+        output = np.floor(self.quantities[entries] * portions[line] * efficiency[line])
+        totals = np.bincount(self.columns[entries], weights=output, minlength=len(self.materialTypeIDs))
+        nonzero = np.nonzero(totals)[0]
+        return self.materialTypeIDs[nonzero].astype(np.int64), totals[nonzero].astype(np.int64)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+skillTraining.py
+
+Batch skill point and training time calculation.
+
+Skill ranks (skillTimeConstant), primary/secondary attributes and the
+prerequisite closure are read once from a converted database. A batch of
+skill plans is passed as flat arrays of (planIndex, skillID, fromLevel,
+toLevel) entries plus one row of character attributes per plan; SP and
+training minutes are computed for every entry at once and summed per plan
+with np.bincount.
+
+SP to reach a level is rank times 250, 1415, 8000, 45255 or 256000
+(250 * sqrt(32) ** (L - 1), rounded as the client does). Training speed is
+primary + secondary / 2 SP per minute; the dogma attribute IDs a skill
+stores (164-168) are mapped to chrAttributes with CHARACTER_ATTRIBUTES.
+
+Usage:
+    from sdetools.skillTraining import SkillTraining
+
+    training = SkillTraining.from_database('sqlite:///eve.db')
+    plan = training.plan_for(587)               # [(skillID, level), ...]
+    sp, seconds = training.train(
+        planIndex=[0] * len(plan),
+        skillIDs=[s for s, _ in plan],
+        fromLevels=0,
+        toLevels=[l for _, l in plan],
+        attributes=[[20, 20, 20, 20, 20]],      # columns follow training.attributeIDs
+    )
+"""
+
+import numpy as np
+from sqlalchemy import Table, create_engine, func, select
+
+# Cumulative SP for levels 0..5 at rank 1
+SP_PER_LEVEL = np.array([0, 250, 1415, 8000, 45255, 256000], dtype=np.float64)
+
+PRIMARY_ATTRIBUTE = 180
+SECONDARY_ATTRIBUTE = 181
+SKILL_TIME_CONSTANT = 275
+
+# Dogma attribute stored in a skill's primary/secondary attribute -> chrAttributes.attributeID
+CHARACTER_ATTRIBUTES = {
+    164: 1,  # charisma
+    165: 2,  # intelligence
+    166: 3,  # memory
+    167: 4,  # perception
+    168: 5,  # willpower
+}
+
+
+class SkillTraining:
+    """Vectorised SP and training time over preloaded skill data."""
+
+    def __init__(self, attributeIDs, skillIDs, ranks, primary, secondary, closure):
+        # Character attribute IDs (chrAttributes), defines the column order of attribute rows
+        self.attributeIDs = attributeIDs
+        self.skillIDs = skillIDs
+        self.ranks = ranks
+        # Column index into attributeIDs, -1 when the skill has no such attribute
+        self.primary = primary
+        self.secondary = secondary
+        # typeID -> [(skillID, level, depth), ...]
+        self.closure = closure
+
+    @classmethod
+    def from_database(cls, connectionString, schema=None):
+        from tableloader.tables import metadataCreator
+
+        engine = create_engine(connectionString)
+        metadata = metadataCreator(schema)
+        with engine.connect() as connection:
+            return cls.from_connection(connection, metadata)
+
+    @classmethod
+    def from_connection(cls, connection, metadata):
+        chrAttributes = Table('chrAttributes', metadata)
+        dgmTypeAttributes = Table('dgmTypeAttributes', metadata)
+        skillPrerequisiteClosure = Table('skillPrerequisiteClosure', metadata)
+
+        attributeIDs = np.array(sorted(
+            r[0] for r in connection.execute(select(chrAttributes.c.attributeID)).fetchall()
+        ), dtype=np.int64)
+
+        value = func.coalesce(dgmTypeAttributes.c.valueFloat, dgmTypeAttributes.c.valueInt)
+        skills = {}
+        for typeID, attributeID, val in connection.execute(
+            select(dgmTypeAttributes.c.typeID, dgmTypeAttributes.c.attributeID, value)
+            .where(dgmTypeAttributes.c.attributeID.in_((PRIMARY_ATTRIBUTE, SECONDARY_ATTRIBUTE, SKILL_TIME_CONSTANT)))
+        ):
+            skills.setdefault(typeID, {})[attributeID] = val
+        # Only types with a training time constant are skills
+        skillIDs = np.array(sorted(t for t, v in skills.items() if v.get(SKILL_TIME_CONSTANT)), dtype=np.int64)
+
+        def column(skillID, dogmaAttribute):
+            """Column of the character attribute a skill trains with, -1 when the skill has none."""
+            value = skills[skillID].get(dogmaAttribute)
+            if not value:
+                return -1
+            attributeID = CHARACTER_ATTRIBUTES.get(int(value))
+            if attributeID is None or attributeID not in attributeIDs:
+                raise ValueError(f"Skill {skillID} uses unknown character attribute {int(value)}")
+            return int(np.searchsorted(attributeIDs, attributeID))
+
+        ranks = np.array([skills[t][SKILL_TIME_CONSTANT] for t in skillIDs], dtype=np.float64)
+        primary = np.array([column(t, PRIMARY_ATTRIBUTE) for t in skillIDs], dtype=np.int64)
+        secondary = np.array([column(t, SECONDARY_ATTRIBUTE) for t in skillIDs], dtype=np.int64)
+
+        closure = {}
+        for typeID, skillID, level, depth in connection.execute(
+            select(
+                skillPrerequisiteClosure.c.typeID,
+                skillPrerequisiteClosure.c.skillID,
+                skillPrerequisiteClosure.c.level,
+                skillPrerequisiteClosure.c.depth
+            )
+        ):
+            closure.setdefault(typeID, []).append((skillID, level, depth))
+
+        return cls(attributeIDs, skillIDs, ranks, primary, secondary, closure)
+
+    def plan_for(self, typeID, trained=None):
+        """
+        [(skillID, level), ...] needed to use typeID, deepest prerequisites
+        first. trained maps skillID -> current level; satisfied skills are
+        left out.
+        """
+        trained = trained or {}
+        entries = sorted(self.closure.get(typeID, []), key=lambda e: (-e[2], e[0]))
+        return [(skillID, level) for skillID, level, _depth in entries if trained.get(skillID, 0) < level]
+
+    def skill_points(self, skillIDs, levels):
+        """Cumulative SP at the given levels."""
+        index = self._index(skillIDs)
+        levels = np.clip(np.broadcast_to(np.asarray(levels, dtype=np.int64), index.shape), 0, 5)
+        return np.where(index >= 0, np.round(SP_PER_LEVEL[levels] * self.ranks[index]), 0.0)
+
+    def train(self, planIndex, skillIDs, fromLevels, toLevels, attributes):
+        """
+        Total SP and training seconds per plan.
+
+        planIndex, skillIDs, fromLevels and toLevels are parallel arrays (the
+        levels may be scalars); attributes is a (plans, len(attributeIDs))
+        array of attribute values. Unknown skills contribute nothing.
+        """
+        planIndex = np.asarray(planIndex, dtype=np.int64).ravel()
+        skillIDs = np.asarray(skillIDs, dtype=np.int64).ravel()
+        attributes = np.atleast_2d(np.asarray(attributes, dtype=np.float64))
+        plans = len(attributes)
+
+        index = self._index(skillIDs)
+        known = index >= 0
+        sp = np.maximum(self.skill_points(skillIDs, toLevels) - self.skill_points(skillIDs, fromLevels), 0.0)
+
+        safe = np.where(known, index, 0)
+        missing = known & ((self.primary[safe] < 0) | (self.secondary[safe] < 0))
+        if missing.any():
+            raise ValueError(f"Skills without training attributes: {sorted(set(skillIDs[missing].tolist()))}")
+        primary = attributes[planIndex, np.where(known, self.primary[safe], 0)]
+        secondary = attributes[planIndex, np.where(known, self.secondary[safe], 0)]
+        rate = primary + secondary / 2.0
+        minutes = np.where(known & (rate > 0), sp / np.where(rate > 0, rate, 1.0), 0.0)
+
+        totalSP = np.bincount(planIndex, weights=sp, minlength=plans)
+        totalSeconds = np.bincount(planIndex, weights=minutes * 60.0, minlength=plans)
+        return totalSP, totalSeconds
+
+    def _index(self, skillIDs):
+        skillIDs = np.atleast_1d(np.asarray(skillIDs, dtype=np.int64))
+        if len(self.skillIDs) == 0:
+            return np.full(skillIDs.shape, -1)
+        index = np.searchsorted(self.skillIDs, skillIDs)
+        index[index == len(self.skillIDs)] = 0
+        return np.where(self.skillIDs[index] == skillIDs, index, -1)
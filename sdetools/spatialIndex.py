@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+spatialIndex.py
+
+Per-solar-system spatial index over celestials and stations.
+
+The converter writes the index as a compressed numpy archive
+(celestialIndex.npz in the configured destinationPath). Objects are grouped
+by solar system and, inside a system, sorted by their distance from the
+system origin (the star). Because |r_object - r_query| can never exceed the
+distance between object and query point, a nearest lookup only has to look
+at the slice of objects whose radius lies within the current best distance
+of the query radius.
+
+Usage:
+    from sdetools.spatialIndex import CelestialIndex
+
+    index = CelestialIndex.load('sdeoutput/celestialIndex.npz')
+    itemID, distance = index.nearest(30000142, x, y, z)
+    planets = index.within(30000142, x, y, z, 1.0e10, groupIDs=[7])
+"""
+
+import numpy as np
+
+
+def write_index(path, itemIDs, typeIDs, groupIDs, solarSystemIDs, positions):
+    """
+    Write the index archive.
+
+    positions is an (N, 3) array of system-local coordinates in metres.
+    """
+    itemIDs = np.asarray(itemIDs, dtype=np.int64)
+    typeIDs = np.asarray(typeIDs, dtype=np.int64)
+    groupIDs = np.asarray(groupIDs, dtype=np.int64)
+    solarSystemIDs = np.asarray(solarSystemIDs, dtype=np.int64)
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+
+    radii = np.sqrt(np.einsum('ij,ij->i', positions, positions))
+    order = np.lexsort((radii, solarSystemIDs))
+    systemIDs, starts = np.unique(solarSystemIDs[order], return_index=True)
+    offsets = np.append(starts, len(order))
+
+    np.savez_compressed(
+        path,
+        systemIDs=systemIDs.astype(np.int32),
+        offsets=offsets.astype(np.int64),
+        itemIDs=itemIDs[order].astype(np.int32),
+        typeIDs=typeIDs[order].astype(np.int32),
+        groupIDs=groupIDs[order].astype(np.int32),
+        positions=positions[order],
+        radii=radii[order],
+    )
+
+
+class CelestialIndex:
+    """Nearest-object and radius queries over one index archive."""
+
+    def __init__(self, systemIDs, offsets, itemIDs, typeIDs, groupIDs, positions, radii):
+        self.systemIDs = systemIDs
+        self.offsets = offsets
+        self.itemIDs = itemIDs
+        self.typeIDs = typeIDs
+        self.groupIDs = groupIDs
+        self.positions = positions
+        self.radii = radii
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data['systemIDs'],
+                data['offsets'],
+                data['itemIDs'],
+                data['typeIDs'],
+                data['groupIDs'],
+                data['positions'],
+                data['radii'],
+            )
+
+    def _system(self, solarSystemID, groupIDs=None):
+        """Return (itemIDs, positions, radii) for one system, optionally filtered by group."""
+        i = np.searchsorted(self.systemIDs, solarSystemID)
+        if i >= len(self.systemIDs) or self.systemIDs[i] != solarSystemID:
+            return None
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        itemIDs = self.itemIDs[lo:hi]
+        positions = self.positions[lo:hi]
+        radii = self.radii[lo:hi]
+        if groupIDs is not None:
+            mask = np.isin(self.groupIDs[lo:hi], groupIDs)
+            itemIDs, positions, radii = itemIDs[mask], positions[mask], radii[mask]
+        return itemIDs, positions, radii
+
+    def items(self, solarSystemID):
+        """All indexed itemIDs of a system, ordered by distance from the star."""
+        found = self._system(solarSystemID)
+        return found[0] if found is not None else np.empty(0, dtype=np.int32)
+
+    def nearest(self, solarSystemID, x, y, z, groupIDs=None):
+        """
+        Return (itemID, distance) of the object closest to (x, y, z), or
+        (None, None) if the system has no matching objects.
+        """
+        found = self._system(solarSystemID, groupIDs)
+        if found is None or len(found[0]) == 0:
+            return None, None
+        itemIDs, positions, radii = found
+
+        point = np.array((x, y, z), dtype=np.float64)
+        queryRadius = np.sqrt(point @ point)
+
+        # Seed the search with the objects either side of the query radius,
+        # then only examine objects the triangle inequality cannot rule out.
+        i = np.searchsorted(radii, queryRadius)
+        seed = positions[max(i - 1, 0):i + 1] - point
+        best = np.sqrt(np.einsum('ij,ij->i', seed, seed).min())
+
+        lo = np.searchsorted(radii, queryRadius - best, side='left')
+        hi = np.searchsorted(radii, queryRadius + best, side='right')
+        delta = positions[lo:hi] - point
+        distances = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+        j = int(np.argmin(distances))
+        return int(itemIDs[lo + j]), float(distances[j])
+
+    def nearest_many(self, solarSystemIDs, points, groupIDs=None):
+        """
+        Batch form of nearest(). Returns (itemIDs, distances) arrays; misses
+        are reported as itemID -1 and distance NaN.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        resultIDs = np.full(len(points), -1, dtype=np.int64)
+        resultDistances = np.full(len(points), np.nan)
+        for n, (solarSystemID, point) in enumerate(zip(solarSystemIDs, points)):
+            itemID, distance = self.nearest(solarSystemID, point[0], point[1], point[2], groupIDs)
+            if itemID is not None:
+                resultIDs[n] = itemID
+                resultDistances[n] = distance
+        return resultIDs, resultDistances
+
+    def within(self, solarSystemID, x, y, z, distance, groupIDs=None):
+        """Return [(itemID, distance), ...] within distance metres of (x, y, z), nearest first."""
+        found = self._system(solarSystemID, groupIDs)
+        if found is None:
+            return []
+        itemIDs, positions, radii = found
+
+        point = np.array((x, y, z), dtype=np.float64)
+        queryRadius = np.sqrt(point @ point)
+        lo = np.searchsorted(radii, queryRadius - distance, side='left')
+        hi = np.searchsorted(radii, queryRadius + distance, side='right')
+        delta = positions[lo:hi] - point
+        distances = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+        hits = np.nonzero(distances <= distance)[0]
+        hits = hits[np.argsort(distances[hits], kind='stable')]
+        return [(int(itemIDs[lo + k]), float(distances[k])) for k in hits]
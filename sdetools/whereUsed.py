@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+whereUsed.py
+
+Reverse industry lookups: which blueprints consume a material, which need a
+skill, and which make a product.
+
+The converter writes the inverted adjacency as a compressed numpy archive
+(industryWhereUsed.npz in the configured destinationPath). Each relation is
+stored in CSR form: a sorted key array, an offsets array one longer than the
+keys, and parallel blueprintTypeID / activityID / value arrays where value is
+the material quantity, required skill level or product quantity.
+
+Usage:
+    from sdetools.whereUsed import WhereUsed
+
+    index = WhereUsed.load('sdeoutput/industryWhereUsed.npz')
+    for blueprintTypeID, activityID, quantity in index.materials(34):
+        ...
+    makers = index.products(587, activityIDs=[1])
+"""
+
+import numpy as np
+
+RELATIONS = ('material', 'skill', 'product')
+
+
+def _csr(keys, blueprintTypeIDs, activityIDs, values):
+    keys = np.asarray(keys, dtype=np.int64)
+    blueprintTypeIDs = np.asarray(blueprintTypeIDs, dtype=np.int64)
+    activityIDs = np.asarray(activityIDs, dtype=np.int64)
+    values = np.asarray(values, dtype=np.int64)
+
+    order = np.lexsort((activityIDs, blueprintTypeIDs, keys))
+    uniqueKeys, starts = np.unique(keys[order], return_index=True)
+    offsets = np.append(starts, len(order))
+    return (
+        uniqueKeys.astype(np.int32),
+        offsets.astype(np.int64),
+        blueprintTypeIDs[order].astype(np.int32),
+        activityIDs[order].astype(np.int8),
+        values[order].astype(np.int64),
+    )
+
+
+def write_index(path, materials, skills, products):
+    """
+    Write the archive. Each argument is an iterable of
+    (keyTypeID, blueprintTypeID, activityID, value) tuples.
+    """
+    arrays = {}
+    for relation, rows in zip(RELATIONS, (materials, skills, products)):
+        rows = list(rows)
+        columns = list(zip(*rows)) if rows else ([], [], [], [])
+        keys, offsets, blueprintTypeIDs, activityIDs, values = _csr(*columns)
+        arrays[relation + 'Keys'] = keys
+        arrays[relation + 'Offsets'] = offsets
+        arrays[relation + 'Blueprints'] = blueprintTypeIDs
+        arrays[relation + 'Activities'] = activityIDs
+        arrays[relation + 'Values'] = values
+    np.savez_compressed(path, **arrays)
+
+
+class WhereUsed:
+    """Inverted material, skill and product adjacency loaded from one archive."""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def _lookup(self, relation, typeID, activityIDs=None):
+        keys = self.arrays[relation + 'Keys']
+        i = np.searchsorted(keys, typeID)
+        if i >= len(keys) or keys[i] != typeID:
+            return np.empty((0, 3), dtype=np.int64)
+        offsets = self.arrays[relation + 'Offsets']
+        lo, hi = offsets[i], offsets[i + 1]
+        result = np.column_stack((
+            self.arrays[relation + 'Blueprints'][lo:hi],
+            self.arrays[relation + 'Activities'][lo:hi],
+            self.arrays[relation + 'Values'][lo:hi],
+        )).astype(np.int64)
+        if activityIDs is not None:
+            result = result[np.isin(result[:, 1], activityIDs)]
+        return result
+
+    def materials(self, materialTypeID, activityIDs=None):
+        """(blueprintTypeID, activityID, quantity) rows for blueprints consuming a material."""
+        return self._lookup('material', materialTypeID, activityIDs)
+
+    def skills(self, skillID, activityIDs=None):
+        """(blueprintTypeID, activityID, level) rows for blueprints requiring a skill."""
+        return self._lookup('skill', skillID, activityIDs)
+
+    def products(self, productTypeID, activityIDs=None):
+        """(blueprintTypeID, activityID, quantity) rows for blueprints making a product."""
+        return self._lookup('product', productTypeID, activityIDs)
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+Delta patches between consecutive SQLite builds.
+
+make() ATTACHes the previous release to the new database and compares every
+changed table with the same columns as a set of rows: rows only in the
+previous build are deleted by primary key and rows only in the new build
+are inserted, so a changed row becomes a DELETE plus an INSERT. Tables
+without a primary key use their NATURAL_KEYS entry when it is unique, and
+are otherwise compared as multisets of whole rows. Tables that are new or whose schema changed are
+recreated with all their rows, and tables that disappeared are dropped.
+FTS5 search tables are compared the same way (SQLite patches only).
+
+One gzipped SQL patch is written per dialect. The header holds the
+fingerprint of both builds (a hash over every table's schema and rows in
+primary key order) and the row count of every base table:
+
+    -- sde-delta 1
+    -- dialect: sqlite
+    -- base: <fingerprint>
+    -- target: <fingerprint>
+    -- rows: invTypes=51234,...
+
+apply() refuses a SQLite database whose fingerprint is not the base one and
+checks the result against the target fingerprint before committing. The
+server backends cannot reproduce the SQLite fingerprint (float storage
+differs), so for them the base row counts are checked instead. Schema
+changes are only expressible for SQLite; when a build changes a table's
+schema the other dialects get no patch and need the full dump.
+"""
+import gzip
+import hashlib
+import os
+import sqlite3
+
+from tableloader.sqliteRelease import NATURAL_KEYS
+
+FORMAT = 1
+
+# Tables left out of patches and fingerprints
+SKIPPED_TABLES = {'sqlite_stat1', 'sqlite_stat4', 'sqlite_sequence'}
+
+DIALECTS = ('sqlite', 'mysql', 'postgres', 'mssql')
+
+
+def _tables(cursor, schema='main'):
+    """{name: (sql, virtual)} for ordinary and virtual tables, leaving out FTS shadow tables."""
+    cursor.execute(f"SELECT name, sql FROM {schema}.sqlite_master WHERE type='table'")
+    rows = [(name, sql) for name, sql in cursor.fetchall() if name not in SKIPPED_TABLES and sql]
+    virtual = {name for name, sql in rows if sql.upper().startswith('CREATE VIRTUAL TABLE')}
+    return {
+        name: (sql, name in virtual) for name, sql in rows
+        if not any(name.startswith(v + '_') for v in virtual)
+    }
+
+
+def _columns(cursor, table, schema='main'):
+    """[(name, declared type, primary key position)] of a table."""
+    cursor.execute(f'PRAGMA {schema}.table_info("{table}")')
+    return [(row[1], (row[2] or '').upper(), row[5]) for row in cursor.fetchall()]
+
+
+def _key(columns):
+    """Primary key columns, or every column for tables without one."""
+    key = [name for name, _type, pk in sorted(columns, key=lambda c: c[2]) if pk]
+    return key or [name for name, _type, _pk in columns]
+
+
+def _indexes(cursor, table, schema='main'):
+    cursor.execute(f"SELECT sql FROM {schema}.sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def table_digests(path):
+    """{table: (digest, row count)} over the schema and rows in primary key order of every ordinary table."""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    digests = _digests(conn)
+    conn.close()
+    return digests
+
+
+def _digests(conn):
+    cursor = conn.cursor()
+    digests = {}
+    for table, (_sql, virtual) in sorted(_tables(cursor).items()):
+        if virtual:
+            continue
+        columns = _columns(cursor, table)
+        digest = hashlib.blake2b(repr((table, columns)).encode('utf-8'), digest_size=16)
+        order = ', '.join(f'"{c}"' for c in _key(columns))
+        count = 0
+        for row in conn.execute(f'SELECT * FROM "{table}" ORDER BY {order}'):
+            digest.update(repr(row).encode('utf-8'))
+            count += 1
+        digests[table] = (digest.hexdigest(), count)
+    return digests
+
+
+def fingerprint(path, digests=None):
+    """(fingerprint, {table: row count}) of a SQLite database."""
+    digests = digests if digests is not None else table_digests(path)
+    combined = hashlib.blake2b(digest_size=16)
+    for table, (digest, _count) in sorted(digests.items()):
+        combined.update(digest.encode('ascii'))
+    return combined.hexdigest(), {table: count for table, (_digest, count) in digests.items()}
+
+
+def quote(name, dialect):
+    if dialect == 'mysql':
+        return f'`{name}`'
+    if dialect == 'mssql':
+        return f'[{name}]'
+    return f'"{name}"'
+
+
+def literal(value, dialect, declared=''):
+    """SQL literal of a SQLite value for a dialect."""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bytes):
+        if dialect == 'postgres':
+            return f"'\\x{value.hex()}'::bytea"
+        if dialect == 'mssql':
+            return f'0x{value.hex()}'
+        return f"X'{value.hex()}'"
+    if isinstance(value, int):
+        if dialect == 'postgres' and declared.startswith('BOOL'):
+            return 'TRUE' if value else 'FALSE'
+        return str(value)
+    if isinstance(value, float):
+        return repr(value)
+    text = value.replace("'", "''")
+    if dialect == 'mysql':
+        text = text.replace('\\', '\\\\')
+    if dialect == 'mssql':
+        return f"N'{text}'"
+    return f"'{text}'"
+
+
+def _insert(table, columns, row, dialect):
+    names = ', '.join(quote(name, dialect) for name, _type, _pk in columns)
+    values = ', '.join(literal(v, dialect, t) for v, (_name, t, _pk) in zip(row, columns))
+    return f'INSERT INTO {quote(table, dialect)} ({names}) VALUES ({values});'
+
+
+def _delete(table, columns, keyRow, dialect):
+    condition = ' AND '.join(
+        f'{quote(name, dialect)} IS NULL' if value is None else f'{quote(name, dialect)} = {literal(value, dialect, t)}'
+        for (name, t, _pk), value in zip(columns, keyRow)
+    )
+    return f'DELETE FROM {quote(table, dialect)} WHERE {condition};'
+
+
+def _unique_key(cursor, table, columns):
+    """
+    Declared primary key, or the NATURAL_KEYS entry when it is unique and
+    non-NULL in both builds; [] when rows can only be compared whole.
+    """
+    key = [name for name, _type, pk in sorted(columns, key=lambda c: c[2]) if pk]
+    if key:
+        return key
+    key = list(NATURAL_KEYS.get(table, ()))
+    if not key or not set(key) <= {name for name, _type, _pk in columns}:
+        return []
+    keyNames = ', '.join(f'"{name}"' for name in key)
+    nulls = ' OR '.join(f'"{name}" IS NULL' for name in key)
+    for schema in ('old', 'main'):
+        if cursor.execute(f'SELECT 1 FROM {schema}."{table}" WHERE {nulls} LIMIT 1').fetchone() or \
+                cursor.execute(f'SELECT 1 FROM {schema}."{table}" GROUP BY {keyNames} HAVING count(*) > 1 LIMIT 1').fetchone():
+            return []
+    return key
+
+
+def _changes(cursor, table, columns, key):
+    """
+    (deleted keys, inserted rows) between old.table and main.table with
+    identical columns. Without a key the tables are compared as multisets:
+    every copy of a row whose count changed is deleted by all its columns
+    and the new number of copies inserted.
+    """
+    names = ', '.join(f'"{name}"' for name, _type, _pk in columns)
+    if not key:
+        cursor.execute(f'SELECT {names} FROM (SELECT {names}, count(*) FROM old."{table}" GROUP BY {names} '
+                       f'EXCEPT SELECT {names}, count(*) FROM main."{table}" GROUP BY {names}) ORDER BY {names}')
+        deleted = cursor.fetchall()
+        cursor.execute(f'SELECT {names}, count(*) FROM main."{table}" GROUP BY {names} '
+                       f'EXCEPT SELECT {names}, count(*) FROM old."{table}" GROUP BY {names} ORDER BY {names}')
+        inserted = [row[:-1] for row in cursor.fetchall() for _copy in range(row[-1])]
+        return deleted, inserted
+    keyNames = ', '.join(f'"{name}"' for name in key)
+    cursor.execute(f'SELECT DISTINCT {keyNames} FROM (SELECT {names} FROM old."{table}" EXCEPT SELECT {names} FROM main."{table}") ORDER BY {keyNames}')
+    deleted = cursor.fetchall()
+    cursor.execute(f'SELECT {names} FROM main."{table}" EXCEPT SELECT {names} FROM old."{table}" ORDER BY {keyNames}')
+    inserted = cursor.fetchall()
+    return deleted, inserted
+
+
+def make(previous_db_path, new_db_path, output_prefix='eve-delta', dialects=DIALECTS):
+    """
+    Write <output_prefix>-<dialect>.sql.gz patches that turn the previous
+    build into the new one. Returns the written paths.
+    """
+    print(f"\nCreating delta: {previous_db_path} -> {new_db_path}")
+    baseDigests = table_digests(previous_db_path)
+    targetDigests = table_digests(new_db_path)
+    base, baseCounts = fingerprint(previous_db_path, baseDigests)
+    target, _targetCounts = fingerprint(new_db_path, targetDigests)
+    if base == target:
+        print("  Databases are identical")
+
+    conn = sqlite3.connect(f'file:{new_db_path}?mode=ro', uri=True)
+    cursor = conn.cursor()
+    cursor.execute("ATTACH DATABASE ? AS old", (f'file:{previous_db_path}?mode=ro',))
+    newTables = _tables(cursor)
+    oldTables = _tables(cursor, 'old')
+
+    # (table, columns, key columns, deleted keys, inserted rows, recreate sql or None, virtual)
+    changes = []
+    dropped = sorted(set(oldTables) - set(newTables))
+    droppedVirtual = {t for t in dropped if oldTables[t][1]}
+    for table, (sql, virtual) in sorted(newTables.items()):
+        columns = _columns(cursor, table)
+        if table in oldTables and oldTables[table][0] == sql:
+            if not virtual and baseDigests[table] == targetDigests[table]:
+                continue
+            key = _unique_key(cursor, table, columns)
+            keyColumns = [c for name in key for c in columns if c[0] == name] or columns
+            deleted, inserted = _changes(cursor, table, columns, key)
+            if deleted or inserted:
+                changes.append((table, columns, keyColumns, deleted, inserted, None, virtual))
+        else:
+            cursor.execute(f'SELECT * FROM main."{table}"')
+            changes.append((table, columns, columns, [], cursor.fetchall(), sql, virtual))
+
+    # New or changed table schemas cannot be written for the server dialects
+    recreated = [c[0] for c in changes if c[5] is not None and not c[6]]
+    written = []
+    for dialect in dialects:
+        if dialect != 'sqlite' and recreated:
+            print(f"  Skipping {dialect} patch, schema changed for: {', '.join(recreated)}")
+            continue
+        path = f'{output_prefix}-{dialect}.sql.gz'
+        statements = 0
+        with gzip.open(path, 'wt', encoding='utf-8', newline='\n') as out:
+            out.write(f'-- sde-delta {FORMAT}\n')
+            out.write(f'-- dialect: {dialect}\n')
+            out.write(f'-- base: {base}\n')
+            out.write(f'-- target: {target}\n')
+            out.write(f"-- rows: {','.join(f'{t}={n}' for t, n in sorted(baseCounts.items()))}\n")
+            for table in dropped:
+                if table in droppedVirtual and dialect != 'sqlite':
+                    continue
+                out.write(f'DROP TABLE IF EXISTS {quote(table, dialect)};\n')
+            for table, columns, keyColumns, deleted, inserted, sql, virtual in changes:
+                if virtual and dialect != 'sqlite':
+                    continue
+                if sql is not None:
+                    out.write(f'DROP TABLE IF EXISTS {quote(table, dialect)};\n{sql};\n')
+                    if virtual:
+                        cursor.execute(f"SELECT v FROM main.\"{table}_config\" WHERE k = 'rank'")
+                        rank = cursor.fetchone()
+                        if rank:
+                            out.write(f"INSERT INTO {quote(table, dialect)}({quote(table, dialect)}, rank) VALUES ({literal(rank[0], dialect)});\n")
+                for keyRow in deleted:
+                    out.write(_delete(table, keyColumns, keyRow, dialect) + '\n')
+                for row in inserted:
+                    out.write(_insert(table, columns, row, dialect) + '\n')
+                if sql is not None:
+                    for index in _indexes(cursor, table):
+                        out.write(f'{index};\n')
+                statements += len(deleted) + len(inserted)
+        print(f"  {path}: {statements} row changes in {len(changes)} tables, {os.path.getsize(path) / 1024:.1f} KB")
+        written.append(path)
+    conn.close()
+    return written
+
+
+def read_header(path):
+    """Header fields of a patch: format, dialect, base, target, rows."""
+    header = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as patch:
+        for line in patch:
+            if not line.startswith('-- '):
+                break
+            field, _, value = line[3:].strip().partition(': ')
+            if field.startswith('sde-delta'):
+                header['format'] = int(field.split()[1])
+            else:
+                header[field] = value
+    header['rows'] = {
+        t: int(n) for t, _, n in (item.partition('=') for item in header.get('rows', '').split(',') if item)
+    }
+    return header
+
+
+def statements(path):
+    """SQL statements of a patch, one at a time."""
+    buffer = ''
+    with gzip.open(path, 'rt', encoding='utf-8') as patch:
+        for line in patch:
+            if not buffer and line.startswith('-- '):
+                continue
+            buffer += line
+            if sqlite3.complete_statement(buffer):
+                yield buffer.strip()
+                buffer = ''
+    if buffer.strip():
+        raise ValueError(f"Incomplete statement at the end of {path}")
+
+
+def apply_sqlite(patch_path, db_path):
+    """Apply a SQLite patch in one transaction after checking the base fingerprint."""
+    header = read_header(patch_path)
+    if header.get('format') != FORMAT or header.get('dialect') != 'sqlite':
+        raise ValueError(f"{patch_path} is not a sqlite delta patch")
+    current, _counts = fingerprint(db_path)
+    if current == header['target']:
+        print(f"  {db_path} is already at {header['target']}")
+        return False
+    if current != header['base']:
+        raise ValueError(f"{db_path} has fingerprint {current}, the patch expects {header['base']}")
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    try:
+        count = 0
+        for statement in statements(patch_path):
+            cursor.execute(statement)
+            count += 1
+        result, _counts = fingerprint(db_path, _digests(conn))
+        if result != header['target']:
+            raise ValueError(f"{db_path} would have fingerprint {result} after patching, expected {header['target']}")
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        conn.close()
+        raise
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1'").fetchone():
+        cursor.execute("ANALYZE")
+    conn.close()
+    print(f"  Applied {count} statements, {db_path} is now at {result}")
+    return True
+
+
+def apply_connection(patch_path, connection):
+    """Apply a server dialect patch through a SQLAlchemy connection after checking the base row counts."""
+    header = read_header(patch_path)
+    if header.get('format') != FORMAT:
+        raise ValueError(f"{patch_path} is not a delta patch")
+    dialect = header.get('dialect')
+    for table, expected in sorted(header['rows'].items()):
+        count = connection.exec_driver_sql(f'SELECT count(*) FROM {quote(table, dialect)}').scalar()
+        if count != expected:
+            raise ValueError(f"{table} has {count} rows, the patch expects {expected}")
+    connection.commit()
+
+    # No parameters, so format paramstyle drivers (PyMySQL, psycopg2, pymssql) leave % in the text alone
+    raw = connection.execution_options(no_parameters=True)
+    with connection.begin():
+        count = 0
+        for statement in statements(patch_path):
+            raw.exec_driver_sql(statement.rstrip(';'))
+            count += 1
+    print(f"  Applied {count} statements")
+    return True
@@ -0,0 +1,478 @@
+# -*- coding: utf-8 -*-
+"""
+Release steps for the SQLite artifacts.
+
+Stripped profiles (Load.py --create-stripped) are built by ATTACHing a fresh
+file to the source database and recreating only the kept tables with their
+schema, copying rows with INSERT ... SELECT in primary key order, then
+recreating their indexes. Several profiles are built concurrently, each on
+its own read-only source connection.
+
+The compact profile (Load.py --compact) rewrites a stripped database for
+bandwidth-constrained consumers and reports the size impact of each option.
+
+Finalization (Load.py --finalize):
+
+- Tables with a composite primary key are rebuilt as WITHOUT ROWID tables,
+  filled in primary key order, so lookups by key hit the table b-tree
+  directly and the separate primary key index disappears. Tables listed in
+  NATURAL_KEYS (industryActivityMaterials) get their natural key added as
+  the primary key when the data allows it.
+- Covering indexes for the common read paths are added.
+- ANALYZE stores planner statistics (sqlite_stat1).
+- The file is rewritten with VACUUM INTO at each candidate page size and the
+  smallest result replaces the original.
+"""
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Tables kept in eve-stripped.db
+STRIPPED_TABLES = {
+    'invTypes', 'invGroups', 'invCategories', 'invMetaTypes', 'invVolumes',
+    'industryActivityMaterials', 'industryActivityProducts', 'industryActivity',
+    'industryActivityProbabilities', 'industryActivitySkills',
+    'dgmTypeAttributes', 'dgmTypeAttributesEffective', 'dgmAttributeTypes', 'dgmTypeEffects', 'dgmEffects', 'dgmEffectModifiers',
+    'dgmAttributeCategories', 'dgmExpressions',
+    'mapRegions', 'mapSolarSystems', 'staStations',
+    'invTypeMaterials', 'invMarketGroups', 'industryBlueprints',
+    'invMarketGroupsClosure', 'invMetaTypesClosure',
+    'planetSchematics', 'planetSchematicsPinMap', 'planetSchematicsTypeMap',
+    'planetSchematicsChain', 'planetSchematicsChainInputs',
+    'invTypeReactions', 'industryBOMFlat', 'industryBOMEdges',
+    'rigAffectedProductGroups', 'rigIndustryModifierSources',
+    'skillPrerequisiteClosure'
+}
+
+# Destination file -> tables
+PROFILES = {
+    'eve-stripped.db': STRIPPED_TABLES,
+}
+
+INDEX_NAME = re.compile(r'^(CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?)("[^"]+"|\S+)', re.IGNORECASE)
+
+# name, table, columns
+COVERING_INDEXES = [
+    ('dgmTypeAttributes_IX_attributeValue', 'dgmTypeAttributes', ('attributeID', 'valueFloat')),
+    ('dgmTypeEffects_IX_effect', 'dgmTypeEffects', ('effectID',)),
+    ('invTypes_IX_groupPublished', 'invTypes', ('groupID', 'published', 'typeName')),
+    ('invTypes_IX_marketGroup', 'invTypes', ('marketGroupID', 'typeName')),
+    ('invTypeMaterials_IX_material', 'invTypeMaterials', ('materialTypeID', 'quantity')),
+    ('mapSolarSystems_IX_regionSecurity', 'mapSolarSystems', ('regionID', 'security')),
+]
+
+# Natural keys for tables declared without a primary key, used by the WITHOUT
+# ROWID rebuild when the data has no NULL or duplicate keys
+NATURAL_KEYS = {
+    'industryActivityMaterials': ('typeID', 'activityID', 'materialTypeID'),
+}
+
+PAGE_SIZES = (4096, 8192, 16384, 32768, 65536)
+
+# trnTranslations tcIDs holding descriptions (types, meta groups, market groups)
+DESCRIPTION_TCIDS = (33, 35, 37)
+
+# Dictionary encoding candidates: text columns with at least this many rows,
+# at most one distinct value per DICTIONARY_RATIO rows and this average length
+DICTIONARY_MIN_ROWS = 1000
+DICTIONARY_RATIO = 20
+DICTIONARY_MIN_LENGTH = 4
+
+
+def _tables(cursor):
+    """Ordinary tables, leaving out virtual tables and their shadow tables."""
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+    rows = cursor.fetchall()
+    virtual = [name for name, sql in rows if sql and sql.upper().startswith('CREATE VIRTUAL TABLE')]
+    return [
+        (name, sql) for name, sql in rows
+        if name not in virtual and not any(name.startswith(v + '_') for v in virtual)
+    ]
+
+
+def _schema_in(sql, target):
+    """CREATE TABLE / INDEX / VIRTUAL TABLE statement retargeted to schema target."""
+    match = INDEX_NAME.match(sql)
+    if match:
+        return f'{match.group(1)}{target}.{match.group(2)}{sql[match.end():]}'
+    match = re.match(r'^(CREATE\s+(?:VIRTUAL\s+)?TABLE\s+)("[^"]+"|\S+)', sql, re.IGNORECASE)
+    return f'{match.group(1)}{target}.{match.group(2)}{sql[match.end():]}'
+
+
+def buildProfile(source_db_path, dest_db_path, tables):
+    """
+    Build one stripped database with the given tables from source_db_path.
+    Returns (tables copied, tables missing from the source).
+    """
+    if os.path.exists(dest_db_path):
+        print(f"Warning: {dest_db_path} already exists and will be overwritten")
+        os.remove(dest_db_path)
+
+    source = sqlite3.connect(f'file:{source_db_path}?mode=ro', uri=True, isolation_level=None, check_same_thread=False)
+    try:
+        cursor = source.cursor()
+        cursor.execute("ATTACH DATABASE ? AS dst", (dest_db_path,))
+        pageSize = cursor.execute("PRAGMA main.page_size").fetchone()[0]
+        cursor.execute(f"PRAGMA dst.page_size={pageSize}")
+        cursor.execute("PRAGMA dst.journal_mode=OFF")
+        cursor.execute("PRAGMA dst.synchronous=OFF")
+
+        cursor.execute("SELECT name, sql FROM main.sqlite_master WHERE type='table'")
+        schema = dict(cursor.fetchall())
+        copied = sorted(t for t in tables if t in schema)
+        missing = sorted(t for t in tables if t not in schema)
+
+        cursor.execute("BEGIN")
+        for table in copied:
+            sql = schema[table]
+            cursor.execute(_schema_in(sql, 'dst'))
+            if sql.upper().startswith('CREATE VIRTUAL TABLE'):
+                cursor.execute(f'INSERT INTO dst."{table}" SELECT * FROM main."{table}"')
+                # FTS5 settings such as the rank function live in the config shadow table
+                if f'{table}_config' in schema:
+                    cursor.execute(f'INSERT OR REPLACE INTO dst."{table}_config" SELECT * FROM main."{table}_config"')
+                continue
+            primaryKey = ', '.join(f'"{c}"' for c in _primary_key(cursor, table))
+            order = f' ORDER BY {primaryKey}' if primaryKey else ''
+            cursor.execute(f'INSERT INTO dst."{table}" SELECT * FROM main."{table}"{order}')
+        # Indexes after the data, as the loader does
+        cursor.execute("SELECT sql FROM main.sqlite_master WHERE type='index' AND sql IS NOT NULL AND tbl_name IN ("
+                       + ','.join('?' * len(copied)) + ")", copied)
+        for (sql,) in cursor.fetchall():
+            cursor.execute(_schema_in(sql, 'dst'))
+        cursor.execute("COMMIT")
+
+        if cursor.execute("SELECT 1 FROM main.sqlite_master WHERE name='sqlite_stat1'").fetchone():
+            cursor.execute("ANALYZE dst")
+        cursor.execute("DETACH DATABASE dst")
+    except Exception:
+        source.close()
+        if os.path.exists(dest_db_path):
+            os.remove(dest_db_path)
+        raise
+    source.close()
+    return copied, missing
+
+
+def buildProfiles(source_db_path='eve.db', profiles=None):
+    """
+    Build every profile ({destination: tables}, default PROFILES) from one
+    source database concurrently. Returns the destinations that were built.
+    """
+    profiles = profiles or PROFILES
+    if not os.path.exists(source_db_path):
+        print(f"Error: Source database not found: {source_db_path}")
+        return []
+
+    print(f"\nCreating {len(profiles)} stripped database(s) from {source_db_path}")
+    start_time = time.time()
+    built = []
+    with ThreadPoolExecutor(max_workers=len(profiles)) as pool:
+        futures = {dest: pool.submit(buildProfile, source_db_path, dest, tables) for dest, tables in profiles.items()}
+        for dest, future in futures.items():
+            try:
+                copied, missing = future.result()
+            except Exception as e:
+                print(f"Error creating stripped database {dest}: {e}")
+                continue
+            size = os.path.getsize(dest) / (1024*1024)
+            print(f"  {dest}: {len(copied)} tables, {size:.2f} MB")
+            if missing:
+                print(f"    Warning: tables not in source: {missing}")
+            built.append(dest)
+
+    original_size = os.path.getsize(source_db_path) / (1024*1024)
+    print(f"  Source size: {original_size:.2f} MB")
+    print(f"  Built in {time.time() - start_time:.2f} seconds")
+    return built
+
+
+def _primary_key(cursor, table):
+    cursor.execute(f'PRAGMA table_info("{table}")')
+    return [row[1] for row in sorted((r for r in cursor.fetchall() if r[5]), key=lambda r: r[5])]
+
+
+def _natural_key(cursor, table):
+    """NATURAL_KEYS entry of a table when its rows are unique and non-NULL on it, else []."""
+    key = NATURAL_KEYS.get(table, ())
+    cursor.execute(f'PRAGMA table_info("{table}")')
+    if not key or not set(key) <= {row[1] for row in cursor.fetchall()}:
+        return []
+    columns = ', '.join(f'"{c}"' for c in key)
+    nulls = ' OR '.join(f'"{c}" IS NULL' for c in key)
+    if cursor.execute(f'SELECT 1 FROM "{table}" WHERE {nulls} LIMIT 1').fetchone() or \
+            cursor.execute(f'SELECT 1 FROM "{table}" GROUP BY {columns} HAVING count(*) > 1 LIMIT 1').fetchone():
+        print(f"  Keeping {table} as a rowid table, its rows are not unique on ({', '.join(key)})")
+        return []
+    return list(key)
+
+
+def rebuildWithoutRowid(conn, table, sql, primaryKey):
+    """
+    Recreate one table as WITHOUT ROWID in primary key order, keeping its
+    indexes. A primaryKey the table does not declare is added to its schema.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (table,))
+    indexes = [row[0] for row in cursor.fetchall()]
+    rebuilt = f'{table}__rebuild'
+    order = ', '.join(f'"{c}"' for c in primaryKey)
+
+    cursor.execute("BEGIN")
+    cursor.execute(f'DROP TABLE IF EXISTS "{rebuilt}"')
+    body = sql[sql.index("("):]
+    if _primary_key(cursor, table) != list(primaryKey):
+        body = f'{body.rstrip()[:-1].rstrip()}, PRIMARY KEY ({order}))'
+    cursor.execute(f'CREATE TABLE "{rebuilt}" {body} WITHOUT ROWID')
+    cursor.execute(f'INSERT INTO "{rebuilt}" SELECT * FROM "{table}" ORDER BY {order}')
+    cursor.execute(f'DROP TABLE "{table}"')
+    cursor.execute(f'ALTER TABLE "{rebuilt}" RENAME TO "{table}"')
+    for index in indexes:
+        cursor.execute(index)
+    cursor.execute("COMMIT")
+
+
+def finalize(path, pageSize=None):
+    """
+    Finalize a SQLite release file in place. pageSize fixes the page size;
+    by default every size in PAGE_SIZES is tried and the smallest file kept.
+    """
+    if not os.path.exists(path):
+        print(f"Error: database not found: {path}")
+        return False
+
+    print(f"\nFinalizing {path}")
+    start_time = time.time()
+    original_size = os.path.getsize(path)
+    conn = sqlite3.connect(path, isolation_level=None)
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode=DELETE")
+
+    rebuilt = 0
+    for table, sql in _tables(cursor):
+        primaryKey = _primary_key(cursor, table) or _natural_key(cursor, table)
+        if len(primaryKey) < 2 or sql.rstrip().upper().endswith('WITHOUT ROWID'):
+            continue
+        rebuildWithoutRowid(conn, table, sql, primaryKey)
+        rebuilt += 1
+    print(f"  Rebuilt {rebuilt} composite-key tables as WITHOUT ROWID")
+
+    existing = {name for name, _sql in _tables(cursor)}
+    created = 0
+    for name, table, columns in COVERING_INDEXES:
+        if table not in existing:
+            continue
+        cursor.execute(f'PRAGMA table_info("{table}")')
+        if not set(columns) <= {row[1] for row in cursor.fetchall()}:
+            continue
+        columnList = ', '.join(f'"{c}"' for c in columns)
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({columnList})')
+        created += 1
+    print(f"  Created {created} covering indexes")
+
+    print("  Running ANALYZE...")
+    cursor.execute("ANALYZE")
+
+    candidates = [pageSize] if pageSize else list(PAGE_SIZES)
+    best = None
+    for size in candidates:
+        target = f'{path}.{size}.tmp'
+        if os.path.exists(target):
+            os.remove(target)
+        cursor.execute(f"PRAGMA page_size={size}")
+        cursor.execute("VACUUM INTO ?", (target,))
+        result = os.path.getsize(target)
+        print(f"  page_size {size}: {result / (1024*1024):.2f} MB")
+        if best is None or result < best[1]:
+            if best is not None:
+                os.remove(best[0])
+            best = (target, result, size)
+        else:
+            os.remove(target)
+    conn.close()
+
+    os.replace(best[0], path)
+    print(f"  Chose page_size {best[2]}")
+    print(f"  Size: {original_size / (1024*1024):.2f} MB -> {best[1] / (1024*1024):.2f} MB")
+    print(f"  Finalized in {time.time() - start_time:.2f} seconds")
+    return True
+
+
+def _file_size(cursor):
+    """Database size after a VACUUM."""
+    cursor.execute("VACUUM")
+    return cursor.execute("PRAGMA page_count").fetchone()[0] * cursor.execute("PRAGMA page_size").fetchone()[0]
+
+
+def moveDescriptions(cursor, descriptions_db_path):
+    """
+    Move description columns and description translations into a separate
+    database. The columns stay in place as NULL so the schema is unchanged.
+    """
+    if os.path.exists(descriptions_db_path):
+        os.remove(descriptions_db_path)
+    cursor.execute("ATTACH DATABASE ? AS descriptions", (descriptions_db_path,))
+    cursor.execute("BEGIN")
+    moved = 0
+    for table, sql in _tables(cursor):
+        cursor.execute(f'PRAGMA main.table_info("{table}")')
+        columns = {row[1]: row[2] for row in cursor.fetchall()}
+        primaryKey = _primary_key(cursor, table)
+        if table == 'trnTranslations':
+            cursor.execute(f'CREATE TABLE descriptions."{table}" {sql[sql.index("("):]}')
+            tcIDs = ','.join(str(t) for t in DESCRIPTION_TCIDS)
+            cursor.execute(f'INSERT INTO descriptions."{table}" SELECT * FROM main."{table}" WHERE tcID IN ({tcIDs}) ORDER BY tcID, keyID, languageID')
+            cursor.execute(f'DELETE FROM main."{table}" WHERE tcID IN ({tcIDs})')
+        elif 'description' in columns and primaryKey:
+            keys = ', '.join(f'"{c}"' for c in primaryKey)
+            definitions = ', '.join(f'"{c}" {columns[c]} NOT NULL' for c in primaryKey)
+            cursor.execute(f'CREATE TABLE descriptions."{table}" ({definitions}, description TEXT, PRIMARY KEY ({keys})) WITHOUT ROWID')
+            cursor.execute(f'INSERT INTO descriptions."{table}" SELECT {keys}, description FROM main."{table}" '
+                           f"WHERE description IS NOT NULL AND description != '' ORDER BY {keys}")
+            cursor.execute(f'UPDATE main."{table}" SET description = NULL')
+        else:
+            continue
+        moved += 1
+    cursor.execute("COMMIT")
+    cursor.execute("DETACH DATABASE descriptions")
+    return moved
+
+
+def integerValues(cursor):
+    """Store integral dgmTypeAttributes values in valueInt and clear valueFloat."""
+    if not cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='dgmTypeAttributes'").fetchone():
+        return 0
+    cursor.execute("""
+        UPDATE dgmTypeAttributes SET valueInt = CAST(valueFloat AS INTEGER), valueFloat = NULL
+        WHERE valueFloat IS NOT NULL AND valueFloat = CAST(valueFloat AS INTEGER)""")
+    return cursor.rowcount
+
+
+def dictionaryEncode(cursor):
+    """
+    Replace repetitive text columns by integer IDs into a shared strings
+    table. The table is renamed to <table>_encoded and a view with the
+    original name and columns decodes it, so read queries keep working.
+    """
+    encoded = []
+    for table, sql in _tables(cursor):
+        if table == 'strings' or table.endswith('_encoded'):
+            continue
+        cursor.execute(f'PRAGMA table_info("{table}")')
+        info = cursor.fetchall()
+        cursor.execute(f'PRAGMA index_list("{table}")')
+        indexed = set()
+        for index in cursor.fetchall():
+            cursor.execute(f'PRAGMA index_info("{index[1]}")')
+            indexed.update(row[2] for row in cursor.fetchall())
+        rows = cursor.execute(f'SELECT count(*) FROM "{table}"').fetchone()[0]
+        if rows < DICTIONARY_MIN_ROWS:
+            continue
+
+        candidates = []
+        for _cid, column, declared, _notnull, _default, pk in info:
+            if pk or column in indexed or not re.search('CHAR|TEXT|CLOB', declared or '', re.IGNORECASE):
+                continue
+            distinct, length = cursor.execute(
+                f'SELECT count(DISTINCT "{column}"), avg(length("{column}")) FROM "{table}"').fetchone()
+            if distinct * DICTIONARY_RATIO <= rows and (length or 0) >= DICTIONARY_MIN_LENGTH:
+                candidates.append(column)
+        if not candidates:
+            continue
+
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (table,))
+        indexes = [row[0] for row in cursor.fetchall()]
+        body = sql[sql.index("("):]
+        for column in candidates:
+            body = re.sub(rf'("{column}"|\b{column}\b)\s+[A-Za-z]+(\(\d+\))?', rf'\1 INTEGER', body, count=1)
+        columns = [row[1] for row in info]
+
+        cursor.execute("BEGIN")
+        # Created with the first encoded column so an empty pass adds nothing
+        cursor.execute("CREATE TABLE IF NOT EXISTS strings (stringID INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)")
+        for column in candidates:
+            cursor.execute(f'INSERT OR IGNORE INTO strings (value) SELECT DISTINCT "{column}" FROM "{table}" WHERE "{column}" IS NOT NULL')
+        cursor.execute(f'CREATE TABLE "{table}_encoded" {body}')
+        select = ', '.join(
+            f'(SELECT stringID FROM strings WHERE value = t."{c}")' if c in candidates else f't."{c}"' for c in columns)
+        cursor.execute(f'INSERT INTO "{table}_encoded" SELECT {select} FROM "{table}" t')
+        cursor.execute(f'DROP TABLE "{table}"')
+        for index in indexes:
+            cursor.execute(re.sub(rf'\bON\s+("{table}"|{table})\s*\(', f'ON "{table}_encoded" (', index, count=1))
+        decoded = ', '.join(
+            f'(SELECT value FROM strings WHERE stringID = e."{c}") AS "{c}"' if c in candidates else f'e."{c}"' for c in columns)
+        cursor.execute(f'CREATE VIEW "{table}" AS SELECT {decoded} FROM "{table}_encoded" e')
+        cursor.execute("COMMIT")
+        encoded.extend(f'{table}.{c}' for c in candidates)
+    return encoded
+
+
+def compressFile(path, level=19):
+    """Write path.zst with zstandard; returns the compressed size or None when unavailable."""
+    if zstandard is None:
+        print("  zstandard is not installed, skipping compression (pip install zstandard)")
+        return None
+    target = path + '.zst'
+    compressor = zstandard.ZstdCompressor(level=level, threads=-1)
+    with open(path, 'rb') as source, open(target, 'wb') as destination:
+        compressor.copy_stream(source, destination)
+    return os.path.getsize(target)
+
+
+def buildCompact(source_db_path='eve-stripped.db', dest_db_path='eve-compact.db',
+                 descriptions_db_path='eve-descriptions.db',
+                 descriptions=True, valueInt=True, dictionary=True, compress=True):
+    """
+    Build the compact profile from a stripped database and print the size
+    impact of every enabled option. Returns {option: bytes saved}.
+    """
+    if not os.path.exists(source_db_path):
+        print(f"Error: Source database not found: {source_db_path}")
+        return {}
+
+    print(f"\nCreating compact database: {dest_db_path}")
+    if os.path.exists(dest_db_path):
+        os.remove(dest_db_path)
+    source = sqlite3.connect(f'file:{source_db_path}?mode=ro', uri=True, isolation_level=None)
+    source.execute("VACUUM INTO ?", (dest_db_path,))
+    source.close()
+
+    conn = sqlite3.connect(dest_db_path, isolation_level=None)
+    cursor = conn.cursor()
+    report = {}
+    size = baseline = _file_size(cursor)
+    print(f"  Baseline: {baseline / (1024*1024):.2f} MB")
+
+    steps = []
+    if descriptions:
+        steps.append(('descriptions', lambda: f"{moveDescriptions(cursor, descriptions_db_path)} tables moved to {descriptions_db_path}"))
+    if valueInt:
+        steps.append(('valueInt', lambda: f"{integerValues(cursor)} integral attribute values"))
+    if dictionary:
+        steps.append(('dictionary', lambda: f"encoded {', '.join(dictionaryEncode(cursor)) or 'no columns'}"))
+    for option, step in steps:
+        detail = step()
+        if cursor.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1'").fetchone():
+            cursor.execute("ANALYZE")
+        new_size = _file_size(cursor)
+        report[option] = size - new_size
+        print(f"  {option}: {(new_size - size) / (1024*1024):+.2f} MB ({detail})")
+        size = new_size
+    conn.close()
+
+    if compress:
+        compressed = compressFile(dest_db_path)
+        if compressed is not None:
+            report['zstd'] = size - compressed
+            print(f"  zstd: {(compressed - size) / (1024*1024):+.2f} MB ({dest_db_path}.zst)")
+            size = compressed
+
+    print(f"  Total: {baseline / (1024*1024):.2f} MB -> {size / (1024*1024):.2f} MB")
+    return report
@@ -1 +1 @@
-__all__ = ["blueprints","categories","certificates","graphics","groups","icons","skins","types","bsdTables","universe","volumes","marketGroups","metaGroups","controlTowerResources","dogmaEffects","dogmaAttributeCategories","dogmaAttributes","dogmaTypes","typeMaterials","agents","characterAttributes","ancestries","bloodlines","npccorporations","factions","planetary", "typeBonus","stations","rigAffectedProductGroups", "masteries", "npcDivisions", "eveUnits", "invNames", "invItems"]
+__all__ = ["blueprints","categories","certificates","graphics","groups","icons","skins","types","bsdTables","universe","volumes","marketGroups","metaGroups","controlTowerResources","dogmaEffects","dogmaAttributeCategories","dogmaAttributes","dogmaTypes","typeMaterials","agents","characterAttributes","ancestries","bloodlines","npccorporations","factions","planetary", "typeBonus","stations","rigAffectedProductGroups", "masteries", "npcDivisions", "eveUnits", "invNames", "invItems", "hierarchies", "search"]
@@ -6,9 +6,12 @@ except ImportError:
     from yaml import SafeLoader
 
 import os
-from sqlalchemy import Table
+from collections import defaultdict
+from sqlalchemy import Table, select
 
-def importyaml(connection,metadata,sourcePath):
+from sdetools import whereUsed
+
+def importyaml(connection,metadata,sourcePath,destinationPath=None):
 
     activityIDs={"copying":5,"manufacturing":1,"research_material":4,"research_time":3,"invention":8,"reaction":11};
 
@@ -120,5 +123,159 @@ def importyaml(connection,metadata,sourcePath):
             connection.execute(industryActivitySkills.insert(), skill_rows)
             print(f"  Inserted {len(skill_rows)} skills")
 
+        # Reverse lookups (material/skill/product -> blueprint) from the same rows
+        if destinationPath is not None:
+            os.makedirs(destinationPath, exist_ok=True)
+            indexPath = os.path.join(destinationPath, 'industryWhereUsed.npz')
+            whereUsed.write_index(
+                indexPath,
+                [(r['materialTypeID'], r['typeID'], r['activityID'], r['quantity']) for r in material_rows],
+                [(r['skillID'], r['typeID'], r['activityID'], r['level']) for r in skill_rows],
+                [(r['productTypeID'], r['typeID'], r['activityID'], r['quantity']) for r in product_rows]
+            )
+            print(f"  Wrote where-used index to {indexPath}")
+
     trans.commit()
     print("  Done")
+
+
+# Activities whose outputs feed other builds: manufacturing and reactions
+BOM_ACTIVITIES = (1, 11)
+
+
+def buildBillOfMaterials(connection, metadata):
+    """
+    Build industryBOMEdges and industryBOMFlat from the manufacturing and
+    reaction tables.
+
+    Each product is made by one blueprint (manufacturing preferred over
+    reactions, then the lowest blueprint typeID). industryBOMEdges holds the
+    direct materials of one run of that blueprint; industryBOMFlat expands
+    every intermediate down to materials nothing produces. Flat quantities
+    are per run of the final product's blueprint at ME0, with intermediates
+    counted as fractional runs, and depth is the deepest level at which the
+    raw material appears. Edges that close a production cycle are reported
+    and the material is treated as raw at that point.
+    """
+    print("Building flattened bill of materials")
+
+    industryActivityMaterials = Table('industryActivityMaterials', metadata)
+    industryActivityProducts = Table('industryActivityProducts', metadata)
+    industryBOMEdges = Table('industryBOMEdges', metadata)
+    industryBOMFlat = Table('industryBOMFlat', metadata)
+
+    products = connection.execute(
+        select(
+            industryActivityProducts.c.typeID,
+            industryActivityProducts.c.activityID,
+            industryActivityProducts.c.productTypeID,
+            industryActivityProducts.c.quantity
+        ).where(industryActivityProducts.c.activityID.in_(BOM_ACTIVITIES))
+    ).fetchall()
+
+    # productTypeID -> (blueprintTypeID, activityID, quantity per run)
+    producers = {}
+    for blueprintTypeID, activityID, productTypeID, quantity in sorted(
+            products, key=lambda r: (r[2], r[1], r[0])):
+        if productTypeID not in producers and quantity:
+            producers[productTypeID] = (blueprintTypeID, activityID, quantity)
+
+    materials = defaultdict(list)
+    for blueprintTypeID, activityID, materialTypeID, quantity in connection.execute(
+        select(
+            industryActivityMaterials.c.typeID,
+            industryActivityMaterials.c.activityID,
+            industryActivityMaterials.c.materialTypeID,
+            industryActivityMaterials.c.quantity
+        ).where(industryActivityMaterials.c.activityID.in_(BOM_ACTIVITIES))
+    ):
+        materials[(blueprintTypeID, activityID)].append((materialTypeID, quantity or 0))
+
+    # Direct edges, product -> [(material, quantity per run)]
+    edges = {}
+    edge_rows = []
+    for productTypeID, (blueprintTypeID, activityID, productQuantity) in producers.items():
+        children = {}
+        for materialTypeID, quantity in materials.get((blueprintTypeID, activityID), []):
+            children[materialTypeID] = children.get(materialTypeID, 0) + quantity
+        edges[productTypeID] = list(children.items())
+        for materialTypeID, quantity in children.items():
+            edge_rows.append({
+                'productTypeID': productTypeID,
+                'materialTypeID': materialTypeID,
+                'blueprintTypeID': blueprintTypeID,
+                'activityID': activityID,
+                'quantity': quantity,
+                'productQuantity': productQuantity,
+                'isIntermediate': materialTypeID in producers
+            })
+
+    # Drop back edges found by an iterative DFS so the graph is acyclic
+    WHITE, GREY, BLACK = 0, 1, 2
+    colour = {}
+    cycles = []
+    for root in edges:
+        if colour.get(root, WHITE) != WHITE:
+            continue
+        colour[root] = GREY
+        stack = [(root, iter(edges[root]))]
+        while stack:
+            node, children = stack[-1]
+            advanced = False
+            for materialTypeID, _quantity in children:
+                if materialTypeID not in edges:
+                    continue
+                state = colour.get(materialTypeID, WHITE)
+                if state == GREY:
+                    cycles.append((node, materialTypeID))
+                elif state == WHITE:
+                    colour[materialTypeID] = GREY
+                    stack.append((materialTypeID, iter(edges[materialTypeID])))
+                    advanced = True
+                    break
+            if not advanced:
+                colour[node] = BLACK
+                stack.pop()
+    back_edges = set(cycles)
+    if cycles:
+        print(f"  Warning: {len(cycles)} production cycles broken: {sorted(cycles)[:10]}")
+
+    # Memoised expansion: raw materials per single unit of each product
+    per_unit = {}
+
+    def expand(productTypeID):
+        if productTypeID in per_unit:
+            return per_unit[productTypeID]
+        productQuantity = producers[productTypeID][2]
+        totals = {}
+        for materialTypeID, quantity in edges[productTypeID]:
+            perUnit = quantity / productQuantity
+            if materialTypeID in edges and (productTypeID, materialTypeID) not in back_edges:
+                for rawTypeID, (rawQuantity, depth) in expand(materialTypeID).items():
+                    current = totals.get(rawTypeID, (0.0, 0))
+                    totals[rawTypeID] = (current[0] + perUnit * rawQuantity, max(current[1], depth + 1))
+            else:
+                current = totals.get(materialTypeID, (0.0, 0))
+                totals[materialTypeID] = (current[0] + perUnit, max(current[1], 1))
+        per_unit[productTypeID] = totals
+        return totals
+
+    flat_rows = []
+    for productTypeID in sorted(edges):
+        productQuantity = producers[productTypeID][2]
+        for materialTypeID, (quantity, depth) in expand(productTypeID).items():
+            flat_rows.append({
+                'productTypeID': productTypeID,
+                'materialTypeID': materialTypeID,
+                'quantity': quantity * productQuantity,
+                'depth': depth
+            })
+
+    if edge_rows:
+        connection.execute(industryBOMEdges.insert(), edge_rows)
+        print(f"  Inserted {len(edge_rows)} bill of materials edges")
+    if flat_rows:
+        connection.execute(industryBOMFlat.insert(), flat_rows)
+        print(f"  Inserted {len(flat_rows)} flattened rows for {len(edges)} products")
+    connection.commit()
+    print("  Done")
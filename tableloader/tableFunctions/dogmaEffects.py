@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
 import os
+import json
 from sqlalchemy import Table
 
-from yaml import load, dump
+from yaml import load
 try:
     from yaml import CSafeLoader as SafeLoader
 except ImportError:
@@ -16,7 +17,8 @@ effectcategory={}
 def importyaml(connection,metadata,sourcePath,language='en'):
     print("Importing Dogma Effects")
     dgmEffects = Table('dgmEffects',metadata)
-    
+    dgmEffectModifiers = Table('dgmEffectModifiers',metadata)
+
     targetPath = os.path.join(sourcePath, 'dogmaEffects.yaml')
     if not os.path.exists(targetPath):
         targetPath = os.path.join(sourcePath, 'fsd', 'dogmaEffects.yaml')
@@ -32,8 +34,22 @@ def importyaml(connection,metadata,sourcePath,language='en'):
 
         # Build bulk insert list
         effect_rows = []
+        modifier_rows = []
         for dogmaEffectsid in dogmaEffects:
             effect=dogmaEffects[dogmaEffectsid]
+            modifierInfo = effect.get('modifierInfo')
+            for index, modifier in enumerate(modifierInfo or []):
+                modifier_rows.append({
+                    'effectID': dogmaEffectsid,
+                    'modifierIndex': index,
+                    'func': modifier.get('func'),
+                    'domain': modifier.get('domain'),
+                    'operation': modifier.get('operation'),
+                    'modifiedAttributeID': modifier.get('modifiedAttributeID'),
+                    'modifyingAttributeID': modifier.get('modifyingAttributeID'),
+                    'skillTypeID': modifier.get('skillTypeID'),
+                    'groupID': modifier.get('groupID')
+                })
             effect_rows.append({
                 'effectID': dogmaEffectsid,
                 'effectName': effect.get('name'),  # Changed from 'effectName' to 'name'
@@ -60,13 +76,17 @@ def importyaml(connection,metadata,sourcePath,language='en'):
                 'npcUsageChanceAttributeID': effect.get('npcUsageChanceAttributeID'),
                 'npcActivationChanceAttributeID': effect.get('npcActivationChanceAttributeID'),
                 'fittingUsageChanceAttributeID': effect.get('fittingUsageChanceAttributeID'),
-                'modifierInfo': dump(effect.get('modifierInfo'))
+                # Compact JSON, NULL for effects without modifiers
+                'modifierInfo': json.dumps(modifierInfo, separators=(',', ':')) if modifierInfo else None
             })
 
         # BULK INSERT - single database call
         if effect_rows:
             connection.execute(dgmEffects.insert(), effect_rows)
             print(f"  Inserted {len(effect_rows)} effects")
+        if modifier_rows:
+            connection.execute(dgmEffectModifiers.insert(), modifier_rows)
+            print(f"  Inserted {len(modifier_rows)} effect modifiers")
 
     trans.commit()
     print("  Done")
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 import os
-from sqlalchemy import Table
+import re
+from sqlalchemy import Table, Column, Index, INTEGER, FLOAT, Boolean, select
+
+from sdetools import attributeStore
 
 from yaml import load
 try:
@@ -8,8 +11,226 @@ try:
 except ImportError:
     from yaml import SafeLoader
 
+# requiredSkill1..6 and the matching requiredSkill1Level..6Level attribute IDs
+REQUIRED_SKILL_ATTRIBUTES = {182: 277, 183: 278, 184: 279, 1285: 1286, 1289: 1287, 1290: 1288}
+
+
+def buildSkillClosure(dogmaTypes):
+    """
+    Transitive skill requirements of every type in typeDogma.
+
+    Returns skillPrerequisiteClosure rows: for each type and every skill
+    needed directly or through other skills' prerequisites, the highest
+    level required anywhere in the tree and the deepest depth it appears at
+    (1 = direct requirement), so training in descending depth order is safe.
+    """
+    direct = {}
+    for typeid, dogma in dogmaTypes.items():
+        values = {a.get('attributeID'): a.get('value') for a in dogma.get('dogmaAttributes', [])}
+        required = {}
+        for skillAttribute, levelAttribute in REQUIRED_SKILL_ATTRIBUTES.items():
+            skill = values.get(skillAttribute)
+            if skill:
+                skill = int(skill)
+                required[skill] = max(required.get(skill, 0), int(values.get(levelAttribute) or 0))
+        if required:
+            direct[typeid] = required
+
+    rows = []
+    for typeid in direct:
+        best = {}
+        stack = [(skill, level, 1, (typeid,)) for skill, level in direct[typeid].items()]
+        while stack:
+            skill, level, depth, path = stack.pop()
+            if skill in path:
+                continue
+            current = best.get(skill)
+            if current is not None and current[0] >= level and current[1] >= depth:
+                continue
+            best[skill] = (max(level, current[0]) if current else level, max(depth, current[1]) if current else depth)
+            for child, childLevel in direct.get(skill, {}).items():
+                stack.append((child, childLevel, depth + 1, path + (skill,)))
+        for skill, (level, depth) in best.items():
+            rows.append({'typeID': typeid, 'skillID': skill, 'level': level, 'depth': depth})
+    return rows
+
+
+FIT_GROUP_ATTRIBUTE = re.compile(r'^canFitShipGroup\d+$')
+FIT_TYPE_ATTRIBUTE = re.compile(r'^canFitShipType\d+$')
+CHARGE_GROUP_ATTRIBUTE = re.compile(r'^chargeGroup\d+$')
+
+
+def buildCompatibility(dogmaTypes, attributeNames, typeGroups):
+    """
+    fitCompatibility and chargeCompatibility rows from the restriction
+    attributes, resolved by name (canFitShipGroupNN, canFitShipTypeN,
+    chargeGroupN, chargeSize) so new numbered slots are picked up.
+
+    A module without canFitShip* attributes has no fitCompatibility rows and
+    is unrestricted. A weapon accepts every charge in one of its charge
+    groups whose chargeSize matches, when the weapon has a chargeSize.
+    """
+    fitGroup = {a for a, name in attributeNames.items() if FIT_GROUP_ATTRIBUTE.match(name)}
+    fitType = {a for a, name in attributeNames.items() if FIT_TYPE_ATTRIBUTE.match(name)}
+    chargeGroup = {a for a, name in attributeNames.items() if CHARGE_GROUP_ATTRIBUTE.match(name)}
+    chargeSize = next((a for a, name in attributeNames.items() if name == 'chargeSize'), None)
+
+    fit_rows = {}
+    weapons = {}
+    sizes = {}
+    for typeid, dogma in dogmaTypes.items():
+        groups = set()
+        for attribute in dogma.get('dogmaAttributes', []):
+            attributeID = attribute.get('attributeID')
+            value = attribute.get('value')
+            if not value:
+                continue
+            if attributeID in fitGroup:
+                fit_rows[(typeid, 'group', int(value))] = None
+            elif attributeID in fitType:
+                fit_rows[(typeid, 'type', int(value))] = None
+            elif attributeID in chargeGroup:
+                groups.add(int(value))
+            elif attributeID == chargeSize:
+                sizes[typeid] = int(value)
+        if groups:
+            weapons[typeid] = groups
+
+    charges_by_group = {}
+    for typeid, groupID in typeGroups.items():
+        charges_by_group.setdefault(groupID, []).append(typeid)
+
+    charge_rows = []
+    for weapon, groups in weapons.items():
+        size = sizes.get(weapon)
+        for groupID in sorted(groups):
+            for charge in charges_by_group.get(groupID, []):
+                if size is None or sizes.get(charge) in (None, size):
+                    charge_rows.append({'weaponTypeID': weapon, 'chargeTypeID': charge})
+
+    fit_rows = [
+        {'moduleTypeID': typeid, 'restrictionKind': kind, 'restrictionID': target}
+        for typeid, kind, target in fit_rows
+    ]
+    return fit_rows, charge_rows
+
+
+def buildEffectiveAttributes(dogmaTypes, defaults, typeGroups, publishedTypes):
+    """
+    dgmTypeAttributesEffective rows for the published types: every attribute
+    set on any published type of the same group, with the type's own value or
+    the dgmAttributeTypes defaultValue (isDefault) when it does not set it.
+    """
+    explicit = {}
+    groupAttributes = {}
+    for typeid in publishedTypes:
+        values = {
+            a.get('attributeID'): a.get('value')
+            for a in dogmaTypes.get(typeid, {}).get('dogmaAttributes', [])
+            if a.get('attributeID') in defaults
+        }
+        explicit[typeid] = values
+        groupAttributes.setdefault(typeGroups.get(typeid), set()).update(values)
+
+    rows = []
+    for typeid, values in explicit.items():
+        for attributeID in sorted(groupAttributes[typeGroups.get(typeid)]):
+            if attributeID in values:
+                rows.append({'typeID': typeid, 'attributeID': attributeID, 'value': values[attributeID], 'isDefault': False})
+            else:
+                rows.append({'typeID': typeid, 'attributeID': attributeID, 'value': defaults[attributeID], 'isDefault': True})
+    return rows
+
 
-def importyaml(connection,metadata,sourcePath,language='en'):
+PIVOT_NAME = re.compile(r'[^A-Za-z0-9_]')
+
+# Attribute columns per pivot table; MSSQL allows 1024 columns per table,
+# and 1000 FLOAT columns stay inside the MySQL/InnoDB row size limit
+PIVOT_MAX_COLUMNS = 1000
+
+
+def pivotColumnNames(attributes):
+    """
+    {attributeID: column name} for pivot tables: the attributeName reduced to
+    [A-Za-z0-9_] and 60 characters, with the attributeID appended when names
+    collide case-insensitively or clash with the fixed columns.
+    """
+    names = {}
+    taken = {'typeid', 'groupid', 'published'}
+    for attributeID, name in sorted(attributes.items()):
+        column = PIVOT_NAME.sub('_', name or '')[:60] or f'attribute_{attributeID}'
+        if column[0].isdigit():
+            column = f'attr_{column}'[:60]
+        if column.lower() in taken:
+            column = f'{column[:50]}_{attributeID}'
+        taken.add(column.lower())
+        names[attributeID] = column
+    return names
+
+
+def buildPivotTables(connection, metadata, dogmaTypes, publishedAttributes, typeRows, categoryNames, pivotCategories):
+    """
+    Create and fill one wide table per configured categoryID, named
+    dgmPivot<categoryName>: typeID, groupID, published and one FLOAT column
+    per published attribute set on any type of the category. Types that do
+    not set an attribute hold NULL, as in dgmTypeAttributes.
+
+    Each table is created and filled in its own transaction. A category with
+    more than PIVOT_MAX_COLUMNS attributes, or one that fails, is skipped
+    with a warning.
+    """
+    for categoryID in pivotCategories:
+        types = [r for r in typeRows if r[4] == categoryID]
+        values = {
+            r[0]: {
+                a.get('attributeID'): a.get('value')
+                for a in dogmaTypes.get(r[0], {}).get('dogmaAttributes', [])
+                if a.get('attributeID') in publishedAttributes
+            }
+            for r in types
+        }
+        used = set()
+        for typeValues in values.values():
+            used.update(typeValues)
+        columns = pivotColumnNames({a: publishedAttributes[a] for a in used})
+
+        tableName = 'dgmPivot' + (PIVOT_NAME.sub('', categoryNames.get(categoryID) or '') or str(categoryID))
+        if len(columns) > PIVOT_MAX_COLUMNS:
+            print(f"  Warning: skipping {tableName}, {len(columns)} attribute columns exceed {PIVOT_MAX_COLUMNS}")
+            continue
+        if tableName in metadata.tables:
+            metadata.remove(metadata.tables[tableName])
+        pivot = Table(tableName, metadata,
+            Column('typeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('groupID', INTEGER()),
+            Column('published', Boolean(name=f'{tableName}_pub')),
+            *[Column(columns[a], FLOAT()) for a in sorted(columns)]
+        )
+        Index(f'{tableName}_IX_groupID', pivot.c.groupID)
+
+        rows = []
+        for typeid, groupID, published, _categoryPublished, _categoryID in types:
+            row = {columns[a]: None for a in columns}
+            row.update({columns[a]: v for a, v in values[typeid].items()})
+            row.update({'typeID': typeid, 'groupID': groupID, 'published': published})
+            rows.append(row)
+
+        try:
+            pivot.drop(connection, checkfirst=True)
+            pivot.create(connection)
+            connection.commit()
+            if rows:
+                connection.execute(pivot.insert(), rows)
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            metadata.remove(pivot)
+            print(f"  Warning: skipping {tableName}: {str(e).splitlines()[0]}")
+            continue
+        print(f"  Created {tableName} with {len(rows)} types and {len(columns)} attribute columns")
+
+
+def importyaml(connection,metadata,sourcePath,language='en',effectiveAttributes=False,destinationPath=None,pivotCategories=()):
     print("Importing Dogma Types")
     dgmEffects = Table('dgmTypeEffects',metadata)
     dgmAttributes = Table('dgmTypeAttributes',metadata)
@@ -22,6 +243,30 @@ def importyaml(connection,metadata,sourcePath,language='en'):
     
     print(f"  Opening {targetPath}")
 
+    skillPrerequisiteClosure = Table('skillPrerequisiteClosure',metadata)
+    fitCompatibility = Table('fitCompatibility',metadata)
+    chargeCompatibility = Table('chargeCompatibility',metadata)
+    dgmTypeAttributesEffective = Table('dgmTypeAttributesEffective',metadata)
+    dgmAttributeTypes = Table('dgmAttributeTypes',metadata)
+    invTypes = Table('invTypes',metadata)
+    invCategories = Table('invCategories',metadata)
+
+    # Restriction attributes are resolved by name, so dogmaAttributes and types load first
+    attributeRows = connection.execute(
+        select(dgmAttributeTypes.c.attributeID, dgmAttributeTypes.c.attributeName, dgmAttributeTypes.c.defaultValue,
+               dgmAttributeTypes.c.published)
+    ).fetchall()
+    attributeNames = {r[0]: r[1] for r in attributeRows}
+    typeRows = connection.execute(
+        select(invTypes.c.typeID, invTypes.c.groupID, invTypes.c.published, invCategories.c.published, invTypes.c.categoryID)
+        .select_from(invTypes.outerjoin(invCategories, invCategories.c.categoryID == invTypes.c.categoryID))
+    ).fetchall()
+    typeGroups = {r[0]: r[1] for r in typeRows}
+    categoryNames = dict(connection.execute(
+        select(invCategories.c.categoryID, invCategories.c.categoryName)
+    ).fetchall())
+    connection.commit()
+
     trans = connection.begin()
     with open(targetPath,'r', encoding='utf-8') as yamlstream:
         dogmaEffects=load(yamlstream,Loader=SafeLoader)
@@ -59,5 +304,46 @@ def importyaml(connection,metadata,sourcePath,language='en'):
             connection.execute(dgmAttributes.insert(), attribute_rows)
             print(f"  Inserted {len(attribute_rows)} dogma attributes")
 
+        closure_rows = buildSkillClosure(dogmaEffects)
+        if closure_rows:
+            connection.execute(skillPrerequisiteClosure.insert(), closure_rows)
+            print(f"  Inserted {len(closure_rows)} skill prerequisite closure rows")
+
+        fit_rows, charge_rows = buildCompatibility(dogmaEffects, attributeNames, typeGroups)
+        if fit_rows:
+            connection.execute(fitCompatibility.insert(), fit_rows)
+            print(f"  Inserted {len(fit_rows)} fitting restrictions")
+        if charge_rows:
+            connection.execute(chargeCompatibility.insert(), charge_rows)
+            print(f"  Inserted {len(charge_rows)} weapon/charge pairs")
+
+        if effectiveAttributes:
+            defaults = {r[0]: r[2] if r[2] is not None else 0.0 for r in attributeRows}
+            publishedTypes = [r[0] for r in typeRows if r[2] and r[3]]
+            effective_rows = buildEffectiveAttributes(dogmaEffects, defaults, typeGroups, publishedTypes)
+            if effective_rows:
+                connection.execute(dgmTypeAttributesEffective.insert(), effective_rows)
+                print(f"  Inserted {len(effective_rows)} effective type attributes")
+
+        # Columnar attribute store over every invTypes typeID
+        if destinationPath is not None:
+            os.makedirs(destinationPath, exist_ok=True)
+            storePath = os.path.join(destinationPath, 'dogmaAttributes.npz')
+            attributeStore.write_store(
+                storePath,
+                [r[0] for r in typeRows],
+                [r[1] or 0 for r in typeRows],
+                [r[4] or 0 for r in typeRows],
+                [bool(r[2]) for r in typeRows],
+                [r[:3] for r in attributeRows],
+                [(r['typeID'], r['attributeID'], r['valueFloat']) for r in attribute_rows]
+            )
+            print(f"  Wrote attribute store to {storePath}")
+
     trans.commit()
+
+    # Pivot tables run their own DDL and transactions after the import has been committed
+    if pivotCategories:
+        publishedAttributes = {r[0]: r[1] for r in attributeRows if r[3]}
+        buildPivotTables(connection, metadata, dogmaEffects, publishedAttributes, typeRows, categoryNames, pivotCategories)
     print("  Done")
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from sqlalchemy import Table, select
+
+
+def closure(parents):
+    """
+    Ancestor/descendant pairs of a forest given as {node: parentID}.
+
+    Returns (ancestorID, descendantID, depth) tuples including the depth 0
+    self pair of every node. Parent loops are cut where they are detected.
+    """
+    rows = []
+    for node in parents:
+        rows.append((node, node, 0))
+        seen = {node}
+        parent = parents.get(node)
+        depth = 1
+        while parent is not None and parent not in seen:
+            rows.append((parent, node, depth))
+            seen.add(parent)
+            parent = parents.get(parent)
+            depth += 1
+        if parent is not None:
+            print(f"  Warning: parent loop at {parent} while walking up from {node}")
+    return rows
+
+
+def buildHierarchies(connection,metadata):
+    """
+    Fill invMarketGroupsClosure from invMarketGroups.parentGroupID and
+    invMetaTypesClosure (variation families) from invMetaTypes.parentTypeID.
+    Needs marketGroups and types loaded; invTypes.categoryID is filled by
+    types.importyaml.
+    """
+    print("Building Hierarchy Closures")
+    invMarketGroups = Table('invMarketGroups',metadata)
+    invMetaTypes = Table('invMetaTypes',metadata)
+    invMarketGroupsClosure = Table('invMarketGroupsClosure',metadata)
+    invMetaTypesClosure = Table('invMetaTypesClosure',metadata)
+
+    market_parents = dict(connection.execute(
+        select(invMarketGroups.c.marketGroupID, invMarketGroups.c.parentGroupID)
+    ).fetchall())
+    market_rows = [
+        {'ancestorID': ancestor, 'descendantID': descendant, 'depth': depth}
+        for ancestor, descendant, depth in closure(market_parents)
+    ]
+
+    # Variation parents that have no invMetaTypes row of their own are roots
+    meta_parents = dict(connection.execute(
+        select(invMetaTypes.c.typeID, invMetaTypes.c.parentTypeID)
+    ).fetchall())
+    for parent in list(meta_parents.values()):
+        if parent is not None and parent not in meta_parents:
+            meta_parents[parent] = None
+    meta_rows = [
+        {'ancestorTypeID': ancestor, 'typeID': descendant, 'depth': depth}
+        for ancestor, descendant, depth in closure(meta_parents)
+    ]
+
+    if market_rows:
+        connection.execute(invMarketGroupsClosure.insert(), market_rows)
+        print(f"  Inserted {len(market_rows)} market group closure rows")
+    if meta_rows:
+        connection.execute(invMetaTypesClosure.insert(), meta_rows)
+        print(f"  Inserted {len(meta_rows)} variation closure rows")
+
+    connection.commit()
+    print("  Done")
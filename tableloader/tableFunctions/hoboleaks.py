@@ -0,0 +1,104 @@
+"""
+hoboleaks.py
+
+Local cache for the hoboleaks.space JSON datasets used by the volume and
+rig mapping loaders.
+
+Downloads are stored content-addressed as .cache_hoboleaks/objects/<sha256>.json,
+and .cache_hoboleaks/index.json maps each URL to its current object together
+with the ETag / Last-Modified validators the server sent. Refreshes are
+conditional requests, so an unchanged dataset costs a single 304 response.
+
+In offline mode, or when the server cannot be reached, the cached copy is
+used as-is. fetch_json returns None when no copy is available at all, and
+the caller decides on a fallback.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import requests
+
+CACHE_DIR = Path('.cache_hoboleaks')
+
+
+def _load_index(cache_dir: Path) -> dict:
+    index_path = cache_dir / 'index.json'
+    if index_path.exists():
+        try:
+            return json.loads(index_path.read_text(encoding='utf-8'))
+        except ValueError:
+            print(f"  Warning: ignoring unreadable cache index {index_path}")
+    return {}
+
+
+def _save_index(cache_dir: Path, index: dict) -> None:
+    index_path = cache_dir / 'index.json'
+    tmp_path = index_path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(index, indent=2, sort_keys=True), encoding='utf-8')
+    tmp_path.replace(index_path)
+
+
+def _cached_bytes(cache_dir: Path, entry: dict):
+    if not entry:
+        return None
+    object_path = cache_dir / 'objects' / f"{entry['sha256']}.json"
+    if object_path.exists():
+        return object_path.read_bytes()
+    return None
+
+
+def fetch_json(url: str, offline: bool = False, cache_dir: Path = CACHE_DIR, timeout: int = 30):
+    """
+    Return the parsed JSON document at url, refreshing the local cache with a
+    conditional request unless offline is set. Returns None if neither the
+    server nor the cache can provide it.
+    """
+    cache_dir = Path(cache_dir)
+    (cache_dir / 'objects').mkdir(parents=True, exist_ok=True)
+    index = _load_index(cache_dir)
+    entry = index.get(url)
+    cached = _cached_bytes(cache_dir, entry)
+
+    if offline:
+        if cached is None:
+            print(f"  Offline: no cached copy of {url}")
+            return None
+        print(f"  Offline: using cached copy of {url} ({entry['sha256'][:12]})")
+        return json.loads(cached)
+
+    headers = {}
+    if cached is not None:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('lastModified'):
+            headers['If-Modified-Since'] = entry['lastModified']
+
+    try:
+        print(f"  Fetching {url}...")
+        response = requests.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached is not None:
+            print(f"  Not modified, using cached copy ({entry['sha256'][:12]})")
+            return json.loads(cached)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        if cached is None:
+            print(f"  Warning: could not fetch {url}: {e}")
+            return None
+        print(f"  Warning: could not refresh {url} ({e}), using cached copy")
+        return json.loads(cached)
+
+    data = response.content
+    digest = hashlib.sha256(data).hexdigest()
+    object_path = cache_dir / 'objects' / f"{digest}.json"
+    if not object_path.exists():
+        object_path.write_bytes(data)
+
+    index[url] = {
+        'sha256': digest,
+        'etag': response.headers.get('ETag'),
+        'lastModified': response.headers.get('Last-Modified'),
+    }
+    _save_index(cache_dir, index)
+    return json.loads(data)
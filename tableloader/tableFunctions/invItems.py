@@ -13,12 +13,14 @@ def importyaml(connection, metadata, sourcePath, language='en'):
     else:
         quote = ''
 
+    # Stations are also in mapDenormalize; they come from staStations below with their owner
     print("  Inserting from mapDenormalize (celestials)")
     connection.execute(text(f"""
         INSERT INTO {quote}invItems{quote} ({quote}itemID{quote}, {quote}typeID{quote}, {quote}ownerID{quote}, {quote}locationID{quote}, {quote}flagID{quote}, {quote}quantity{quote})
         SELECT {quote}itemID{quote}, {quote}typeID{quote}, 1, {quote}solarSystemID{quote}, 0, 1
-        FROM {quote}mapDenormalize{quote}
+        FROM {quote}mapDenormalize{quote} d
         WHERE {quote}solarSystemID{quote} IS NOT NULL
+        AND NOT EXISTS (SELECT 1 FROM {quote}staStations{quote} s WHERE s.{quote}stationID{quote} = d.{quote}itemID{quote})
     """))
 
     print("  Inserting from staStations")
@@ -4,7 +4,7 @@ try:
 except ImportError:
     from yaml import Loader
 
-from sqlalchemy import Table
+from sqlalchemy import Table, select
 import os
 
 def importyaml(connection, metadata, sourcePath, language='en'):
@@ -18,11 +18,28 @@ def importyaml(connection, metadata, sourcePath, language='en'):
 
     dgmMasteries = metadata.tables['dgmMasteries']
     dgmTypeMasteries = metadata.tables['dgmTypeMasteries']
+    crtRelationships = metadata.tables['crtRelationships']
+    shipMasterySkills = metadata.tables['shipMasterySkills']
+
+    # certificateID -> certificate grade (1 basic .. 5 elite) -> {skillID: level}
+    cert_skills = {}
+    for certID, skillID, level, certGrade in connection.execute(
+        select(
+            crtRelationships.c.childID,
+            crtRelationships.c.parentTypeID,
+            crtRelationships.c.parentLevel,
+            crtRelationships.c.grade
+        )
+    ):
+        skills = cert_skills.setdefault(certID, {}).setdefault(certGrade, {})
+        skills[skillID] = max(skills.get(skillID, 0), level or 0)
+    connection.commit()
 
     print(f"  Processing {len(data)} ship types")
 
     type_mastery_list = []
     mastery_list = []
+    ship_skill_list = []
     masteryID_counter = 1
 
     trans = connection.begin()
@@ -45,12 +62,33 @@ def importyaml(connection, metadata, sourcePath, language='en'):
                         'masteryID': currentMasteryID
                     })
 
+            # Mastery grade 0..4 (stored as masteryLevel 1..5, mastery I..V) needs
+            # its certificates at grade + 1 (basic..elite), which includes the
+            # lower certificate grades, and every lower mastery level as well,
+            # so requirements accumulate
+            required = {}
+            for grade in sorted(grades):
+                for certID in grades[grade]:
+                    for certGrade in range(1, grade + 2):
+                        for skillID, level in cert_skills.get(certID, {}).get(certGrade, {}).items():
+                            required[skillID] = max(required.get(skillID, 0), level)
+                for skillID, level in required.items():
+                    ship_skill_list.append({
+                        'shipTypeID': typeID,
+                        'masteryLevel': grade + 1,
+                        'skillTypeID': skillID,
+                        'requiredLevel': level
+                    })
+
         print(f"  Inserting {len(mastery_list)} mastery rules")
 
         if mastery_list:
             connection.execute(dgmMasteries.insert(), mastery_list)
         if type_mastery_list:
             connection.execute(dgmTypeMasteries.insert(), type_mastery_list)
+        if ship_skill_list:
+            connection.execute(shipMasterySkills.insert(), ship_skill_list)
+            print(f"  Inserted {len(ship_skill_list)} ship mastery skill requirements")
 
         trans.commit()
         print("  Done")
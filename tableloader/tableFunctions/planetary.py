@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
-from sqlalchemy import Table
+from sqlalchemy import Table, select
+
+from sdetools import planetaryChains
 
 from yaml import load
 try:
@@ -72,3 +74,58 @@ def importyaml(connection,metadata,sourcePath,language='en'):
 
     trans.commit()
     print("  Done")
+
+
+def buildChains(connection,metadata):
+    """
+    Fill planetSchematicsChain (tier, output quantity, own and serial chain
+    cycle time per product) and planetSchematicsChainInputs (P0 resources
+    per schematic cycle) from the loaded schematics.
+    """
+    print("Building Planetary Production Chains")
+    planetSchematics = Table('planetSchematics',metadata)
+    planetSchematicsTypeMap = Table('planetSchematicsTypeMap',metadata)
+    planetSchematicsChain = Table('planetSchematicsChain',metadata)
+    planetSchematicsChainInputs = Table('planetSchematicsChainInputs',metadata)
+
+    schematics = dict(connection.execute(
+        select(planetSchematics.c.schematicID, planetSchematics.c.cycleTime)
+    ).fetchall())
+    typeRows = connection.execute(
+        select(
+            planetSchematicsTypeMap.c.schematicID,
+            planetSchematicsTypeMap.c.typeID,
+            planetSchematicsTypeMap.c.quantity,
+            planetSchematicsTypeMap.c.isInput
+        )
+    ).fetchall()
+
+    chains = planetaryChains.build_chains(schematics, typeRows)
+
+    chain_rows = []
+    input_rows = []
+    for typeID, chain in chains.items():
+        chain_rows.append({
+            'typeID': typeID,
+            'schematicID': chain.schematicID,
+            'tier': chain.tier,
+            'outputQuantity': chain.outputQuantity,
+            'cycleTime': chain.cycleTime,
+            'chainCycleTime': chain.chainCycleTime
+        })
+        for inputTypeID, quantity in chain.p0Inputs.items():
+            input_rows.append({
+                'typeID': typeID,
+                'inputTypeID': inputTypeID,
+                'quantity': quantity
+            })
+
+    if chain_rows:
+        connection.execute(planetSchematicsChain.insert(), chain_rows)
+        print(f"  Inserted {len(chain_rows)} production chains")
+    if input_rows:
+        connection.execute(planetSchematicsChainInputs.insert(), input_rows)
+        print(f"  Inserted {len(input_rows)} P0 input rows")
+
+    connection.commit()
+    print("  Done")
@@ -35,16 +35,16 @@ Notes:
 from __future__ import annotations
 
 # import argparse
-import json
 import os
 import sys
-import urllib.request
 from sqlalchemy import Table, select, text, func
 from collections import defaultdict
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Set, Tuple
 
+from . import hoboleaks
+
 
 HOBOSRC_DEFAULT = "https://sde.hoboleaks.space/tq/industrymodifiersources.json"
 HOBOTGT_DEFAULT = "https://sde.hoboleaks.space/tq/industrytargetfilters.json"
@@ -64,23 +64,6 @@ FALLBACK_ACTIVITY_IDS = {
 }
 
 
-# ----------------------------
-# Download / cache
-# ----------------------------
-def download_if_needed(url: str, dest_path: Path, force: bool = False) -> None:
-    dest_path.parent.mkdir(parents=True, exist_ok=True)
-    if dest_path.exists() and not force:
-        return
-    print(f"Downloading {url} -> {dest_path}")
-    with urllib.request.urlopen(url) as resp:
-        data = resp.read()
-    dest_path.write_bytes(data)
-
-
-def load_json(path: Path) -> dict:
-    return json.loads(path.read_text(encoding="utf-8"))
-
-
 # ----------------------------
 # DB helpers
 # ----------------------------
@@ -259,19 +242,16 @@ def filters_for_rig_activity(mod_rows: Iterable[Tuple[int, str, str, int, Option
         out[key] = s if s else {None}
     return out
 
-def importRigMappings(connection,metadata):
+def importRigMappings(connection,metadata,offline=False):
     print("Importing Rig Mappings")
     show_debug = True
-    cache_dir = Path('.cache_hoboleaks')
-    mods_path = cache_dir / "industrymodifiersources.json"
-    filters_path = cache_dir / "industrytargetfilters.json"
-
-    # Download/cache JSON
-    download_if_needed(HOBOSRC_DEFAULT, mods_path, force=True)
-    download_if_needed(HOBOTGT_DEFAULT, filters_path, force=True)
 
-    mod_sources_json = load_json(mods_path)
-    target_filters_json = load_json(filters_path)
+    # Fetch JSON through the local cache (conditional refresh, or cached copy when offline)
+    mod_sources_json = hoboleaks.fetch_json(HOBOSRC_DEFAULT, offline=offline)
+    target_filters_json = hoboleaks.fetch_json(HOBOTGT_DEFAULT, offline=offline)
+    if mod_sources_json is None or target_filters_json is None:
+        print("  Warning: industry modifier data unavailable, skipping rig mappings")
+        return
 
     filters = parse_filters(target_filters_json)
     mod_rows = extract_modifier_rows(mod_sources_json)
@@ -289,14 +269,17 @@ def importRigMappings(connection,metadata):
     if not show_debug:
         print(f"Inserting {len(mod_rows)} rigIndustryModifierSources rows...")
 
-    for row in mod_rows:
-        conn.execute(rigIndustryModifierSources.insert().values(
-            rigTypeID=row[0],
-            activityKey=row[1],
-            bonusType=row[2],
-            dogmaAttributeID=row[3],
-            filterID=row[4]
-        ))
+    if mod_rows:
+        conn.execute(rigIndustryModifierSources.insert(), [
+            {
+                'rigTypeID': row[0],
+                'activityKey': row[1],
+                'bonusType': row[2],
+                'dogmaAttributeID': row[3],
+                'filterID': row[4],
+            }
+            for row in mod_rows
+        ])
 
     # Commit first batch of inserts
     if trans is not None:
@@ -349,8 +332,7 @@ def importRigMappings(connection,metadata):
 
         rows = conn.execute(query).fetchall()
 
-        # Begin transaction for this activity's inserts (defensive check)
-        trans = conn.begin() if not conn.in_transaction() else None
+        affected_rows = []
 
         for r in rows:
             rig_type_id = int(r[0])  # rigTypeID
@@ -380,18 +362,21 @@ def importRigMappings(connection,metadata):
                         )
                     groups = affected_cache[cache_key]
 
-                # Insert rigAffectedProductGroups
+                # Collect rigAffectedProductGroups rows
                 for gid in groups:
-                    conn.execute(rigAffectedProductGroups.insert().values(
-                        rigTypeID=rig_type_id,
-                        activityKey=activity_key,
-                        bonusType=bonus_type,
-                        productGroupID=int(gid),
-                        filterID=fid
-                    ))
+                    affected_rows.append({
+                        'rigTypeID': rig_type_id,
+                        'activityKey': activity_key,
+                        'bonusType': bonus_type,
+                        'productGroupID': int(gid),
+                        'filterID': fid,
+                    })
                 total_insert += len(groups)
 
-        # Commit this activity's inserts
+        # Insert this activity's rows in one batch (defensive transaction check)
+        trans = conn.begin() if not conn.in_transaction() else None
+        if affected_rows:
+            conn.execute(rigAffectedProductGroups.insert(), affected_rows)
         if trans is not None:
             trans.commit()
         else:
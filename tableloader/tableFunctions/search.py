@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+FTS5 search tables for the SQLite build.
+
+invTypesSearch has one row per type and language with the type, group and
+market group names and the description as indexed columns, and typeID,
+languageID, groupID, categoryID and published as UNINDEXED filter columns.
+The default rank weights the columns 10 / 4 / 2 / 1, so
+
+    SELECT typeID, typeName FROM invTypesSearch
+    WHERE invTypesSearch MATCH 'vexor' AND languageID = 'en'
+    ORDER BY rank LIMIT 20
+
+returns name hits before group or description hits. invGroupsSearch and
+invMarketGroupsSearch do the same for group and market group names. Rows
+without a translation are indexed from the base tables in the loader
+language.
+
+The trigram tokenizer (substring matching, SQLite 3.34+) is used when
+available, otherwise unicode61 with prefix indexes.
+"""
+
+# trnTranslations tcIDs
+TYPE_NAME, TYPE_DESCRIPTION, GROUP_NAME, MARKET_GROUP_NAME, MARKET_GROUP_DESCRIPTION = 8, 33, 7, 36, 37
+
+SEARCH_TABLES = ('invTypesSearch', 'invGroupsSearch', 'invMarketGroupsSearch')
+
+
+# First SQLite release with the FTS5 trigram tokenizer
+TRIGRAM_VERSION = (3, 34, 0)
+
+
+def tokenizer(connection):
+    """FTS5 tokenize option supported by this SQLite build."""
+    # Checked by version rather than a probe table so the caller's open transaction is untouched
+    version = connection.exec_driver_sql("SELECT sqlite_version()").scalar()
+    if tuple(int(part) for part in version.split('.')[:3]) >= TRIGRAM_VERSION:
+        return "tokenize='trigram'"
+    return "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+
+def buildSearch(connection,metadata,language='en'):
+    if connection.dialect.name != 'sqlite':
+        print("Skipping Search Tables (SQLite only)")
+        return
+    print("Building Search Tables")
+    schema = metadata.schema + '.' if metadata.schema else ''
+
+    tokenize = tokenizer(connection)
+    print(f"  Using {tokenize}")
+    for table in SEARCH_TABLES:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {schema}{table}")
+
+    connection.exec_driver_sql(f"""
+        CREATE VIRTUAL TABLE {schema}invTypesSearch USING fts5(
+            typeName, groupName, marketGroupName, description,
+            typeID UNINDEXED, languageID UNINDEXED, groupID UNINDEXED, categoryID UNINDEXED, published UNINDEXED,
+            {tokenize})""")
+    connection.exec_driver_sql(f"""
+        CREATE VIRTUAL TABLE {schema}invGroupsSearch USING fts5(
+            groupName, groupID UNINDEXED, categoryID UNINDEXED, languageID UNINDEXED, published UNINDEXED,
+            {tokenize})""")
+    connection.exec_driver_sql(f"""
+        CREATE VIRTUAL TABLE {schema}invMarketGroupsSearch USING fts5(
+            marketGroupName, description, marketGroupID UNINDEXED, parentGroupID UNINDEXED, languageID UNINDEXED,
+            {tokenize})""")
+
+    # Translated rows for every language in trnTranslations, then the loader
+    # language from the base tables for anything without a translated name,
+    # for types, groups and market groups alike
+    connection.exec_driver_sql(f"""
+        INSERT INTO {schema}invTypesSearch
+            (typeName, groupName, marketGroupName, description, typeID, languageID, groupID, categoryID, published)
+        SELECT n.text, g.text, m.text, d.text, t.typeID, n.languageID, t.groupID, t.categoryID, t.published
+        FROM {schema}invTypes t
+        JOIN {schema}trnTranslations n ON n.tcID = {TYPE_NAME} AND n.keyID = t.typeID
+        LEFT JOIN {schema}trnTranslations d ON d.tcID = {TYPE_DESCRIPTION} AND d.keyID = t.typeID AND d.languageID = n.languageID
+        LEFT JOIN {schema}trnTranslations g ON g.tcID = {GROUP_NAME} AND g.keyID = t.groupID AND g.languageID = n.languageID
+        LEFT JOIN {schema}trnTranslations m ON m.tcID = {MARKET_GROUP_NAME} AND m.keyID = t.marketGroupID AND m.languageID = n.languageID
+        ORDER BY t.typeID""")
+    connection.exec_driver_sql(f"""
+        INSERT INTO {schema}invTypesSearch
+            (typeName, groupName, marketGroupName, description, typeID, languageID, groupID, categoryID, published)
+        SELECT t.typeName, ig.groupName, mg.marketGroupName, t.description, t.typeID, ?, t.groupID, t.categoryID, t.published
+        FROM {schema}invTypes t
+        LEFT JOIN {schema}invGroups ig ON ig.groupID = t.groupID
+        LEFT JOIN {schema}invMarketGroups mg ON mg.marketGroupID = t.marketGroupID
+        WHERE t.typeName IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM {schema}trnTranslations n WHERE n.tcID = {TYPE_NAME} AND n.keyID = t.typeID)
+        ORDER BY t.typeID""", (language,))
+
+    connection.exec_driver_sql(f"""
+        INSERT INTO {schema}invGroupsSearch (groupName, groupID, categoryID, languageID, published)
+        SELECT n.text, ig.groupID, ig.categoryID, n.languageID, ig.published
+        FROM {schema}invGroups ig
+        JOIN {schema}trnTranslations n ON n.tcID = {GROUP_NAME} AND n.keyID = ig.groupID
+        ORDER BY ig.groupID""")
+    connection.exec_driver_sql(f"""
+        INSERT INTO {schema}invGroupsSearch (groupName, groupID, categoryID, languageID, published)
+        SELECT ig.groupName, ig.groupID, ig.categoryID, ?, ig.published
+        FROM {schema}invGroups ig
+        WHERE ig.groupName IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM {schema}trnTranslations n WHERE n.tcID = {GROUP_NAME} AND n.keyID = ig.groupID)
+        ORDER BY ig.groupID""", (language,))
+    connection.exec_driver_sql(f"""
+        INSERT INTO {schema}invMarketGroupsSearch (marketGroupName, description, marketGroupID, parentGroupID, languageID)
+        SELECT n.text, d.text, mg.marketGroupID, mg.parentGroupID, n.languageID
+        FROM {schema}invMarketGroups mg
+        JOIN {schema}trnTranslations n ON n.tcID = {MARKET_GROUP_NAME} AND n.keyID = mg.marketGroupID
+        LEFT JOIN {schema}trnTranslations d ON d.tcID = {MARKET_GROUP_DESCRIPTION} AND d.keyID = mg.marketGroupID AND d.languageID = n.languageID
+        ORDER BY mg.marketGroupID""")
+    connection.exec_driver_sql(f"""
+        INSERT INTO {schema}invMarketGroupsSearch (marketGroupName, description, marketGroupID, parentGroupID, languageID)
+        SELECT mg.marketGroupName, mg.description, mg.marketGroupID, mg.parentGroupID, ?
+        FROM {schema}invMarketGroups mg
+        WHERE mg.marketGroupName IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM {schema}trnTranslations n WHERE n.tcID = {MARKET_GROUP_NAME} AND n.keyID = mg.marketGroupID)
+        ORDER BY mg.marketGroupID""", (language,))
+
+    # Column weights for ORDER BY rank, then merge the b-trees built by the bulk insert
+    connection.exec_driver_sql(f"INSERT INTO {schema}invTypesSearch(invTypesSearch, rank) VALUES ('rank', 'bm25(10.0, 4.0, 2.0, 1.0)')")
+    connection.exec_driver_sql(f"INSERT INTO {schema}invMarketGroupsSearch(invMarketGroupsSearch, rank) VALUES ('rank', 'bm25(4.0, 1.0)')")
+    for table in SEARCH_TABLES:
+        connection.exec_driver_sql(f"INSERT INTO {schema}{table}({table}) VALUES ('optimize')")
+        count = connection.exec_driver_sql(f"SELECT count(*) FROM {schema}{table}").scalar()
+        print(f"  Inserted {count} rows into {table}")
+
+    connection.commit()
+    print("  Done")
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import os
-from sqlalchemy import Table
+from sqlalchemy import Table, select
+
+from sdetools import reprocessing
 
 from yaml import load
 try:
@@ -9,7 +11,7 @@ except ImportError:
     from yaml import SafeLoader
 
 
-def importyaml(connection,metadata,sourcePath,language='en'):
+def importyaml(connection,metadata,sourcePath,language='en',destinationPath=None):
     print("Importing Type Materials")
     invTypeMaterials = Table('invTypeMaterials',metadata)
     
@@ -44,5 +46,22 @@ def importyaml(connection,metadata,sourcePath,language='en'):
             connection.execute(invTypeMaterials.insert(), material_rows)
             print(f"  Inserted {len(material_rows)} type materials")
 
+        # Sparse type x material matrix for batch reprocessing (needs invTypes for portionSize)
+        if destinationPath is not None:
+            invTypes = Table('invTypes',metadata)
+            portionSizes = dict(connection.execute(
+                select(invTypes.c.typeID, invTypes.c.portionSize).where(invTypes.c.portionSize.isnot(None))
+            ).fetchall())
+            os.makedirs(destinationPath, exist_ok=True)
+            matrixPath = os.path.join(destinationPath, 'reprocessingMatrix.npz')
+            reprocessing.write_matrix(
+                matrixPath,
+                [r['typeID'] for r in material_rows],
+                [r['materialTypeID'] for r in material_rows],
+                [r['quantity'] for r in material_rows],
+                portionSizes
+            )
+            print(f"  Wrote reprocessing matrix to {matrixPath}")
+
     trans.commit()
     print("  Done")
@@ -6,16 +6,25 @@ except ImportError:
     from yaml import SafeLoader
 
 import os
-from sqlalchemy import Table
+from sqlalchemy import Table, select
 
-def importyaml(connection,metadata,sourcePath,language='en'):
+from sdetools import nameResolver
+
+def importyaml(connection,metadata,sourcePath,language='en',destinationPath=None):
     invTypes = Table('invTypes',metadata)
     trnTranslations = Table('trnTranslations',metadata)
     certMasteries = Table('certMasteries',metadata)
     invTraits = Table('invTraits',metadata)
     invMetaTypes = Table('invMetaTypes',metadata)
+    invGroups = Table('invGroups',metadata)
     print("Importing Types")
 
+    # Denormalized invTypes.categoryID (groups are loaded before types)
+    group_categories = dict(connection.execute(
+        select(invGroups.c.groupID, invGroups.c.categoryID)
+    ).fetchall())
+    connection.commit()
+
     targetPath = os.path.join(sourcePath, 'types.yaml')
     if not os.path.exists(targetPath):
         targetPath = os.path.join(sourcePath, 'fsd', 'types.yaml')
@@ -37,6 +46,7 @@ def importyaml(connection,metadata,sourcePath,language='en'):
             type_rows.append({
                 'typeID': typeid,
                 'groupID': typeids[typeid].get('groupID',0),
+                'categoryID': group_categories.get(typeids[typeid].get('groupID',0)),
                 'typeName': typeids[typeid].get('name',{}).get(language,''),
                 'description': typeids[typeid].get('description',{}).get(language,''),
                 'mass': typeids[typeid].get('mass',0),
@@ -137,5 +147,18 @@ def importyaml(connection,metadata,sourcePath,language='en'):
             connection.execute(invMetaTypes.insert(), meta_type_rows)
             print(f"  Inserted {len(meta_type_rows)} meta types")
 
+        # Name resolver over the type names of every language
+        if destinationPath is not None:
+            published = {r['typeID']: bool(r['published']) for r in type_rows}
+            names = [(r['typeID'], language, r['typeName'], published[r['typeID']]) for r in type_rows]
+            names.extend(
+                (r['keyID'], r['languageID'], r['text'], published.get(r['keyID'], False))
+                for r in translation_rows if r['tcID'] == 8
+            )
+            os.makedirs(destinationPath, exist_ok=True)
+            resolverPath = os.path.join(destinationPath, 'typeNames.npz')
+            nameResolver.write_resolver(resolverPath, names)
+            print(f"  Wrote name resolver to {resolverPath}")
+
     trans.commit()
     print("  Done")
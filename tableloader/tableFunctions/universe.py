@@ -6,7 +6,16 @@ except ImportError:
     from yaml import SafeLoader
 
 import os
-from sqlalchemy import Table, select, text
+import numpy as np
+from sqlalchemy import Table, select, text, bindparam
+
+from sdetools import spatialIndex
+
+# Metres per light-year, as used by the EVE client for jump ranges
+LIGHT_YEAR = 9460730472580800.0
+
+# Entries per insert when streaming the map*.yaml celestial files
+CELESTIAL_BATCH_SIZE = 5000
 
 typeidcache={}
 group_name_cache={}
@@ -66,7 +75,7 @@ def get_sorted_objects(planet, key):
     with_radius.sort()
     return [obj_id for (radius, obj_id) in with_radius]
 
-def importyaml(connection,metadata,sourcePath,language='en'):
+def importyaml(connection,metadata,sourcePath,language='en',batchSize=CELESTIAL_BATCH_SIZE):
     """Import universe data from new consolidated YAML files"""
 
     print("Importing Universe")
@@ -75,9 +84,7 @@ def importyaml(connection,metadata,sourcePath,language='en'):
     mapRegions = Table('mapRegions', metadata)
     mapConstellations = Table('mapConstellations', metadata)
     mapSolarSystems = Table('mapSolarSystems', metadata)
-    mapDenormalize = Table('mapDenormalize', metadata)
-    mapJumps = Table('mapJumps', metadata)
-    
+
     # Pre-resolve standard group IDs by name to handle missing TypeIDs in modern SDE
     gid_stargate = get_group_id_by_name(connection, metadata, 'Stargate')
     gid_planet = get_group_id_by_name(connection, metadata, 'Planet')
@@ -107,14 +114,14 @@ def importyaml(connection,metadata,sourcePath,language='en'):
             position = region.get('position', {})
 
             # Note: The new SDE doesn't provide min/max bounds, only position
-            # We'll leave those as None or calculate them if needed
+            # Bounds and radius are filled in afterwards by buildBounds
             region_rows.append({
                 'regionID': regionID,
                 'regionName': regionName,
                 'x': position.get('x'),
                 'y': position.get('y'),
                 'z': position.get('z'),
-                'xMin': None,  # Not provided in new SDE
+                'xMin': None,  # Not provided in new SDE, see buildBounds
                 'xMax': None,
                 'yMin': None,
                 'yMax': None,
@@ -122,7 +129,7 @@ def importyaml(connection,metadata,sourcePath,language='en'):
                 'zMax': None,
                 'factionID': region.get('factionID'),
                 'nebula': region.get('nebulaID'),
-                'radius': None  # Not provided in new SDE
+                'radius': None  # Not provided in new SDE, see buildBounds
             })
 
         if region_rows:
@@ -236,235 +243,539 @@ def importyaml(connection,metadata,sourcePath,language='en'):
     connection.commit()
     print("  Done")
 
-    print("Importing Stargates")
-    try:
-        targetPath = os.path.join(sourcePath, 'mapStargates.yaml')
-        if not os.path.exists(targetPath):
-            targetPath = os.path.join(sourcePath, 'fsd', 'mapStargates.yaml')
-        if not os.path.exists(targetPath):
-            targetPath = os.path.join(sourcePath, 'sde', 'fsd', 'mapStargates.yaml')
+    # Stargates, planets, moons, belts and stars all land in mapDenormalize
+    # and share one streaming path; see importCelestials. The last entry maps
+    # the mapDenormalize columns each file fills to its item keys.
+    for label, filename, group_id, columns in (
+        ('Stargates', 'mapStargates.yaml', gid_stargate, {}),
+        ('Planets', 'mapPlanets.yaml', gid_planet, {'radius': 'radius', 'celestialIndex': 'celestialIndex'}),
+        ('Moons', 'mapMoons.yaml', gid_moon, {'orbitID': 'planetID', 'radius': 'radius'}),  # Moons orbit planets
+        ('Asteroid Belts', 'mapAsteroidBelts.yaml', gid_asteroid, {}),
+        ('Stars', 'mapStars.yaml', gid_sun, {'radius': 'radius'}),
+    ):
+        importCelestials(connection, metadata, sourcePath, label, filename, group_id, columns, batchSize)
 
-        print(f"  Opening {targetPath}")
-        with open(targetPath, 'r', encoding='utf-8') as yamlstream:
-            stargates = load(yamlstream, Loader=SafeLoader)
-            print(f"  Processing {len(stargates)} stargates")
 
+def iter_yaml_batches(targetPath, batchSize):
+    """
+    Yield the top-level entries of a block-style YAML mapping in batches of
+    (key, value) pairs, without loading the whole file.
+
+    SDE map files are emitted with every top-level key at column 0, so lines
+    are accumulated until batchSize keys have been seen and only that chunk is
+    handed to the (C) YAML loader.
+    """
+    with open(targetPath, 'r', encoding='utf-8') as yamlstream:
+        chunk = []
+        entries = 0
+        for line in yamlstream:
+            if line[:1] not in ('', ' ', '\t', '\n', '\r', '#', '-'):
+                if entries == batchSize:
+                    yield list(load(''.join(chunk), Loader=SafeLoader).items())
+                    chunk = []
+                    entries = 0
+                entries += 1
+            chunk.append(line)
+        if entries:
+            yield list(load(''.join(chunk), Loader=SafeLoader).items())
+
+
+def importCelestials(connection, metadata, sourcePath, label, filename, group_id, columns, batchSize=CELESTIAL_BATCH_SIZE):
+    """
+    Stream one map*.yaml file into mapDenormalize (and mapJumps for stargates),
+    transforming and inserting batchSize entries at a time so peak memory is
+    bounded by the batch rather than the file.
+
+    columns maps the optional mapDenormalize columns (orbitID, radius,
+    celestialIndex, orbitIndex) this file fills to the item key they are read
+    from; columns not listed are left NULL.
+    """
+    print(f"Importing {label}")
+    mapDenormalize = Table('mapDenormalize', metadata)
+    mapJumps = Table('mapJumps', metadata)
+
+    targetPath = os.path.join(sourcePath, filename)
+    if not os.path.exists(targetPath):
+        targetPath = os.path.join(sourcePath, 'fsd', filename)
+    if not os.path.exists(targetPath):
+        targetPath = os.path.join(sourcePath, 'sde', 'fsd', filename)
+
+    try:
+        print(f"  Opening {targetPath}")
+        celestial_count = 0
+        jump_count = 0
+        for batch in iter_yaml_batches(targetPath, batchSize):
             jump_rows = []
             denormalize_rows = []
-            for stargateID, stargate in stargates.items():
-                # Add to mapJumps for navigation
-                destination = stargate.get('destination')
+            for itemID, item in batch:
+                # Stargates also feed mapJumps for navigation
+                destination = item.get('destination')
                 if destination:
                     # destination is a dict with 'stargateID' and 'solarSystemID'
                     destinationID = destination.get('stargateID') if isinstance(destination, dict) else destination
                     jump_rows.append({
-                        'stargateID': stargateID,
+                        'stargateID': itemID,
                         'destinationID': destinationID
                     })
 
-                # Add to mapDenormalize
-                position = stargate.get('position', {})
+                position = item.get('position', {})
                 denormalize_rows.append({
-                    'itemID': stargateID,
-                    'typeID': stargate.get('typeID'),
-                    'groupID': grouplookup(connection, metadata, stargate.get('typeID'), defaultid=gid_stargate),
-                    'solarSystemID': stargate.get('solarSystemID'),
+                    'itemID': itemID,
+                    'typeID': item.get('typeID'),
+                    'groupID': grouplookup(connection, metadata, item.get('typeID'), defaultid=group_id),
+                    'solarSystemID': item.get('solarSystemID'),
                     'constellationID': None,  # Will be filled by denormalization
                     'regionID': None,  # Will be filled by denormalization
-                    'orbitID': None,
+                    'orbitID': item.get(columns['orbitID']) if 'orbitID' in columns else None,
                     'x': position.get('x'),
                     'y': position.get('y'),
                     'z': position.get('z'),
-                    'radius': None,
-                    'itemName': None,  # Stargates don't have custom names in new SDE
+                    'radius': item.get(columns['radius']) if 'radius' in columns else None,
+                    'itemName': None,  # Celestials don't have custom names in new SDE
                     'security': None,
-                    'celestialIndex': None,
-                    'orbitIndex': None
+                    'celestialIndex': item.get(columns['celestialIndex']) if 'celestialIndex' in columns else None,
+                    'orbitIndex': item.get(columns['orbitIndex']) if 'orbitIndex' in columns else None
                 })
 
             if jump_rows:
                 connection.execute(mapJumps.insert(), jump_rows)
-                print(f"  Inserted {len(jump_rows)} stargate jumps")
+                jump_count += len(jump_rows)
             if denormalize_rows:
                 connection.execute(mapDenormalize.insert(), denormalize_rows)
-                print(f"  Inserted {len(denormalize_rows)} stargates into mapDenormalize")
+                celestial_count += len(denormalize_rows)
+
+        if jump_count:
+            print(f"  Inserted {jump_count} stargate jumps")
+        print(f"  Inserted {celestial_count} {label.lower()} into mapDenormalize")
 
         connection.commit()
         print("  Done")
     except FileNotFoundError:
-        print("  Warning: mapStargates.yaml not found, skipping")
+        print(f"  Warning: {filename} not found, skipping")
 
-    print("Importing Planets")
-    try:
-        targetPath = os.path.join(sourcePath, 'mapPlanets.yaml')
-        if not os.path.exists(targetPath):
-            targetPath = os.path.join(sourcePath, 'fsd', 'mapPlanets.yaml')
-        if not os.path.exists(targetPath):
-            targetPath = os.path.join(sourcePath, 'sde', 'fsd', 'mapPlanets.yaml')
 
-        print(f"  Opening {targetPath}")
-        with open(targetPath, 'r', encoding='utf-8') as yamlstream:
-            planets = load(yamlstream, Loader=SafeLoader)
-            print(f"  Processing {len(planets)} planets")
-
-            planet_rows = []
-            for planetID, planet in planets.items():
-                position = planet.get('position', {})
-                planet_rows.append({
-                    'itemID': planetID,
-                    'typeID': planet.get('typeID'),
-                    'groupID': grouplookup(connection, metadata, planet.get('typeID'), defaultid=gid_planet),
-                    'solarSystemID': planet.get('solarSystemID'),
-                    'constellationID': None,
-                    'regionID': None,
-                    'orbitID': None,
-                    'x': position.get('x'),
-                    'y': position.get('y'),
-                    'z': position.get('z'),
-                    'radius': planet.get('radius'),
-                    'itemName': None,
-                    'security': None,
-                    'celestialIndex': planet.get('celestialIndex'),
-                    'orbitIndex': None
-                })
+def buildLightYears(connection, metadata, maxRange=10.0, blockSize=256):
+    """
+    Build mapSolarSystemLightYears: every ordered pair of known-space solar
+    systems that lie within maxRange light-years of each other.
+
+    Systems are sorted on x, so each block of origin systems only has to be
+    compared against the slab of systems whose x coordinate is within
+    maxRange of the block. Distances inside the slab are computed with numpy.
+    Wormhole and abyssal systems (solarSystemID >= 31000000) are skipped as
+    they cannot be reached by jump drives.
+    """
+    print(f"Building light-year proximity table (max {maxRange} ly)...")
 
-            if planet_rows:
-                connection.execute(mapDenormalize.insert(), planet_rows)
-                print(f"  Inserted {len(planet_rows)} planets into mapDenormalize")
+    mapSolarSystems = Table('mapSolarSystems', metadata)
+    mapSolarSystemLightYears = Table('mapSolarSystemLightYears', metadata)
+
+    rows = connection.execute(
+        select(
+            mapSolarSystems.c.solarSystemID,
+            mapSolarSystems.c.x,
+            mapSolarSystems.c.y,
+            mapSolarSystems.c.z
+        ).where(
+            mapSolarSystems.c.solarSystemID < 31000000
+        )
+    ).fetchall()
+    rows = [r for r in rows if r[1] is not None and r[2] is not None and r[3] is not None]
 
+    if not rows:
+        print("  No solar systems found, skipping")
         connection.commit()
-        print("  Done")
-    except FileNotFoundError:
-        print("  Warning: mapPlanets.yaml not found, skipping")
+        return
+
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    positions = np.array([(r[1], r[2], r[3]) for r in rows], dtype=np.float64) / LIGHT_YEAR
+
+    order = np.argsort(positions[:, 0], kind='stable')
+    ids = ids[order]
+    positions = positions[order]
+    xs = positions[:, 0]
+    maxSquared = maxRange * maxRange
+
+    total = 0
+    for start in range(0, len(ids), blockSize):
+        block = positions[start:start + blockSize]
+        lo = np.searchsorted(xs, block[0, 0] - maxRange, side='left')
+        hi = np.searchsorted(xs, block[-1, 0] + maxRange, side='right')
+
+        delta = block[:, None, :] - positions[None, lo:hi, :]
+        distSquared = np.einsum('ijk,ijk->ij', delta, delta)
+        origin, target = np.nonzero(distSquared <= maxSquared)
+        distances = np.sqrt(distSquared[origin, target])
+        origin = origin + start
+        target = target + lo
+
+        keep = origin != target
+        origin, target, distances = origin[keep], target[keep], distances[keep]
+
+        if len(origin):
+            connection.execute(mapSolarSystemLightYears.insert(), [
+                {'fromSolarSystemID': int(a), 'toSolarSystemID': int(b), 'lightYears': float(d)}
+                for a, b, d in zip(ids[origin], ids[target], distances)
+            ])
+            total += len(origin)
 
-    print("Importing Moons")
-    try:
-        targetPath = os.path.join(sourcePath, 'mapMoons.yaml')
-        if not os.path.exists(targetPath):
-            targetPath = os.path.join(sourcePath, 'fsd', 'mapMoons.yaml')
-        if not os.path.exists(targetPath):
-            targetPath = os.path.join(sourcePath, 'sde', 'fsd', 'mapMoons.yaml')
+    connection.commit()
+    print(f"  Inserted {total} system pairs for {len(ids)} systems")
+    print("  Done")
 
-        print(f"  Opening {targetPath}")
-        with open(targetPath, 'r', encoding='utf-8') as yamlstream:
-            moons = load(yamlstream, Loader=SafeLoader)
-            print(f"  Processing {len(moons)} moons")
-
-            moon_rows = []
-            for moonID, moon in moons.items():
-                position = moon.get('position', {})
-                moon_rows.append({
-                    'itemID': moonID,
-                    'typeID': moon.get('typeID'),
-                    'groupID': grouplookup(connection, metadata, moon.get('typeID'), defaultid=gid_moon),
-                    'solarSystemID': moon.get('solarSystemID'),
-                    'constellationID': None,
-                    'regionID': None,
-                    'orbitID': moon.get('planetID'),  # Moons orbit planets
-                    'x': position.get('x'),
-                    'y': position.get('y'),
-                    'z': position.get('z'),
-                    'radius': moon.get('radius'),
-                    'itemName': None,
-                    'security': None,
-                    'celestialIndex': None,
-                    'orbitIndex': None
-                })
 
-            if moon_rows:
-                connection.execute(mapDenormalize.insert(), moon_rows)
-                print(f"  Inserted {len(moon_rows)} moons into mapDenormalize")
+def _group_bounds(keys, sysMin, sysMax, sysPos, sysReach, centers):
+    """
+    Reduce per-system boxes to per-group (constellation or region) boxes.
+
+    centers maps groupID -> (x, y, z) from the SDE; groups without a position
+    use the centre of their box. The radius is the largest distance from the
+    centre to any member system plus that system's own reach.
+    """
+    groupIDs, inverse = np.unique(keys, return_inverse=True)
+    groupMin = np.full((len(groupIDs), 3), np.inf)
+    groupMax = np.full((len(groupIDs), 3), -np.inf)
+    np.minimum.at(groupMin, inverse, sysMin)
+    np.maximum.at(groupMax, inverse, sysMax)
+
+    groupCenter = (groupMin + groupMax) / 2.0
+    for n, groupID in enumerate(groupIDs):
+        center = centers.get(int(groupID))
+        if center is not None:
+            groupCenter[n] = center
+
+    delta = sysPos - groupCenter[inverse]
+    distances = np.sqrt(np.einsum('ij,ij->i', delta, delta)) + sysReach
+    groupRadius = np.zeros(len(groupIDs))
+    np.maximum.at(groupRadius, inverse, distances)
+    return groupIDs, groupMin, groupMax, groupRadius
+
+
+def _bounds_rows(ids, mins, maxs, radii=None):
+    rows = []
+    for n, itemID in enumerate(ids):
+        row = {
+            'b_id': int(itemID),
+            'b_xMin': float(mins[n, 0]), 'b_xMax': float(maxs[n, 0]),
+            'b_yMin': float(mins[n, 1]), 'b_yMax': float(maxs[n, 1]),
+            'b_zMin': float(mins[n, 2]), 'b_zMax': float(maxs[n, 2]),
+        }
+        if radii is not None:
+            row['b_radius'] = float(radii[n])
+        rows.append(row)
+    return rows
+
+
+def buildBounds(connection, metadata):
+    """
+    Fill xMin..zMax and radius on mapSolarSystems, mapConstellations and
+    mapRegions.
+
+    A system's box is its position plus the extent of its celestials in
+    mapDenormalize (whose coordinates are relative to the star). Constellation
+    and region boxes are the union of their systems' boxes; their radius is
+    measured from the SDE position to the farthest edge of any member system.
+    System radius from the SDE is kept where present.
+    """
+    print("Building region and constellation bounds...")
 
+    mapSolarSystems = Table('mapSolarSystems', metadata)
+    mapConstellations = Table('mapConstellations', metadata)
+    mapRegions = Table('mapRegions', metadata)
+    mapDenormalize = Table('mapDenormalize', metadata)
+
+    systems = connection.execute(
+        select(
+            mapSolarSystems.c.solarSystemID,
+            mapSolarSystems.c.constellationID,
+            mapSolarSystems.c.regionID,
+            mapSolarSystems.c.x,
+            mapSolarSystems.c.y,
+            mapSolarSystems.c.z,
+            mapSolarSystems.c.radius
+        )
+    ).fetchall()
+    systems = [r for r in systems if r.x is not None and r.y is not None and r.z is not None]
+    if not systems:
+        print("  No solar systems found, skipping")
         connection.commit()
-        print("  Done")
-    except FileNotFoundError:
-        print("  Warning: mapMoons.yaml not found, skipping")
+        return
+    systems.sort(key=lambda r: r.solarSystemID)
+
+    sysIDs = np.array([r.solarSystemID for r in systems], dtype=np.int64)
+    sysPos = np.array([(r.x, r.y, r.z) for r in systems], dtype=np.float64)
+    sdeRadius = np.array([r.radius if r.radius is not None else 0.0 for r in systems], dtype=np.float64)
+
+    celestials = connection.execute(
+        select(
+            mapDenormalize.c.solarSystemID,
+            mapDenormalize.c.x,
+            mapDenormalize.c.y,
+            mapDenormalize.c.z
+        ).where(
+            mapDenormalize.c.solarSystemID.isnot(None),
+            mapDenormalize.c.x.isnot(None)
+        )
+    ).fetchall()
+
+    # Local extents start at the star (origin) and grow with each celestial
+    localMin = np.zeros((len(sysIDs), 3))
+    localMax = np.zeros((len(sysIDs), 3))
+    reach = np.zeros(len(sysIDs))
+    if celestials:
+        celSystems = np.array([r[0] for r in celestials], dtype=np.int64)
+        celPos = np.array([(r[1], r[2] or 0.0, r[3] or 0.0) for r in celestials], dtype=np.float64)
+        idx = np.searchsorted(sysIDs, celSystems)
+        idx[idx == len(sysIDs)] = 0
+        known = sysIDs[idx] == celSystems
+        idx, celPos = idx[known], celPos[known]
+        np.minimum.at(localMin, idx, celPos)
+        np.maximum.at(localMax, idx, celPos)
+        np.maximum.at(reach, idx, np.sqrt(np.einsum('ij,ij->i', celPos, celPos)))
+
+    sysMin = sysPos + localMin
+    sysMax = sysPos + localMax
+    sysReach = np.maximum(reach, sdeRadius)
+    sysRadius = np.where(sdeRadius > 0, sdeRadius, reach)
+
+    def update(table, keyColumn, rows, withRadius):
+        values = {c: bindparam('b_' + c) for c in ('xMin', 'xMax', 'yMin', 'yMax', 'zMin', 'zMax')}
+        if withRadius:
+            values['radius'] = bindparam('b_radius')
+        connection.execute(
+            table.update().where(table.c[keyColumn] == bindparam('b_id')).values(**values),
+            rows
+        )
 
-    print("Importing Asteroid Belts")
-    try:
-        targetPath = os.path.join(sourcePath, 'mapAsteroidBelts.yaml')
-        if not os.path.exists(targetPath):
-            targetPath = os.path.join(sourcePath, 'fsd', 'mapAsteroidBelts.yaml')
-        if not os.path.exists(targetPath):
-            targetPath = os.path.join(sourcePath, 'sde', 'fsd', 'mapAsteroidBelts.yaml')
+    update(mapSolarSystems, 'solarSystemID', _bounds_rows(sysIDs, sysMin, sysMax, sysRadius), True)
+    print(f"  Updated bounds for {len(sysIDs)} solar systems")
+
+    for table, keyColumn, column in (
+        (mapConstellations, 'constellationID', 'constellationID'),
+        (mapRegions, 'regionID', 'regionID'),
+    ):
+        keys = np.array([getattr(r, column) if getattr(r, column) is not None else -1 for r in systems], dtype=np.int64)
+        member = keys >= 0
+        centers = {
+            r[0]: (r[1], r[2], r[3])
+            for r in connection.execute(select(table.c[keyColumn], table.c.x, table.c.y, table.c.z)).fetchall()
+            if r[1] is not None and r[2] is not None and r[3] is not None
+        }
+        groupIDs, groupMin, groupMax, groupRadius = _group_bounds(
+            keys[member], sysMin[member], sysMax[member], sysPos[member], sysReach[member], centers
+        )
+        if len(groupIDs):
+            update(table, keyColumn, _bounds_rows(groupIDs, groupMin, groupMax, groupRadius), True)
+        print(f"  Updated bounds for {len(groupIDs)} {table.name[3:].lower()}")
 
-        print(f"  Opening {targetPath}")
-        with open(targetPath, 'r', encoding='utf-8') as yamlstream:
-            belts = load(yamlstream, Loader=SafeLoader)
-            print(f"  Processing {len(belts)} asteroid belts")
-
-            belt_rows = []
-            for beltID, belt in belts.items():
-                position = belt.get('position', {})
-                belt_rows.append({
-                    'itemID': beltID,
-                    'typeID': belt.get('typeID'),
-                    'groupID': grouplookup(connection, metadata, belt.get('typeID'), defaultid=gid_asteroid),
-                    'solarSystemID': belt.get('solarSystemID'),
-                    'constellationID': None,
-                    'regionID': None,
-                    'orbitID': None,
-                    'x': position.get('x'),
-                    'y': position.get('y'),
-                    'z': position.get('z'),
-                    'radius': None,
-                    'itemName': None,
-                    'security': None,
-                    'celestialIndex': None,
-                    'orbitIndex': None
-                })
+    connection.commit()
+    print("  Done")
 
-            if belt_rows:
-                connection.execute(mapDenormalize.insert(), belt_rows)
-                print(f"  Inserted {len(belt_rows)} asteroid belts into mapDenormalize")
 
-        connection.commit()
-        print("  Done")
-    except FileNotFoundError:
-        print("  Warning: mapAsteroidBelts.yaml not found, skipping")
+def buildCelestialIndex(connection, metadata, destinationPath):
+    """
+    Add NPC stations to mapDenormalize, fill orbitID/celestialIndex/orbitIndex
+    for asteroid belts, moons and stations, and write the per-system spatial
+    index (celestialIndex.npz) used by sdetools.spatialIndex.
+
+    Belts are assigned to their nearest planet, stations to their nearest
+    planet or moon. Orbit indexes are the 1-based position of an object among
+    the belts or moons of its planet, sorted by distance from that planet.
+    Only NULL orbitID/celestialIndex/orbitIndex values are filled, and
+    stations already in mapDenormalize are not added again. invItems takes
+    stations from staStations and skips their mapDenormalize rows.
+    """
+    print("Building celestial orbits and spatial index...")
 
-    print("Importing Stars")
-    try:
-        targetPath = os.path.join(sourcePath, 'mapStars.yaml')
-        if not os.path.exists(targetPath):
-            targetPath = os.path.join(sourcePath, 'fsd', 'mapStars.yaml')
-        if not os.path.exists(targetPath):
-            targetPath = os.path.join(sourcePath, 'sde', 'fsd', 'mapStars.yaml')
+    mapDenormalize = Table('mapDenormalize', metadata)
+    staStations = Table('staStations', metadata)
+    invTypes = Table('invTypes', metadata)
 
-        print(f"  Opening {targetPath}")
-        with open(targetPath, 'r', encoding='utf-8') as yamlstream:
-            stars = load(yamlstream, Loader=SafeLoader)
-            print(f"  Processing {len(stars)} stars")
-
-            star_rows = []
-            for starID, star in stars.items():
-                position = star.get('position', {})
-                star_rows.append({
-                    'itemID': starID,
-                    'typeID': star.get('typeID'),
-                    'groupID': grouplookup(connection, metadata, star.get('typeID'), defaultid=gid_sun),
-                    'solarSystemID': star.get('solarSystemID'),
-                    'constellationID': None,
-                    'regionID': None,
-                    'orbitID': None,
-                    'x': position.get('x'),
-                    'y': position.get('y'),
-                    'z': position.get('z'),
-                    'radius': star.get('radius'),
-                    'itemName': None,
-                    'security': None,
-                    'celestialIndex': None,
-                    'orbitIndex': None
+    gid_planet = get_group_id_by_name(connection, metadata, 'Planet')
+    gid_moon = get_group_id_by_name(connection, metadata, 'Moon')
+    gid_asteroid = get_group_id_by_name(connection, metadata, 'Asteroid Belt')
+    gid_station = get_group_id_by_name(connection, metadata, 'Station')
+
+    print("  Adding stations to mapDenormalize")
+    existing = select(mapDenormalize.c.itemID).where(mapDenormalize.c.itemID == staStations.c.stationID)
+    stations = connection.execute(
+        select(
+            staStations.c.stationID,
+            staStations.c.stationTypeID,
+            invTypes.c.groupID,
+            staStations.c.solarSystemID,
+            staStations.c.constellationID,
+            staStations.c.regionID,
+            staStations.c.x,
+            staStations.c.y,
+            staStations.c.z,
+            staStations.c.stationName,
+            staStations.c.security
+        ).select_from(
+            staStations.outerjoin(invTypes, invTypes.c.typeID == staStations.c.stationTypeID)
+        ).where(~existing.exists())
+    ).fetchall()
+
+    station_rows = []
+    for s in stations:
+        station_rows.append({
+            'itemID': s.stationID,
+            'typeID': s.stationTypeID,
+            'groupID': s.groupID if s.groupID is not None else gid_station,
+            'solarSystemID': s.solarSystemID,
+            'constellationID': s.constellationID,
+            'regionID': s.regionID,
+            'orbitID': None,
+            'x': s.x,
+            'y': s.y,
+            'z': s.z,
+            'radius': None,
+            'itemName': s.stationName,
+            'security': s.security,
+            'celestialIndex': None,
+            'orbitIndex': None
+        })
+    if station_rows:
+        connection.execute(mapDenormalize.insert(), station_rows)
+        print(f"  Inserted {len(station_rows)} stations into mapDenormalize")
+    station_group_ids = {r['groupID'] for r in station_rows}
+    celestial_group_ids = {gid_planet, gid_moon, gid_asteroid} | station_group_ids
+    celestial_group_ids.discard(None)
+
+    # Group planets, moons, belts and stations by solar system
+    rows = connection.execute(
+        select(
+            mapDenormalize.c.itemID,
+            mapDenormalize.c.groupID,
+            mapDenormalize.c.solarSystemID,
+            mapDenormalize.c.orbitID,
+            mapDenormalize.c.x,
+            mapDenormalize.c.y,
+            mapDenormalize.c.z,
+            mapDenormalize.c.celestialIndex,
+            mapDenormalize.c.orbitIndex
+        ).where(
+            mapDenormalize.c.groupID.in_(celestial_group_ids)
+        )
+    ).fetchall()
+
+    systems = {}
+    for r in rows:
+        system = systems.setdefault(r.solarSystemID, {'planets': {}, 'moons': {}, 'belts': {}, 'stations': {}})
+        obj = {
+            'position': (r.x or 0.0, r.y or 0.0, r.z or 0.0),
+            'orbitID': r.orbitID,
+            'celestialIndex': r.celestialIndex,
+            'orbitIndex': r.orbitIndex
+        }
+        if r.groupID == gid_planet:
+            system['planets'][r.itemID] = obj
+        elif r.groupID == gid_moon:
+            system['moons'][r.itemID] = obj
+        elif r.groupID == gid_asteroid:
+            system['belts'][r.itemID] = obj
+        else:
+            system['stations'][r.itemID] = obj
+
+    def nearest(obj, candidates):
+        best = None
+        for candidate_id, candidate in candidates.items():
+            distance = get_distance_squared(obj, candidate)
+            if best is None or distance < best[0]:
+                best = (distance, candidate_id)
+        return best[1] if best else None
+
+    updates = []
+    for system in systems.values():
+        planets = system['planets']
+        moons = system['moons']
+
+        # Attach belts and moons to their planets, then rank them by distance
+        for planet in planets.values():
+            planet['asteroidBelts'] = {}
+            planet['moons'] = {}
+        for belt_id, belt in system['belts'].items():
+            if belt['orbitID'] not in planets:
+                belt['orbitID'] = nearest(belt, planets)
+            if belt['orbitID'] is not None:
+                planets[belt['orbitID']]['asteroidBelts'][belt_id] = belt
+        for moon_id, moon in moons.items():
+            if moon['orbitID'] in planets:
+                planets[moon['orbitID']]['moons'][moon_id] = moon
+
+        for planet in planets.values():
+            for key in ('asteroidBelts', 'moons'):
+                for index, obj_id in enumerate(get_sorted_objects(planet, key), 1):
+                    obj = planet[key][obj_id]
+                    if obj['celestialIndex'] is None:
+                        obj['celestialIndex'] = planet['celestialIndex']
+                    if obj['orbitIndex'] is None:
+                        obj['orbitIndex'] = index
+
+        # Stations orbit whichever planet or moon they are closest to
+        for station in system['stations'].values():
+            if station['orbitID'] is None:
+                station['orbitID'] = nearest(station, {**planets, **moons})
+            orbit = moons.get(station['orbitID'])
+            if orbit is not None:
+                if station['celestialIndex'] is None:
+                    station['celestialIndex'] = orbit['celestialIndex']
+                if station['orbitIndex'] is None:
+                    station['orbitIndex'] = orbit['orbitIndex']
+            elif station['orbitID'] in planets and station['celestialIndex'] is None:
+                station['celestialIndex'] = planets[station['orbitID']]['celestialIndex']
+
+        for key in ('belts', 'moons', 'stations'):
+            for obj_id, obj in system[key].items():
+                updates.append({
+                    'b_itemID': obj_id,
+                    'b_orbitID': obj['orbitID'],
+                    'b_celestialIndex': obj['celestialIndex'],
+                    'b_orbitIndex': obj['orbitIndex']
                 })
 
-            if star_rows:
-                connection.execute(mapDenormalize.insert(), star_rows)
-                print(f"  Inserted {len(star_rows)} stars into mapDenormalize")
+    if updates:
+        connection.execute(
+            mapDenormalize.update()
+            .where(mapDenormalize.c.itemID == bindparam('b_itemID'))
+            .values(
+                orbitID=bindparam('b_orbitID'),
+                celestialIndex=bindparam('b_celestialIndex'),
+                orbitIndex=bindparam('b_orbitIndex')
+            ),
+            updates
+        )
+        print(f"  Updated orbits for {len(updates)} belts, moons and stations")
+    connection.commit()
 
-        connection.commit()
-        print("  Done")
-    except FileNotFoundError:
-        print("  Warning: mapStars.yaml not found, skipping")
+    print("  Writing spatial index")
+    rows = connection.execute(
+        select(
+            mapDenormalize.c.itemID,
+            mapDenormalize.c.typeID,
+            mapDenormalize.c.groupID,
+            mapDenormalize.c.solarSystemID,
+            mapDenormalize.c.x,
+            mapDenormalize.c.y,
+            mapDenormalize.c.z
+        ).where(
+            mapDenormalize.c.solarSystemID.isnot(None)
+        )
+    ).fetchall()
+
+    os.makedirs(destinationPath, exist_ok=True)
+    targetPath = os.path.join(destinationPath, 'celestialIndex.npz')
+    spatialIndex.write_index(
+        targetPath,
+        [r.itemID for r in rows],
+        [r.typeID or 0 for r in rows],
+        [r.groupID or 0 for r in rows],
+        [r.solarSystemID for r in rows],
+        [(r.x or 0.0, r.y or 0.0, r.z or 0.0) for r in rows]
+    )
+    connection.commit()
+    print(f"  Wrote {len(rows)} objects to {targetPath}")
+    print("  Done")
 
 
 def buildJumps(connection, metadata):
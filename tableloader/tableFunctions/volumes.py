@@ -1,43 +1,81 @@
 # -*- coding: utf-8 -*-
-import sys
+import csv
 import os
-import requests
-from sqlalchemy import Table
+from sqlalchemy import Table, select
 
-def importVolumes(connection,metadata,sourcePath):
+from . import hoboleaks
+
+VOLUMES_URL = 'https://sde.hoboleaks.space/tq/repackagedvolumes.json'
+
+# Bundled fallback: invVolumes1.csv is volume,groupID and invVolumes2.csv is volume,typeID
+bundledPath = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..')
+
+
+def find_bundled(sourcePath, filename):
+    for path in (os.path.join(sourcePath, filename), os.path.join(bundledPath, filename)):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def bundledVolumes(connection, metadata, sourcePath):
+    """Packaged volumes from the bundled CSVs, group volumes first, then per-type overrides."""
+    invTypes = Table('invTypes', metadata)
+    volumes = {}
+
+    groupPath = find_bundled(sourcePath, 'invVolumes1.csv')
+    typePath = find_bundled(sourcePath, 'invVolumes2.csv')
+    if groupPath is None or typePath is None:
+        return None
+
+    with open(groupPath, 'r', encoding='utf-8') as groupVolumes:
+        group_volume = {int(row[1]): int(row[0]) for row in csv.reader(groupVolumes) if row}
+    if group_volume:
+        rows = connection.execute(
+            select(invTypes.c.typeID, invTypes.c.groupID).where(invTypes.c.groupID.in_(list(group_volume)))
+        ).fetchall()
+        for type_id, group_id in rows:
+            volumes[type_id] = group_volume[group_id]
+
+    with open(typePath, 'r', encoding='utf-8') as typeVolumes:
+        for row in csv.reader(typeVolumes):
+            if row:
+                volumes[int(row[1])] = int(row[0])
+
+    return volumes
+
+
+def importVolumes(connection,metadata,sourcePath,offline=False):
 
     print("Importing Volumes from hoboleaks.space")
     invVolumes = Table('invVolumes',metadata)
     trans = connection.begin()
 
     try:
-        # Fetch packaged volume data from hoboleaks.space
-        url = 'https://sde.hoboleaks.space/tq/repackagedvolumes.json'
-        print(f"  Fetching data from {url}...")
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        volume_data = response.json()
-
-        print(f"  Processing {len(volume_data)} volume entries...")
-
-        # Insert typeID-volume pairs
-        # JSON keys are strings, values can be int or float
-        for type_id_str, volume in volume_data.items():
-            type_id = int(type_id_str)
-            volume_int = int(volume)
-            connection.execute(
-                invVolumes.insert().values(typeID=type_id, volume=volume_int)
-            )
+        # Fetch packaged volume data from hoboleaks.space (or the local cache)
+        volume_data = hoboleaks.fetch_json(VOLUMES_URL, offline=offline)
+
+        if volume_data is not None:
+            # JSON keys are strings, values can be int or float
+            volumes = {int(type_id_str): int(volume) for type_id_str, volume in volume_data.items()}
+        else:
+            print("  Falling back to bundled invVolumes1.csv/invVolumes2.csv")
+            volumes = bundledVolumes(connection, metadata, sourcePath)
+            if volumes is None:
+                raise FileNotFoundError("invVolumes1.csv/invVolumes2.csv not found")
+
+        print(f"  Processing {len(volumes)} volume entries...")
+
+        # BULK INSERT
+        if volumes:
+            connection.execute(invVolumes.insert(), [
+                {'typeID': type_id, 'volume': volume} for type_id, volume in volumes.items()
+            ])
 
         trans.commit()
-        print(f"  Imported {len(volume_data)} volume entries")
+        print(f"  Imported {len(volumes)} volume entries")
         print("  Done")
 
-    except requests.RequestException as e:
-        trans.rollback()
-        print(f"Error fetching volume data from hoboleaks.space: {e}")
-        print("Volume import failed - please check your internet connection")
-        raise
     except Exception as e:
         trans.rollback()
         print(f"Error importing volumes: {e}")
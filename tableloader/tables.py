@@ -138,6 +138,14 @@ def metadataCreator(schema):
     )
 
 
+    chargeCompatibility =  Table('chargeCompatibility', metadata,
+            Column('weaponTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('chargeTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            schema=schema
+    )
+    Index('chargeCompatibility_IX_charge',chargeCompatibility.c.chargeTypeID)
+
+
     crpActivities =  Table('crpActivities', metadata,
             Column('activityID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
             Column('activityName', VARCHAR(length=100)),
@@ -268,6 +276,22 @@ def metadataCreator(schema):
     )
 
 
+    dgmEffectModifiers =  Table('dgmEffectModifiers', metadata,
+            Column('effectID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('modifierIndex', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('func', VARCHAR(length=50)),
+            Column('domain', VARCHAR(length=20)),
+            Column('operation', INTEGER()),
+            Column('modifiedAttributeID', INTEGER()),
+            Column('modifyingAttributeID', INTEGER()),
+            Column('skillTypeID', INTEGER()),
+            Column('groupID', INTEGER()),
+            schema=schema
+    )
+
+    Index('dgmEffectModifiers_IX_modified', dgmEffectModifiers.c.modifiedAttributeID)
+
+
     dgmExpressions =  Table('dgmExpressions', metadata,
             Column('expressionID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
             Column('operandID', INTEGER()),
@@ -292,6 +316,16 @@ def metadataCreator(schema):
     )
 
 
+    dgmTypeAttributesEffective =  Table('dgmTypeAttributesEffective', metadata,
+            Column('typeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('attributeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('value', FLOAT()),
+            Column('isDefault', Boolean(name='dtae_default')),
+            schema=schema
+    )
+    Index('dgmTypeAttributesEffective_IX_attribute',dgmTypeAttributesEffective.c.attributeID,dgmTypeAttributesEffective.c.value)
+
+
     dgmTypeEffects =  Table('dgmTypeEffects', metadata,
             Column('typeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
             Column('effectID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
@@ -328,6 +362,15 @@ def metadataCreator(schema):
     )
 
 
+    fitCompatibility =  Table('fitCompatibility', metadata,
+            Column('moduleTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('restrictionKind', VARCHAR(length=5), primary_key=True, autoincrement=False, nullable=False),
+            Column('restrictionID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            schema=schema
+    )
+    Index('fitCompatibility_IX_restriction',fitCompatibility.c.restrictionKind,fitCompatibility.c.restrictionID)
+
+
     industryActivity =  Table('industryActivity', metadata,
             Column('typeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
             Column('activityID', INTEGER(), primary_key=True, autoincrement=False, nullable=False,index=True),
@@ -344,6 +387,7 @@ def metadataCreator(schema):
             schema=schema
     )
     Index('industryActivityMaterials_idx1',industryActivityMaterials.c.typeID,industryActivityMaterials.c.activityID)
+    Index('industryActivityMaterials_IX_material',industryActivityMaterials.c.materialTypeID,industryActivityMaterials.c.activityID,industryActivityMaterials.c.typeID,industryActivityMaterials.c.quantity)
 
 
     industryActivityProbabilities =  Table('industryActivityProbabilities', metadata,
@@ -362,6 +406,7 @@ def metadataCreator(schema):
             Column('quantity', INTEGER()),
             schema=schema
     )
+    Index('industryActivityProducts_IX_product',industryActivityProducts.c.productTypeID,industryActivityProducts.c.activityID,industryActivityProducts.c.typeID,industryActivityProducts.c.quantity)
 
 
     industryActivityRaces =  Table('industryActivityRaces', metadata,
@@ -381,6 +426,30 @@ def metadataCreator(schema):
             schema=schema
     )
     Index('industryActivitySkills_idx1',industryActivitySkills.c.typeID,industryActivitySkills.c.activityID)
+    Index('industryActivitySkills_IX_skill',industryActivitySkills.c.skillID,industryActivitySkills.c.activityID,industryActivitySkills.c.typeID,industryActivitySkills.c.level)
+
+    industryBOMEdges =  Table('industryBOMEdges', metadata,
+            Column('productTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('materialTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('blueprintTypeID', INTEGER()),
+            Column('activityID', INTEGER()),
+            Column('quantity', INTEGER()),
+            Column('productQuantity', INTEGER()),
+            Column('isIntermediate', Boolean(name='bomedge_intermediate')),
+            schema=schema
+    )
+    Index('industryBOMEdges_IX_material',industryBOMEdges.c.materialTypeID)
+
+
+    industryBOMFlat =  Table('industryBOMFlat', metadata,
+            Column('productTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('materialTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('quantity', FLOAT(precision=53)),
+            Column('depth', INTEGER()),
+            schema=schema
+    )
+    Index('industryBOMFlat_IX_material',industryBOMFlat.c.materialTypeID)
+
 
     industryBlueprints =  Table('industryBlueprints', metadata,
             Column('typeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
@@ -473,6 +542,15 @@ def metadataCreator(schema):
     )
 
 
+    invMarketGroupsClosure =  Table('invMarketGroupsClosure', metadata,
+            Column('ancestorID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('descendantID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('depth', INTEGER()),
+            schema=schema
+    )
+    Index('invMarketGroupsClosure_IX_descendant',invMarketGroupsClosure.c.descendantID,invMarketGroupsClosure.c.ancestorID)
+
+
     invMetaGroups =  Table('invMetaGroups', metadata,
             Column('metaGroupID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
             Column('metaGroupName', VARCHAR(length=100)),
@@ -490,6 +568,15 @@ def metadataCreator(schema):
     )
 
 
+    invMetaTypesClosure =  Table('invMetaTypesClosure', metadata,
+            Column('ancestorTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('typeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('depth', INTEGER()),
+            schema=schema
+    )
+    Index('invMetaTypesClosure_IX_type',invMetaTypesClosure.c.typeID,invMetaTypesClosure.c.ancestorTypeID)
+
+
     invNames =  Table('invNames', metadata,
             Column('itemID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
             Column('itemName', VARCHAR(length=200), nullable=False),
@@ -553,6 +640,7 @@ def metadataCreator(schema):
             Column('iconID', INTEGER()),
             Column('soundID', INTEGER()),
             Column('graphicID', INTEGER()),
+            Column('categoryID', INTEGER(),index=True),
             schema=schema
     )
 
@@ -731,6 +819,15 @@ def metadataCreator(schema):
     )
 
 
+    mapSolarSystemLightYears =  Table('mapSolarSystemLightYears', metadata,
+            Column('fromSolarSystemID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('toSolarSystemID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('lightYears', FLOAT(precision=53)),
+            schema=schema
+    )
+    Index('mapSolarSystemLightYears_IX_fromDistance',mapSolarSystemLightYears.c.fromSolarSystemID,mapSolarSystemLightYears.c.lightYears)
+
+
     mapSolarSystems =  Table('mapSolarSystems', metadata,
             Column('regionID', INTEGER(),index=True),
             Column('constellationID', INTEGER(),index=True),
@@ -790,6 +887,25 @@ def metadataCreator(schema):
     )
 
 
+    planetSchematicsChain =  Table('planetSchematicsChain', metadata,
+            Column('typeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('schematicID', INTEGER()),
+            Column('tier', INTEGER(),index=True),
+            Column('outputQuantity', INTEGER()),
+            Column('cycleTime', INTEGER()),
+            Column('chainCycleTime', INTEGER()),
+            schema=schema
+    )
+
+
+    planetSchematicsChainInputs =  Table('planetSchematicsChainInputs', metadata,
+            Column('typeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('inputTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('quantity', FLOAT(precision=53)),
+            schema=schema
+    )
+
+
     planetSchematicsPinMap =  Table('planetSchematicsPinMap', metadata,
             Column('schematicID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
             Column('pinTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
@@ -870,6 +986,27 @@ def metadataCreator(schema):
     )
 
 
+    # masteryLevel 1..5 is mastery I..V (dgmMasteries.grade 0..4 in the SDE)
+    shipMasterySkills =  Table('shipMasterySkills', metadata,
+            Column('shipTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('masteryLevel', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('skillTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('requiredLevel', INTEGER()),
+            schema=schema
+    )
+    Index('shipMasterySkills_IX_skill',shipMasterySkills.c.skillTypeID)
+
+
+    skillPrerequisiteClosure =  Table('skillPrerequisiteClosure', metadata,
+            Column('typeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('skillID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
+            Column('level', INTEGER()),
+            Column('depth', INTEGER()),
+            schema=schema
+    )
+    Index('skillPrerequisiteClosure_IX_skill',skillPrerequisiteClosure.c.skillID,skillPrerequisiteClosure.c.level)
+
+
     skinLicense =  Table('skinLicense', metadata,
             Column('licenseTypeID', INTEGER(), primary_key=True, autoincrement=False, nullable=False),
             Column('duration', INTEGER()),
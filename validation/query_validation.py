@@ -20,6 +20,8 @@ import configparser
 from sqlalchemy import create_engine, text
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 # ANSI color codes
 class Colors:
     HEADER = '\033[95m'
@@ -368,6 +370,36 @@ def validate_eve_specific_sanity(connection, db_type):
     return True
 
 
+def validate_skill_training(connection, db_type):
+    """Skills resolve their primary/secondary dogma attributes to character attributes"""
+    log_info("\n" + "="*70)
+    log_info("VALIDATION 6: Skill Training Attributes")
+    log_info("="*70)
+
+    from sdetools.skillTraining import SkillTraining
+    from tableloader.tables import metadataCreator
+
+    # Gunnery: perception / willpower
+    skillID = 3300
+    try:
+        training = SkillTraining.from_connection(connection, metadataCreator(None))
+        connection.commit()
+        index = training._index([skillID])[0]
+        if index < 0:
+            log_error(f"Skill {skillID} resolves to two distinct attributes: FAILED (skill not found)")
+            return False
+        primary, secondary = int(training.primary[index]), int(training.secondary[index])
+        if primary < 0 or secondary < 0 or primary == secondary:
+            log_error(f"Skill {skillID} resolves to two distinct attributes: FAILED (columns {primary}, {secondary})")
+            return False
+        log_success(f"Skill {skillID} resolves to two distinct attributes: PASSED "
+                    f"({training.attributeIDs[primary]}, {training.attributeIDs[secondary]})")
+        return True
+    except Exception as e:
+        log_error(f"Skill {skillID} resolves to two distinct attributes: EXCEPTION - {e}")
+        return False
+
+
 def print_summary(results):
     """Print validation summary"""
     log_info("\n" + "="*70)
@@ -419,6 +451,7 @@ def main():
     results.append(validate_uniqueness_constraints(connection, db_type))
     results.append(validate_not_null_constraints(connection, db_type))
     results.append(validate_eve_specific_sanity(connection, db_type))
+    results.append(validate_skill_training(connection, db_type))
 
     # Close connection
     connection.close()